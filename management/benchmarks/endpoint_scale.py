@@ -0,0 +1,156 @@
+#
+# Copyright (c) 2019 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Measures throughput of concurrent endpoint scale calls against a fake API server.
+
+The fake server keeps InferenceEndpoint objects in memory and answers every request after
+a fixed latency, a cluster is not needed:
+
+    python benchmarks/endpoint_scale.py --endpoints 20 --requests 400 --concurrency 16
+"""
+
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+from kubernetes import client
+
+from management_api.config import CRD_GROUP, CRD_VERSION, CRD_PLURAL
+from management_api.endpoints.endpoint_utils import patch_endpoint_spec
+
+
+def merge(target, patch):
+    for key, value in patch.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            merge(target[key], value)
+        elif value is None:
+            target.pop(key, None)
+        else:
+            target[key] = value
+
+
+class FakeApiServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency):
+        super().__init__(('127.0.0.1', 0), FakeApiHandler)
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.objects = {}
+        self.requests = 0
+        self.resource_version = 0
+
+    def add_endpoint(self, name):
+        self.resource_version += 1
+        self.objects[name] = {'metadata': {'name': name,
+                                           'resourceVersion': str(self.resource_version)},
+                              'spec': {'modelName': 'resnet', 'replicas': 1}}
+
+
+class FakeApiHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.handle_call(lambda obj, body: obj)
+
+    def do_PATCH(self):
+        def patch(obj, body):
+            merge(obj, body)
+            self.server.resource_version += 1
+            obj['metadata']['resourceVersion'] = str(self.server.resource_version)
+            return obj
+
+        self.handle_call(patch)
+
+    def handle_call(self, operation):
+        length = int(self.headers.get('Content-Length', 0))
+        body = json.loads(self.rfile.read(length)) if length else None
+        time.sleep(self.server.latency)
+        name = self.path.rstrip('/').split('/')[-1]
+        with self.server.lock:
+            self.server.requests += 1
+            obj = self.server.objects.get(name)
+            response = json.dumps(operation(obj, body) if obj else {}).encode()
+        self.send_response(200 if obj else 404)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, *args):
+        pass
+
+
+def read_modify_write_scale(custom_api, namespace, endpoint_name, replicas):
+    # scaling before merge patches: whole object is read and written back
+    endpoint_object = custom_api.get_namespaced_custom_object(CRD_GROUP, CRD_VERSION, namespace,
+                                                              CRD_PLURAL, endpoint_name)
+    endpoint_object['spec']['replicas'] = replicas
+    custom_api.patch_namespaced_custom_object(CRD_GROUP, CRD_VERSION, namespace, CRD_PLURAL,
+                                              endpoint_name, endpoint_object)
+
+
+def merge_patch_scale(custom_api, namespace, endpoint_name, replicas):
+    patch_endpoint_spec(custom_api, namespace, endpoint_name, {'replicas': replicas})
+
+
+def measure(name, server, custom_api, scale, args):
+    requests_before = server.requests
+
+    def call(i):
+        scale(custom_api, 'test', f'endpoint-{i % args.endpoints}', i % 10)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        list(executor.map(call, range(args.requests)))
+    elapsed = time.perf_counter() - start
+    api_requests = (server.requests - requests_before) / args.requests
+    print(f'{name:<20} {args.requests / elapsed:>10.0f} scales/s '
+          f'{api_requests:>6.1f} API requests/scale')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--endpoints', type=int, default=20, help='number of endpoints scaled')
+    parser.add_argument('--requests', type=int, default=400, help='number of scale calls')
+    parser.add_argument('--concurrency', type=int, default=16,
+                        help='number of scale calls sent at once')
+    parser.add_argument('--latency', type=float, default=0.005,
+                        help='seconds the fake API server takes to answer')
+    args = parser.parse_args()
+
+    server = FakeApiServer(args.latency)
+    for i in range(args.endpoints):
+        server.add_endpoint(f'endpoint-{i}')
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    configuration = client.Configuration()
+    configuration.host = f'http://127.0.0.1:{server.server_port}'
+    configuration.connection_pool_maxsize = args.concurrency
+    custom_api = client.CustomObjectsApi(client.ApiClient(configuration))
+
+    measure('read-modify-write', server, custom_api, read_modify_write_scale, args)
+    measure('merge patch', server, custom_api, merge_patch_scale, args)
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
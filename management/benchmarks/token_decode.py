@@ -0,0 +1,94 @@
+#
+# Copyright (c) 2019 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Measures token verification throughput of TokenDecoder.
+
+Tokens are signed with keys generated on the fly, dex is not needed:
+
+    python benchmarks/token_decode.py --keys 4 --requests 2000
+"""
+
+import argparse
+import time
+
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jwt import JWT
+from jwt.jwk import RSAJWK
+
+from management_api.authenticate.authenticate import TokenDecoder
+from management_api.authenticate.key_store import KeyStore
+
+
+def generate_keys(count):
+    private_keys = {}
+    public_keys = {}
+    for i in range(count):
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048,
+                                       backend=default_backend())
+        private_keys[f'key-{i}'] = RSAJWK(key)
+        public_keys[f'key-{i}'] = RSAJWK(key.public_key())
+    return private_keys, public_keys
+
+
+def sign_token(private_keys, key_id):
+    claims = {'iss': 'benchmark', 'sub': 'user', 'groups': ['default'],
+              'exp': int(time.time()) + 3600}
+    return JWT().encode(claims, private_keys[key_id], alg='RS256',
+                        optional_headers={'kid': key_id})
+
+
+def decode_with_every_key(jwt, token, keys):
+    # verification before the verified token cache, trying keys one by one
+    for key in keys.values():
+        try:
+            return jwt.decode(token, key)
+        except Exception:
+            pass
+
+
+def measure(name, requests, decode):
+    start = time.perf_counter()
+    for _ in range(requests):
+        assert decode() is not None
+    elapsed = time.perf_counter() - start
+    print(f'{name:<30} {requests / elapsed:>12.0f} decodes/s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--keys', type=int, default=4, help='number of keys published by dex')
+    parser.add_argument('--requests', type=int, default=2000,
+                        help='number of requests sent with the same token')
+    args = parser.parse_args()
+
+    private_keys, public_keys = generate_keys(args.keys)
+    token = sign_token(private_keys, f'key-{args.keys - 1}')
+    jwt = JWT()
+
+    key_store = KeyStore(fetch=lambda: (public_keys, None))
+
+    measure('every key, no cache', args.requests,
+            lambda: decode_with_every_key(jwt, token, public_keys))
+    uncached = TokenDecoder(cache_size=0, key_store=key_store)
+    measure('key by kid, no cache', args.requests, lambda: uncached.decode(token))
+    cached = TokenDecoder(key_store=key_store)
+    measure('key by kid, verified cache', args.requests, lambda: cached.decode(token))
+
+
+if __name__ == '__main__':
+    main()
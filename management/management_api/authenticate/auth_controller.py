@@ -14,15 +14,14 @@
 # limitations under the License.
 #
 
+import re
 import requests
-import json
 from urllib.parse import urlencode, parse_qs, urlparse, urljoin, urlunparse
 from requests_oauthlib import OAuth2Session
 from jwt import jwk_from_dict
-from cryptography.hazmat.primitives.serialization import Encoding, PublicFormat
 
 
-from management_api.config import AuthParameters, DEX_URL, DEX_EXTERNAL_URL
+from management_api.config import AuthParameters, DEX_URL, DEX_EXTERNAL_URL, DEX_KEYS_TIMEOUT
 from management_api.utils.errors_handling import MissingTokenException
 from management_api.utils.logger import get_logger
 
@@ -66,19 +65,26 @@ def get_token(parameters: dict, offline=False):
     return token
 
 
+def cache_max_age(cache_control):
+    """Returns seconds for which response may be cached according to Cache-Control header"""
+    if not cache_control:
+        return None
+    if 'no-cache' in cache_control or 'no-store' in cache_control:
+        return 0
+    max_age = re.search(r'max-age=(\d+)', cache_control)
+    return int(max_age.group(1)) if max_age else None
+
+
 def _get_keys_from_dex():
-    resp = requests.get(urljoin(DEX_URL, AuthParameters.KEYS_PATH), params=None)
-    data = json.loads(resp.text)
-    keys = []
+    resp = requests.get(urljoin(DEX_URL, AuthParameters.KEYS_PATH), params=None,
+                        timeout=DEX_KEYS_TIMEOUT)
+    resp.raise_for_status()
+    data = resp.json()
+    keys = {}
     for k in data['keys']:
-        jwk = jwk_from_dict(k)
-        keys.append(jwk)
-        logger.info("PEM {}".format(jwk.keyobj.
-                                    public_bytes(Encoding.PEM,
-                                                 PublicFormat.SubjectPublicKeyInfo)
-                                    .decode('utf-8')))
-    logger.info("Number of imported keys :" + str(len(keys)))
-    return keys
+        keys[k.get('kid')] = jwk_from_dict(k)
+    logger.info("Number of imported keys: {}, key ids: {}".format(len(keys), list(keys)))
+    return keys, cache_max_age(resp.headers.get('Cache-Control'))
 
 
 def get_dex_external_url():
@@ -88,4 +94,5 @@ def get_dex_external_url():
 
 
 def get_keys_from_dex():
+    """Returns dex signing keys indexed by key id and seconds for which they may be cached"""
     return _get_keys_from_dex()
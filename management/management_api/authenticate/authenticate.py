@@ -17,14 +17,15 @@
 import falcon
 import json
 import time
-import traceback
 from urllib.parse import urlparse
 from jwt import JWT
 from falcon.media.validators import jsonschema
 
-from management_api.config import AuthParameters, USE_SERVICE_ACCOUNT, SERVICE_ACCOUNT_TOKEN_FILE
-from management_api.authenticate.auth_controller import get_auth_controller_url, get_token,\
-    get_keys_from_dex
+from management_api.config import AuthParameters, USE_SERVICE_ACCOUNT, SERVICE_ACCOUNT_TOKEN_FILE, \
+    AUTH_TOKEN_CACHE_SIZE, AUTH_TOKEN_CACHE_TTL
+from management_api.authenticate.auth_controller import get_auth_controller_url, get_token
+from management_api.authenticate.key_store import KeyStore
+from management_api.utils.cache import TTLCache, register_cache, token_digest, token_key_id
 from management_api.utils.logger import get_logger
 from management_api.schemas.authenticate import authenticate_token_schema
 
@@ -52,52 +53,53 @@ class Token():
 
 
 class TokenDecoder:
+    """Verifies tokens with dex keys.
 
-    def __init__(self):
-        self.key_number = None
-        self.keys = None
+    Claims of verified tokens are cached under token digest until token expiry, so clients
+    sending many requests with the same token pay for signature verification once.
+    """
+
+    def __init__(self, cache_size=AUTH_TOKEN_CACHE_SIZE, cache_ttl=AUTH_TOKEN_CACHE_TTL,
+                 key_store=None):
+        self.key_store = key_store or KeyStore()
         self.jwt = JWT()
-        self.last_key_fetch = 0
-        self.min_key_fetch_time_range = 300.0
+        self.verified_tokens = register_cache('verified_tokens',
+                                              TTLCache(maxsize=cache_size, ttl=cache_ttl))
 
     def decode(self, token):
-        logger.info("Checking token: {}".format(token))
-        if not self.keys:
-            self.keys = get_keys_from_dex()
-            self.last_key_fetch = time.time()
-            logger.info("Fetched keys from dex")
-        if self.key_number:
-            try:
-                logger.debug("Trying to decode key number {}".format(self.key_number))
-                return self.jwt.decode(token, self.keys[self.key_number])
-            except Exception as e:
-                logger.info("Failed to decode token with default key")
-                logger.debug(e)
-                pass
-        for idx, key in enumerate(self.keys):
+        digest = token_digest(token)
+        decoded = self.verified_tokens.get(digest)
+        if decoded is not None:
+            return decoded
+        decoded = self._verify(token)
+        if decoded is not None:
+            self.verified_tokens.set(digest, decoded, expires_at=decoded.get('exp'))
+        return decoded
+
+    def _verify(self, token):
+        key_id = token_key_id(token)
+        if key_id is None:
+            candidates = list(self.key_store.keys().values())
+        else:
+            key = self.key_store.get(key_id)
+            if key is None:
+                logger.info("Token signed with unknown key {}".format(key_id))
+                return None
+            candidates = [key]
+        for key in candidates:
             try:
-                logger.info("Trying key number : {}".format(idx))
-                decoded = self.jwt.decode(token, key)
-                self.key_number = idx
-                logger.info("Decoded")
-                return decoded
+                return self.jwt.decode(token, key)
             except Exception as e:
-                logger.info("Failed to decode token, reason: {}".format(str(e)))
-                stacktrace = traceback.format_exc()
-                logger.debug(stacktrace)
-                pass
-        logger.info("Failed to verify token with any available key")
-        if self.last_key_fetch < time.time() - self.min_key_fetch_time_range:
-            logger.info("Fetching new keys from dex and trying again")
-            self.keys = None
-            return self.decode(token)
+                logger.debug("Failed to decode token, reason: {}".format(str(e)))
+        logger.info("Failed to verify token with available keys")
         return None
 
 
 class AuthMiddleware:
 
     def __init__(self):
-        self.admin_endpoints = ['/tenants']
+        self.admin_endpoints = ['/tenants', '/tenants:batch', '/tenants:reconcileSecrets',
+                                '/tenants:usage', '/metrics/caches']
         self.user_endpoints_prefix = '/tenants/'
         self.no_auth_endpoints = ['/authenticate/token', '/authenticate']
         self.admin_user = AuthParameters.ADMIN_SCOPE
@@ -138,7 +140,7 @@ class AuthMiddleware:
             logger.info("Using service account token")
         else:
             req.params['Authorization'] = token
-        logger.info("Decoded token : {}".format(decoded))
+        logger.debug("Decoded token : {}".format(decoded))
         logger.info("Request path: {}, method {}".format(req.path, req.method))
 
     def _token_has_admin_priv(self, decoded):
@@ -0,0 +1,113 @@
+#
+# Copyright (c) 2019 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import threading
+import time
+
+from management_api.authenticate.auth_controller import get_keys_from_dex
+from management_api.config import DEX_KEYS_REFRESH_INTERVAL, DEX_KEYS_MIN_REFRESH_INTERVAL
+from management_api.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class KeyStore:
+    """Dex signing keys indexed by key id.
+
+    Only the very first lookup waits for dex. Afterwards keys are refreshed in background
+    when dex Cache-Control says they may have changed, or sooner when a token signed with
+    an unknown key shows up. At most one fetch runs at a time and fetches triggered by
+    tokens are at least min_refresh_interval apart.
+    """
+
+    def __init__(self, fetch=None, refresh_interval=DEX_KEYS_REFRESH_INTERVAL,
+                 min_refresh_interval=DEX_KEYS_MIN_REFRESH_INTERVAL):
+        self.fetch = fetch or get_keys_from_dex
+        self.refresh_interval = refresh_interval
+        self.min_refresh_interval = min_refresh_interval
+        self.next_refresh = 0
+        self.last_fetch = 0
+        self._keys = {}
+        self._fetch_lock = threading.Lock()
+        self._thread = None
+
+    def get(self, key_id):
+        keys = self.keys()
+        if key_id in keys:
+            return keys[key_id]
+        self.request_refresh()
+        return None
+
+    def keys(self):
+        if not self._keys:
+            self._fetch_initial_keys()
+        return self._keys
+
+    def request_refresh(self):
+        """Starts fetch in background unless one is running or happened recently"""
+        if time.time() - self.last_fetch < self.min_refresh_interval:
+            return None
+        self.last_fetch = time.time()
+        thread = threading.Thread(target=self._refresh_if_idle, name='dex-keys-fetch',
+                                  daemon=True)
+        thread.start()
+        return thread
+
+    def refresh(self):
+        with self._fetch_lock:
+            return self._refresh()
+
+    def _fetch_initial_keys(self):
+        with self._fetch_lock:
+            # requests waiting for the lock reuse result of fetch they waited for
+            if self._keys or time.time() - self.last_fetch < self.min_refresh_interval:
+                return
+            if self._refresh():
+                self._start()
+
+    def _refresh_if_idle(self):
+        if not self._fetch_lock.acquire(blocking=False):
+            return
+        try:
+            self._refresh()
+        finally:
+            self._fetch_lock.release()
+
+    def _refresh(self):
+        self.last_fetch = time.time()
+        try:
+            keys, max_age = self.fetch()
+        except Exception as e:
+            logger.warning("Failed to fetch keys from dex: {}".format(e))
+            self.next_refresh = time.time() + self.min_refresh_interval
+            return False
+        self._keys = keys
+        if max_age is None:
+            max_age = self.refresh_interval
+        self.next_refresh = time.time() + max(max_age, self.min_refresh_interval)
+        return True
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='dex-keys-refresh',
+                                            daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(max(self.next_refresh - time.time(), self.min_refresh_interval))
+            if time.time() >= self.next_refresh:
+                self.refresh()
@@ -38,6 +38,86 @@ SERVICE_ACCOUNT_TOKEN_FILE = "/run/secrets/kubernetes.io/serviceaccount/token"
 
 DEFAULT_MODEL_VERSION_POLICY = '{latest{}}'
 
+# Watch-backed cache of cluster resources, fed with management api own credentials
+K8S_CACHE_ENABLED = os.getenv('K8S_CACHE_ENABLED', "False").lower() == "true"
+K8S_CACHE_MAX_STALENESS = float(os.getenv('K8S_CACHE_MAX_STALENESS', 30))
+K8S_ACCESS_REVIEW_TTL = float(os.getenv('K8S_ACCESS_REVIEW_TTL', 60))
+K8S_ACCESS_REVIEW_CACHE_SIZE = int(os.getenv('K8S_ACCESS_REVIEW_CACHE_SIZE', 4096))
+
+# Kubernetes clients are kept per caller token until token expiry or ttl
+K8S_CLIENT_CACHE_SIZE = int(os.getenv('K8S_CLIENT_CACHE_SIZE', 1024))
+K8S_CLIENT_CACHE_TTL = float(os.getenv('K8S_CLIENT_CACHE_TTL', 3600))
+
+# Claims of verified tokens are reused until token expiry or ttl
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv('AUTH_TOKEN_CACHE_SIZE', 4096))
+AUTH_TOKEN_CACHE_TTL = float(os.getenv('AUTH_TOKEN_CACHE_TTL', 300))
+
+# Dex signing keys are refreshed in background, as often as dex Cache-Control allows
+DEX_KEYS_REFRESH_INTERVAL = float(os.getenv('DEX_KEYS_REFRESH_INTERVAL', 300))
+DEX_KEYS_MIN_REFRESH_INTERVAL = float(os.getenv('DEX_KEYS_MIN_REFRESH_INTERVAL', 10))
+DEX_KEYS_TIMEOUT = float(os.getenv('DEX_KEYS_TIMEOUT', 5))
+
+# Positive tenant existence checks are reused per caller token for a short while
+TENANT_CACHE_TTL = float(os.getenv('TENANT_CACHE_TTL', 10))
+TENANT_CACHE_SIZE = int(os.getenv('TENANT_CACHE_SIZE', 4096))
+
+# Model parts are streamed to Minio with presigned requests
+UPLOAD_PART_URL_EXPIRATION = int(os.getenv('UPLOAD_PART_URL_EXPIRATION', 900))
+UPLOAD_PART_TIMEOUT = float(os.getenv('UPLOAD_PART_TIMEOUT', 300))
+
+# Started uploads are kept as sessions, uploads idle for longer than ttl are aborted
+UPLOAD_SESSION_CACHE_SIZE = int(os.getenv('UPLOAD_SESSION_CACHE_SIZE', 10000))
+UPLOAD_SESSION_TTL = float(os.getenv('UPLOAD_SESSION_TTL', 86400))
+UPLOAD_SESSION_GC_INTERVAL = float(os.getenv('UPLOAD_SESSION_GC_INTERVAL', 600))
+UPLOAD_SWEEP_INTERVAL = float(os.getenv('UPLOAD_SWEEP_INTERVAL', 3600))
+
+# Objects are deleted in batches of 1000 keys, that many batches are sent at once
+MINIO_DELETE_CONCURRENCY = int(os.getenv('MINIO_DELETE_CONCURRENCY', 4))
+
+# Long operations run as background jobs, finished jobs are kept for JOB_RETENTION seconds
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', 4))
+JOB_RETENTION = float(os.getenv('JOB_RETENTION', 3600))
+
+# Models of a tenant are described by a manifest object kept in the tenant bucket
+MODELS_MANIFEST_KEY = os.getenv('MODELS_MANIFEST_KEY', '.models-manifest.json')
+MODELS_MANIFEST_CACHE_SIZE = int(os.getenv('MODELS_MANIFEST_CACHE_SIZE', 256))
+MODELS_MANIFEST_CACHE_TTL = float(os.getenv('MODELS_MANIFEST_CACHE_TTL', 3600))
+MODELS_MANIFEST_MAX_AGE = float(os.getenv('MODELS_MANIFEST_MAX_AGE', 600))
+
+# Model presence answers (e.g. for endpoint creation warning) are reused for a while
+MODEL_PRESENCE_CACHE_SIZE = int(os.getenv('MODEL_PRESENCE_CACHE_SIZE', 4096))
+MODEL_PRESENCE_CACHE_TTL = float(os.getenv('MODEL_PRESENCE_CACHE_TTL', 60))
+
+# Threads for independent calls made at the same time while handling a request
+REQUEST_CONCURRENCY = int(os.getenv('REQUEST_CONCURRENCY', 16))
+
+# Many endpoint operations can be sent in one batch request, that many of them run at once
+ENDPOINT_BATCH_MAX_SIZE = int(os.getenv('ENDPOINT_BATCH_MAX_SIZE', 100))
+ENDPOINT_BATCH_CONCURRENCY = int(os.getenv('ENDPOINT_BATCH_CONCURRENCY', 8))
+
+# Slots of endpoints created through a replica are reserved until their deployments are seen
+ENDPOINT_RESERVATION_TTL = float(os.getenv('ENDPOINT_RESERVATION_TTL', 60))
+
+# Many tenants can be created in one batch request, that many of them are created at once
+TENANT_BATCH_MAX_SIZE = int(os.getenv('TENANT_BATCH_MAX_SIZE', 200))
+TENANT_BATCH_CONCURRENCY = int(os.getenv('TENANT_BATCH_CONCURRENCY', 8))
+
+# Portable secrets are read once per ttl (or watched) and copied to that many namespaces at once
+PORTABLE_SECRETS_CACHE_SIZE = int(os.getenv('PORTABLE_SECRETS_CACHE_SIZE', 256))
+PORTABLE_SECRETS_CACHE_TTL = float(os.getenv('PORTABLE_SECRETS_CACHE_TTL', 60))
+SECRET_PROPAGATION_CONCURRENCY = int(os.getenv('SECRET_PROPAGATION_CONCURRENCY', 16))
+
+# Details of listed tenants (e.g. endpoint count) are read for that many tenants at once
+TENANT_DETAILS_CONCURRENCY = int(os.getenv('TENANT_DETAILS_CONCURRENCY', 16))
+
+# Tenant deletion job waits that long for namespace finalization, asking every poll interval
+TENANT_DELETION_TIMEOUT = float(os.getenv('TENANT_DELETION_TIMEOUT', 600))
+TENANT_DELETION_POLL_INTERVAL = float(os.getenv('TENANT_DELETION_POLL_INTERVAL', 2))
+
+# Storage used by tenants is kept in memory and counted again from all buckets every interval
+USAGE_RECONCILE_INTERVAL = float(os.getenv('USAGE_RECONCILE_INTERVAL', 900))
+USAGE_RECONCILE_CONCURRENCY = int(os.getenv('USAGE_RECONCILE_CONCURRENCY', 4))
+
 
 # AUTH CONTROLLER DEFINITIONS:
 class AuthParameters:
@@ -95,6 +175,10 @@ RESOURCE_DOES_NOT_EXIST = 404
 NAMESPACE_BEING_DELETED = 409
 TERMINATION_IN_PROGRESS = 'Terminating'
 NO_SUCH_BUCKET_EXCEPTION = 'NoSuchBucket'
+NO_SUCH_BUCKET_STATUS = '404'
+NO_SUCH_UPLOAD_EXCEPTION = 'NoSuchUpload'
+NO_SUCH_KEY_EXCEPTION = 'NoSuchKey'
+NOT_MODIFIED_STATUS = '304'
 
 
 class ValidityMessage:
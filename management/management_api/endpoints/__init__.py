@@ -1 +1 @@
-from .endpoints import Endpoints, EndpointScale, Endpoint  # noqa
+from .endpoints import Endpoints, EndpointsBatch, EndpointScale, Endpoint  # noqa
@@ -14,23 +14,33 @@
 # limitations under the License.
 #
 
+import falcon
 import os
 import re
+import time
+import jsonschema
 from botocore.exceptions import ClientError
+from kubernetes import client
 from kubernetes.client.rest import ApiException
 from management_api.config import CRD_GROUP, CRD_VERSION, CRD_PLURAL, \
     CRD_API_VERSION, CRD_KIND, PLATFORM_DOMAIN, DELETE_BODY, DEFAULT_MODEL_VERSION_POLICY, \
-    STATUSES
-from management_api.config import minio_resource
+    STATUSES, ENDPOINT_BATCH_CONCURRENCY, RESOURCE_DOES_NOT_EXIST, WarningMessage
+from management_api.utils.endpoint_slots import reserve_endpoint_slots, \
+    release_endpoint_slot
+from management_api.models.model_utils import model_present
+from management_api.schemas.endpoints import endpoint_post_schema, endpoint_delete_schema, \
+    endpoint_update_schema, endpoint_scale_schema
 from management_api.tenants.tenants_utils import tenant_exists
 from management_api.utils.errors_handling import KubernetesCreateException, \
     KubernetesDeleteException, KubernetesUpdateException, \
     KubernetesGetException, TenantDoesNotExistException, EndpointDoesNotExistException, \
-    EndpointsReachedMaximumException
+    EndpointsReachedMaximumException, ManagementApiException, error_response
+from management_api.utils.concurrency import bounded_map, submit, timed
 from management_api.utils.kubernetes_resources import get_crd_subject_name_and_resources, \
     get_k8s_api_custom_client, get_k8s_api_client, get_k8s_apps_api_client, \
-    validate_quota_compliance, transform_quota, get_replicas, endpoint_exists, \
-    get_endpoint_status
+    validate_quota_compliance, transform_quota, get_replicas, \
+    get_endpoint_status, get_cached_informer, read_resource_quota, check_quota_compliance, \
+    get_endpoint_object, DEPLOYMENTS
 from management_api.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -46,10 +56,23 @@ def create_endpoint(parameters: dict, namespace: str, id_token: str):
     if not tenant_exists(namespace, id_token=id_token):
         raise TenantDoesNotExistException(tenant_name=namespace)
 
+    api_instance = get_k8s_api_client(id_token)
+    if 'resources' in parameters:
+        validate_quota_compliance(api_instance, namespace=namespace,
+                                  endpoint_quota=parameters['resources'])
+
+    apps_api_instance = get_k8s_apps_api_client(id_token)
+    if not reserve_endpoint_slots(api_instance, apps_api_instance, namespace,
+                                  [parameters['endpointName']], id_token):
+        raise EndpointsReachedMaximumException()
+    return create_endpoint_object(parameters, namespace, id_token)
+
+
+def create_endpoint_object(parameters: dict, namespace: str, id_token: str):
+    """Creates InferenceEndpoint, tenant, quota and endpoint slot must be checked first"""
     metadata = {"name": parameters['endpointName']}
     body = {"apiVersion": CRD_API_VERSION, "kind": CRD_KIND,
             "spec": parameters, "metadata": metadata}
-    api_instance = get_k8s_api_client(id_token)
 
     if 'servingName' not in parameters:
         parameters['servingName'] = 'tf-serving'
@@ -58,20 +81,15 @@ def create_endpoint(parameters: dict, namespace: str, id_token: str):
     else:
         parameters['modelVersionPolicy'] = \
             normalize_version_policy(parameters['modelVersionPolicy'])
-
     if 'resources' in parameters:
-        validate_quota_compliance(api_instance, namespace=namespace,
-                                  endpoint_quota=parameters['resources'])
         parameters['resources'] = transform_quota(parameters['resources'])
 
-    apps_api_instance = get_k8s_apps_api_client(id_token)
-    verify_endpoint_amount(api_instance, apps_api_instance, namespace)
-
     custom_obj_api_instance = get_k8s_api_custom_client(id_token)
     try:
         custom_obj_api_instance.create_namespaced_custom_object(CRD_GROUP, CRD_VERSION, namespace,
                                                                 CRD_PLURAL, body)
     except ApiException as apiException:
+        release_endpoint_slot(namespace, parameters['endpointName'])
         raise KubernetesCreateException('endpoint', apiException)
     endpoint_url = create_url_to_service(parameters['endpointName'], namespace)
     logger.info('Endpoint {} created\n'.format(endpoint_url))
@@ -102,73 +120,78 @@ def create_url_to_service(endpoint_name, namespace):
     return path
 
 
-def scale_endpoint(parameters: dict, namespace: str, endpoint_name: str, id_token: str):
-    custom_obj_api_instance = get_k8s_api_custom_client(id_token)
-    try:
-        endpoint_object = custom_obj_api_instance. \
-            get_namespaced_custom_object(CRD_GROUP, CRD_VERSION, namespace, CRD_PLURAL,
-                                         endpoint_name)
-    except ApiException as apiException:
-        raise KubernetesGetException('endpoint', apiException)
-
-    endpoint_object['spec']['replicas'] = parameters['replicas']
+def patch_endpoint_spec(custom_obj_api_instance, namespace: str, endpoint_name: str,
+                        spec: dict):
+    """Sends merge patch with only the given spec fields, the object is not read first.
 
+    Fields hold absolute values, so concurrent patches of different fields do not overwrite
+    each other and no resourceVersion precondition is needed.
+    """
     try:
         custom_obj_api_instance.patch_namespaced_custom_object(
-            CRD_GROUP, CRD_VERSION, namespace, CRD_PLURAL, endpoint_name, endpoint_object)
+            CRD_GROUP, CRD_VERSION, namespace, CRD_PLURAL, endpoint_name, {'spec': spec})
     except ApiException as apiException:
         raise KubernetesUpdateException('endpoint', apiException)
 
+
+def scale_endpoint(parameters: dict, namespace: str, endpoint_name: str, id_token: str):
+    custom_obj_api_instance = get_k8s_api_custom_client(id_token)
+    patch_endpoint_spec(custom_obj_api_instance, namespace, endpoint_name,
+                        {'replicas': parameters['replicas']})
+
     endpoint_url = create_url_to_service(endpoint_name, namespace)
 
     return endpoint_url
 
 
 def update_endpoint(parameters: dict, namespace: str, endpoint_name: str, id_token: str):
-    custom_obj_api_instance = get_k8s_api_custom_client(id_token)
-    try:
-        endpoint_object = custom_obj_api_instance. \
-            get_namespaced_custom_object(CRD_GROUP, CRD_VERSION, namespace, CRD_PLURAL,
-                                         endpoint_name)
-    except ApiException as apiException:
-        raise KubernetesGetException('endpoint', apiException)
-
+    spec = {}
     if 'modelName' in parameters:
-        endpoint_object['spec']['modelName'] = parameters['modelName']
+        spec['modelName'] = parameters['modelName']
     if 'modelVersionPolicy' in parameters:
-        endpoint_object['spec']['modelVersionPolicy'] = \
-            normalize_version_policy(parameters['modelVersionPolicy'])
+        spec['modelVersionPolicy'] = normalize_version_policy(parameters['modelVersionPolicy'])
     if 'resources' in parameters:
-        endpoint_object['spec']['resources'] = transform_quota(parameters['resources'])
+        spec['resources'] = transform_quota(parameters['resources'])
     if 'subjectName' in parameters:
-        endpoint_object['spec']['subjectName'] = parameters['subjectName']
+        spec['subjectName'] = parameters['subjectName']
 
-    try:
-        custom_obj_api_instance.patch_namespaced_custom_object(
-            CRD_GROUP, CRD_VERSION, namespace, CRD_PLURAL, endpoint_name, endpoint_object)
-    except ApiException as apiException:
-        raise KubernetesUpdateException('endpoint', apiException)
+    custom_obj_api_instance = get_k8s_api_custom_client(id_token)
+    patch_endpoint_spec(custom_obj_api_instance, namespace, endpoint_name, spec)
 
     endpoint_url = create_url_to_service(endpoint_name, namespace)
     return endpoint_url
 
 
 def view_endpoint(endpoint_name: str, namespace: str, id_token: str):
-    if not tenant_exists(namespace, id_token=id_token):
-        raise TenantDoesNotExistException(tenant_name=namespace)
-    if not endpoint_exists(endpoint_name, namespace, id_token):
-        raise EndpointDoesNotExistException(endpoint_name=endpoint_name)
     custom_api_instance = get_k8s_api_custom_client(id_token)
     api_instance = get_k8s_api_client(id_token)
     apps_api_instance = get_k8s_apps_api_client(id_token)
 
-    endpoint_status = get_endpoint_status(api_instance=api_instance, namespace=namespace,
-                                          endpoint_name=endpoint_name)
+    # independent reads run at once, so the view takes as long as the slowest of them
+    start = time.perf_counter()
+    tenant = submit(timed, 'tenant check', tenant_exists, namespace, id_token=id_token)
+    endpoint = submit(timed, 'endpoint read', get_endpoint_object, custom_api_instance,
+                      namespace, endpoint_name, id_token)
+    status = submit(timed, 'pods read', get_endpoint_status, api_instance=api_instance,
+                    namespace=namespace, endpoint_name=endpoint_name, id_token=id_token)
+    replicas = submit(timed, 'deployment read', get_replicas,
+                      apps_api_instance=apps_api_instance, namespace=namespace,
+                      endpoint_name=endpoint_name, id_token=id_token)
+
+    if not tenant.result():
+        raise TenantDoesNotExistException(tenant_name=namespace)
+    try:
+        endpoint_object = endpoint.result()
+    except KubernetesGetException as kubernetesGetException:
+        if kubernetesGetException.k8s_api_exception.status == RESOURCE_DOES_NOT_EXIST:
+            raise EndpointDoesNotExistException(endpoint_name=endpoint_name)
+        raise
+    subject_name, resources = get_crd_subject_name_and_resources(endpoint_object)
+    endpoint_status = status.result()
+    replicas = replicas.result()
     endpoint_url = create_url_to_service(endpoint_name, namespace)
-    subject_name, resources = get_crd_subject_name_and_resources(
-        custom_api_instance=custom_api_instance, namespace=namespace, endpoint_name=endpoint_name)
-    replicas = get_replicas(apps_api_instance=apps_api_instance, namespace=namespace,
-                            endpoint_name=endpoint_name)
+    logger.debug(f'Endpoint {endpoint_name} read in '
+                 f'{(time.perf_counter() - start) * 1000:.1f} ms')
 
     view_dict = {'endpoint status': endpoint_status,
                  'endpoint url': endpoint_url,
@@ -183,11 +206,15 @@ def view_endpoint(endpoint_name: str, namespace: str, id_token: str):
 def list_endpoints(namespace: str, id_token: str):
     if not tenant_exists(namespace, id_token=id_token):
         raise TenantDoesNotExistException(tenant_name=namespace)
-    apps_api_instance = get_k8s_apps_api_client(id_token)
-    try:
-        deployments = apps_api_instance.list_namespaced_deployment(namespace)
-    except ApiException as apiException:
-        raise KubernetesGetException('endpoint', apiException)
+    informer = get_cached_informer(DEPLOYMENTS, id_token, 'list', namespace)
+    if informer:
+        deployments = client.V1DeploymentList(items=informer.list(namespace))
+    else:
+        apps_api_instance = get_k8s_apps_api_client(id_token)
+        try:
+            deployments = apps_api_instance.list_namespaced_deployment(namespace)
+        except ApiException as apiException:
+            raise KubernetesGetException('endpoint', apiException)
     endpoints_name_status = get_endpoints_metadata(deployments, namespace)
     logger.info(endpoints_name_status)
     return endpoints_name_status
@@ -210,39 +237,119 @@ def get_endpoints_metadata(deployments, namespace):
     return endpoints_metadata
 
 
-def get_endpoint_number(apps_api_instance, namespace):
-    try:
-        endpoints = apps_api_instance.list_namespaced_deployment(namespace)
-    except ApiException as apiException:
-        raise KubernetesGetException('endpoint', apiException)
-    endpoint_number = len(endpoints.items)
-
-    return endpoint_number
-
-
-def verify_endpoint_amount(api_instance, apps_api_instance, namespace):
-    try:
-        namespace_spec = api_instance.read_namespace(namespace)
-    except ApiException as apiException:
-        raise KubernetesGetException('namespace', apiException)
-    namespace_annotations = namespace_spec.metadata.annotations
-
-    if namespace_annotations and 'maxEndpoints' in namespace_annotations:
-        endpoint_number = get_endpoint_number(apps_api_instance, namespace)
-        if endpoint_number >= int(namespace_annotations['maxEndpoints']):
-            raise EndpointsReachedMaximumException()
-
-
 def check_endpoint_model(namespace, model_name):
     try:
-        bucket = minio_resource.Bucket(name=namespace)
+        return model_present(namespace, model_name)
     except ClientError:
         logger.warning(f'Endpoint was created successfully.'
                        f'"{namespace}" bucket not accessible. '
                        f'Model existence cannot be verified."\n')
         return False
 
-    for object in bucket.objects.filter(Prefix=model_name + '/'):
-        if object.size > 0:
-            return True
-    return False
+
+def batch_create(parameters: dict, namespace: str, id_token: str):
+    endpoint_url = create_endpoint_object(parameters, namespace, id_token)
+    warning_message = '' if check_endpoint_model(namespace, parameters['modelName']) else \
+        WarningMessage.MODEL_AVAILABILITY.format(parameters['modelName'])
+    return {'url': endpoint_url, 'warning': warning_message}
+
+
+def batch_update(parameters: dict, namespace: str, id_token: str):
+    endpoint_name = parameters.pop('endpointName')
+    return {'url': update_endpoint(parameters, namespace, endpoint_name, id_token),
+            'values': parameters}
+
+
+def batch_scale(parameters: dict, namespace: str, id_token: str):
+    endpoint_name = parameters.pop('endpointName')
+    return {'url': scale_endpoint(parameters, namespace, endpoint_name, id_token),
+            'values': parameters}
+
+
+def batch_delete(parameters: dict, namespace: str, id_token: str):
+    return {'url': delete_endpoint(parameters, namespace, id_token)}
+
+
+BATCH_OPERATIONS = {
+    'create': (endpoint_post_schema, batch_create),
+    'update': (endpoint_update_schema, batch_update),
+    'scale': (endpoint_scale_schema, batch_scale),
+    'delete': (endpoint_delete_schema, batch_delete),
+}
+
+
+def check_batch_operations(operations: list, namespace: str, id_token: str):
+    """Returns {index: (status, message)} of operations which must not run.
+
+    Tenant quota and endpoints limit are read once for all create operations, creations
+    over the limit fail in order of the batch. Slots of creations allowed to run are reserved.
+    """
+    errors = {}
+    endpoint_names = set()
+    for index, operation in enumerate(operations):
+        try:
+            jsonschema.validate(operation, BATCH_OPERATIONS[operation['op']][0])
+        except jsonschema.ValidationError as validationError:
+            errors[index] = (falcon.HTTP_BAD_REQUEST,
+                             f'Failed data validation: {validationError.message}')
+        if operation['endpointName'] in endpoint_names:
+            errors[index] = (falcon.HTTP_BAD_REQUEST, f"Endpoint {operation['endpointName']} "
+                                                      f"appears more than once in the batch")
+        endpoint_names.add(operation['endpointName'])
+
+    creations = [index for index, operation in enumerate(operations)
+                 if operation['op'] == 'create' and index not in errors]
+    if not creations:
+        return errors
+    api_instance = get_k8s_api_client(id_token)
+    tenant_quota = None
+    if any('resources' in operations[index] for index in creations):
+        tenant_quota = read_resource_quota(api_instance, name=namespace,
+                                           namespace=namespace).spec.hard
+    for index in creations:
+        if 'resources' in operations[index]:
+            try:
+                check_quota_compliance(tenant_quota, namespace, operations[index]['resources'])
+            except ManagementApiException as managementApiException:
+                errors[index] = error_response(managementApiException)
+
+    creations = [index for index in creations if index not in errors]
+    granted = reserve_endpoint_slots(api_instance, get_k8s_apps_api_client(id_token), namespace,
+                                     [operations[index]['endpointName'] for index in creations],
+                                     id_token)
+    for index in creations[len(granted):]:
+        errors[index] = error_response(EndpointsReachedMaximumException())
+    return errors
+
+
+def run_endpoints_batch(operations: list, namespace: str, id_token: str):
+    """Runs endpoint operations sent in one request, returns results in order of operations.
+
+    Tenant is checked once for the whole batch. Up to ENDPOINT_BATCH_CONCURRENCY operations
+    run at once and a failed operation does not stop the others.
+    """
+    if not tenant_exists(namespace, id_token=id_token):
+        raise TenantDoesNotExistException(tenant_name=namespace)
+    errors = check_batch_operations(operations, namespace, id_token)
+
+    def run(index):
+        operation = operations[index]
+        result = {'op': operation['op'], 'endpointName': operation['endpointName']}
+        if index in errors:
+            result['status'], result['error'] = errors[index]
+            return result
+        parameters = {key: value for key, value in operation.items() if key != 'op'}
+        _, operation_func = BATCH_OPERATIONS[operation['op']]
+        try:
+            result['data'] = operation_func(parameters, namespace, id_token)
+        except Exception as e:
+            result['status'], result['error'] = error_response(e)
+            return result
+        result['status'] = falcon.HTTP_OK
+        return result
+
+    results = list(bounded_map(run, range(len(operations)), ENDPOINT_BATCH_CONCURRENCY))
+    logger.info(f"Endpoints batch in {namespace} tenant: "
+                f"{sum('data' in result for result in results)} of {len(results)} "
+                f"operations succeeded")
+    return results
@@ -21,9 +21,11 @@ from falcon.media.validators import jsonschema
 from management_api.utils.logger import get_logger
 from management_api.config import WarningMessage
 from management_api.endpoints.endpoint_utils import create_endpoint, delete_endpoint, \
-    scale_endpoint, update_endpoint, view_endpoint, list_endpoints, check_endpoint_model
+    scale_endpoint, update_endpoint, view_endpoint, list_endpoints, check_endpoint_model, \
+    run_endpoints_batch
+from management_api.utils.concurrency import submit
 from management_api.schemas.endpoints import endpoint_post_schema, endpoint_delete_schema, \
-    endpoint_update_schema, endpoint_scale_schema
+    endpoint_update_schema, endpoint_scale_schema, endpoint_batch_schema
 
 
 logger = get_logger(__name__)
@@ -41,10 +43,12 @@ class Endpoints(object):
     def on_post(self, req, resp, tenant_name):
         namespace = tenant_name
         body = req.media
+        # model is looked up in Minio while the endpoint is being created
+        model_check = submit(check_endpoint_model, namespace, body["modelName"])
         endpoint_url = create_endpoint(parameters=body, namespace=namespace,
                                        id_token=req.params['Authorization'])
         resp.status = falcon.HTTP_200
-        model_existence = check_endpoint_model(namespace, body["modelName"])
+        model_existence = model_check.result()
         warning_message = '' if model_existence else \
             WarningMessage.MODEL_AVAILABILITY.format(body["modelName"])
         logger.warning(warning_message)
@@ -61,6 +65,19 @@ class Endpoints(object):
         resp.body = json.dumps({'status': 'DELETED', 'data': {'url': endpoint_url}})
 
 
+class EndpointsBatch(object):
+    @jsonschema.validate(endpoint_batch_schema)
+    def on_post(self, req, resp, tenant_name):
+        namespace = tenant_name
+        results = run_endpoints_batch(req.media['operations'], namespace,
+                                      id_token=req.params['Authorization'])
+        failed = sum('error' in result for result in results)
+        resp.status = falcon.HTTP_200
+        resp.body = json.dumps({'status': 'OK', 'data': {'results': results,
+                                                         'succeeded': len(results) - failed,
+                                                         'failed': failed}})
+
+
 class EndpointScale(object):
     @jsonschema.validate(endpoint_scale_schema)
     def on_patch(self, req, resp, tenant_name, endpoint_name):
@@ -0,0 +1,121 @@
+#
+# Copyright (c) 2019 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from management_api.config import JOB_WORKERS, JOB_RETENTION
+from management_api.utils.cache import token_digest
+from management_api.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class JobStatus:
+    PENDING = 'pending'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+
+
+class Job:
+
+    def __init__(self, kind, tenant, owner=None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.tenant = tenant
+        self.owner = token_digest(owner) if owner else None
+        self.status = JobStatus.PENDING
+        self.progress = {}
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+
+    def finished(self):
+        return self.finished_at is not None
+
+    def owned_by(self, id_token):
+        return self.owner is not None and self.owner == token_digest(id_token)
+
+    def to_dict(self):
+        return {'id': self.id, 'kind': self.kind, 'tenant': self.tenant, 'status': self.status,
+                'progress': dict(self.progress), 'result': self.result, 'error': self.error,
+                'createdAt': self.created_at, 'finishedAt': self.finished_at}
+
+
+class JobRegistry:
+    """Runs long operations in background, jobs are known only to the replica running them.
+
+    Function of a job gets the job as first argument, so it can report progress, and its
+    return value becomes job result. Finished jobs are forgotten after retention seconds.
+    Job with an owner can be read with the owner token also when its tenant is gone.
+    """
+
+    def __init__(self, max_workers=JOB_WORKERS, retention=JOB_RETENTION):
+        self.max_workers = max_workers
+        self.retention = retention
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def submit(self, kind, tenant, func, *args, owner=None):
+        job = Job(kind, tenant, owner=owner)
+        with self._lock:
+            self._purge()
+            self._jobs[job.id] = job
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='jobs')
+        self._executor.submit(self._run, job, func, args)
+        logger.info(f'Job {job.id} ({kind}) in {tenant} tenant submitted')
+        return job
+
+    def _run(self, job, func, args):
+        job.status = JobStatus.RUNNING
+        try:
+            job.result = func(job, *args)
+            job.status = JobStatus.SUCCEEDED
+            logger.info(f'Job {job.id} ({job.kind}) in {job.tenant} tenant succeeded')
+        except Exception as e:
+            job.error = str(e) or type(e).__name__
+            job.status = JobStatus.FAILED
+            logger.error(f'Job {job.id} ({job.kind}) in {job.tenant} tenant failed: {e}')
+        finally:
+            job.finished_at = time.time()
+
+    def get(self, job_id):
+        with self._lock:
+            self._purge()
+            return self._jobs.get(job_id)
+
+    def find(self, kind, tenant):
+        """Returns unfinished job of the kind in the tenant or None"""
+        with self._lock:
+            return next((job for job in self._jobs.values() if job.kind == kind and
+                         job.tenant == tenant and not job.finished()), None)
+
+    def _purge(self):
+        expired_before = time.time() - self.retention
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job.finished() and job.finished_at < expired_before]:
+            del self._jobs[job_id]
+
+
+jobs = JobRegistry()
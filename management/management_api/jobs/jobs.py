@@ -0,0 +1,37 @@
+#
+# Copyright (c) 2019 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import falcon
+import json
+
+from management_api.jobs.job_utils import jobs
+from management_api.tenants.tenants_utils import tenant_exists
+from management_api.utils.errors_handling import TenantDoesNotExistException, \
+    JobDoesNotExistException
+
+
+class Job(object):
+    def on_get(self, req, resp, tenant_name, job_id):
+        namespace = tenant_name
+        id_token = req.params['Authorization']
+        job = jobs.get(job_id)
+        owned = job is not None and job.tenant == namespace and job.owned_by(id_token)
+        if not owned and not tenant_exists(namespace, id_token=id_token):
+            raise TenantDoesNotExistException(tenant_name=namespace)
+        if job is None or job.tenant != namespace:
+            raise JobDoesNotExistException(job_id)
+        resp.status = falcon.HTTP_OK
+        resp.body = json.dumps({'status': 'OK', 'data': job.to_dict()})
@@ -19,10 +19,14 @@ from gevent import pywsgi
 import falcon
 
 
-from management_api.config import HOSTNAME, PORT
+from management_api.config import HOSTNAME, PORT, K8S_CACHE_ENABLED, USAGE_RECONCILE_INTERVAL, \
+    UPLOAD_SESSION_GC_INTERVAL
 from management_api.utils.routes import register_routes
 from management_api.utils.logger import get_logger
 from management_api.utils.errors_handling import add_error_handlers
+from management_api.utils.kubernetes_resources import start_resource_cache
+from management_api.tenants.tenant_usage import tenant_usage
+from management_api.upload.sessions import upload_sessions
 from management_api.authenticate import AuthMiddleware
 
 logger = get_logger(__name__)
@@ -32,6 +36,12 @@ def create_app():
     app = falcon.API(middleware=[AuthMiddleware()])
     add_error_handlers(app)
     register_routes(app)
+    if K8S_CACHE_ENABLED:
+        start_resource_cache()
+    if USAGE_RECONCILE_INTERVAL:
+        tenant_usage.start()
+    if UPLOAD_SESSION_GC_INTERVAL:
+        upload_sessions.start()
     return app
 
 
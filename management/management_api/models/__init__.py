@@ -1 +1 @@
-from .models import Models  # noqa
+from .models import Models, FinalizeModel, ModelEndpoints  # noqa
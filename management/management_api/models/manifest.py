@@ -0,0 +1,263 @@
+#
+# Copyright (c) 2019 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import copy
+import json
+import threading
+import time
+
+from botocore.exceptions import ClientError
+
+from management_api.config import minio_client, MODELS_MANIFEST_KEY, \
+    MODELS_MANIFEST_CACHE_SIZE, MODELS_MANIFEST_CACHE_TTL, MODELS_MANIFEST_MAX_AGE, \
+    NO_SUCH_KEY_EXCEPTION, NOT_MODIFIED_STATUS, RESOURCE_DOES_NOT_EXIST
+from management_api.utils.cache import TTLCache, register_cache
+from management_api.utils.errors_handling import MinioCallException
+from management_api.utils.logger import get_logger
+from management_api.utils.minio_objects import list_pages
+
+logger = get_logger(__name__)
+
+MANIFEST_FORMAT = 1
+UPDATE_ATTEMPTS = 3
+UPDATE_LOCK_STRIPES = 64
+
+manifests = register_cache('models_manifests',
+                           TTLCache(MODELS_MANIFEST_CACHE_SIZE, MODELS_MANIFEST_CACHE_TTL))
+# buckets share a fixed number of locks, so there is no lock to forget when a tenant is deleted
+_update_locks = [threading.Lock() for _ in range(UPDATE_LOCK_STRIPES)]
+
+# Manifest kept in every tenant bucket looks like:
+# {"format": 1, "models": {"resnet/1": {"name": "resnet", "version": "1", "size": 1024,
+#  "finalized": false, "files": {"saved_model.pb": {"size": 1024, "etag": "..."}},
+#  "dirs": ["variables/"]}}, "builtAt": 1546300800.0}
+# dirs (directory markers, e.g. created with /upload/dir) are missing in older manifests,
+# builtAt is time of the last bucket listing the manifest was built from
+
+
+def split_model_path(key: str):
+    """Returns (name, version, file) of model file key or None for other objects"""
+    path = key.split('/', 2)
+    if len(path) < 3 or not path[2] or path[2].endswith('/'):
+        return None
+    return tuple(path)
+
+
+def empty_manifest():
+    return {'format': MANIFEST_FORMAT, 'models': {}}
+
+
+def model_entry(manifest: dict, name: str, version):
+    return manifest['models'].get(f'{name}/{version}')
+
+
+def split_dir_path(key: str):
+    """Returns (name, version, dir) of directory marker key of a model or None"""
+    path = key.split('/', 2)
+    if len(path) < 3 or not key.endswith('/'):
+        return None
+    return tuple(path)
+
+
+def _add_entry(manifest: dict, name: str, version: str):
+    return manifest['models'].setdefault(f'{name}/{version}', {
+        'name': name, 'version': version, 'size': 0, 'finalized': False, 'files': {}})
+
+
+def add_dir(manifest: dict, key: str):
+    dir_path = split_dir_path(key)
+    if dir_path is None:
+        return
+    name, version, dir_name = dir_path
+    dirs = _add_entry(manifest, name, version).setdefault('dirs', [])
+    if dir_name not in dirs:
+        dirs.append(dir_name)
+        dirs.sort()
+
+
+def add_file(manifest: dict, key: str, size: int, etag: str):
+    if size == 0 and key.endswith('/'):
+        add_dir(manifest, key)
+        return
+    model_path = split_model_path(key)
+    if model_path is None or size <= 0:
+        return
+    name, version, file_name = model_path
+    entry = _add_entry(manifest, name, version)
+    entry['files'][file_name] = {'size': size, 'etag': etag}
+    entry['size'] = sum(file['size'] for file in entry['files'].values())
+
+
+def manifest_objects(manifest: dict):
+    """Returns model files of the manifest as sorted list of objects like in Minio listing"""
+    objects = [{'Key': f"{entry['name']}/{entry['version']}/{file_name}",
+                'Size': file['size'], 'ETag': file['etag']}
+               for entry in manifest['models'].values()
+               for file_name, file in entry['files'].items()]
+    objects += [{'Key': f"{entry['name']}/{entry['version']}/{dir_name}", 'Size': 0}
+                for entry in manifest['models'].values()
+                for dir_name in entry.get('dirs', [])]
+    return sorted(objects, key=lambda object: object['Key'])
+
+
+def read_manifest(bucket: str):
+    """Returns manifest of the bucket or None if there is none.
+
+    Cached copy is revalidated with conditional GET, so it is never older than the object,
+    also when the manifest is updated through another replica. Returned manifest is shared,
+    it must not be modified.
+    """
+    cached = manifests.get(bucket)
+    conditions = {'IfNoneMatch': cached[0]} if cached else {}
+    try:
+        response = minio_client.get_object(Bucket=bucket, Key=MODELS_MANIFEST_KEY, **conditions)
+    except ClientError as clientError:
+        code = clientError.response['Error']['Code']
+        if code == NOT_MODIFIED_STATUS and cached:
+            return cached[1]
+        if code in (NO_SUCH_KEY_EXCEPTION, str(RESOURCE_DOES_NOT_EXIST)):
+            manifests.pop(bucket)
+            return None
+        raise MinioCallException(f'An error occurred during models manifest reading: '
+                                 f'{clientError}')
+    manifest = json.loads(response['Body'].read())
+    manifests.set(bucket, (response['ETag'], manifest))
+    return manifest
+
+
+def write_manifest(bucket: str, manifest: dict):
+    body = json.dumps(manifest, separators=(',', ':')).encode('utf-8')
+    try:
+        response = minio_client.put_object(Bucket=bucket, Key=MODELS_MANIFEST_KEY, Body=body,
+                                           ContentType='application/json')
+    except ClientError as clientError:
+        raise MinioCallException(f'An error occurred during models manifest writing: '
+                                 f'{clientError}')
+    manifests.set(bucket, (response['ETag'], manifest))
+
+
+def build_manifest(bucket: str, prefix: str = ''):
+    """Returns manifest describing objects with the prefix, made with a listing of them"""
+    manifest = empty_manifest()
+    manifest['builtAt'] = time.time()
+    try:
+        for objects in list_pages(bucket, prefix):
+            for object in objects:
+                add_file(manifest, object['Key'], object['Size'], object.get('ETag'))
+    except ClientError as clientError:
+        raise MinioCallException(f'An error occurred during bucket reading: {clientError}')
+    return manifest
+
+
+def invalidate_manifest(bucket: str):
+    """Removes manifest, so readers list the bucket until it is built again"""
+    manifests.pop(bucket)
+    try:
+        minio_client.delete_object(Bucket=bucket, Key=MODELS_MANIFEST_KEY)
+    except ClientError as clientError:
+        logger.error(f'Could not remove models manifest of {bucket}: {clientError}')
+
+
+def update_manifest(bucket: str, update):
+    """Applies update function to the manifest of the bucket and stores the result.
+
+    Manifest is built from bucket listing if it does not exist yet. Object storage offers
+    no compare-and-swap, so the update is applied again to a fresh copy after writing and
+    written again if a concurrent writer (other replica) dropped it. Manifest which cannot
+    be brought up to date is removed, so it never describes models wrongly.
+    """
+    with _update_locks[hash(bucket) % UPDATE_LOCK_STRIPES]:
+        try:
+            for attempt in range(UPDATE_ATTEMPTS + 1):
+                manifest = read_manifest(bucket)
+                manifest = copy.deepcopy(manifest) if manifest else build_manifest(bucket)
+                before = json.dumps(manifest, sort_keys=True)
+                update(manifest)
+                if attempt and json.dumps(manifest, sort_keys=True) == before:
+                    return manifest
+                if attempt == UPDATE_ATTEMPTS:
+                    break
+                write_manifest(bucket, manifest)
+        except MinioCallException as minioCallException:
+            logger.error(f'Models manifest of {bucket} could not be updated: '
+                         f'{minioCallException}')
+        invalidate_manifest(bucket)
+        return None
+
+
+def manifest_stale(manifest: dict):
+    return time.time() - manifest.get('builtAt', 0) > MODELS_MANIFEST_MAX_AGE
+
+
+def rebuild_manifest(bucket: str):
+    """Replaces models of the manifest with ones listed in the bucket, returns new manifest.
+
+    Objects written to Minio directly are recorded this way. Finalization of versions which
+    are still stored is kept.
+    """
+    listed = build_manifest(bucket)
+
+    def replace_models(manifest):
+        models = copy.deepcopy(listed['models'])
+        for path, entry in models.items():
+            previous = manifest['models'].get(path, {})
+            if previous.get('finalized'):
+                entry['finalized'] = True
+                entry['finalizedAt'] = previous.get('finalizedAt')
+        manifest['models'] = models
+        manifest['builtAt'] = listed['builtAt']
+
+    return update_manifest(bucket, replace_models)
+
+
+def record_model_file(bucket: str, key: str):
+    """Adds uploaded file to the manifest, failures only make readers list the bucket"""
+    try:
+        head = minio_client.head_object(Bucket=bucket, Key=key)
+    except ClientError as clientError:
+        logger.error(f'Could not read {key} metadata for models manifest: {clientError}')
+        invalidate_manifest(bucket)
+        return
+    update_manifest(bucket, lambda manifest: add_file(manifest, key, head['ContentLength'],
+                                                      head['ETag']))
+
+
+def record_model_dir(bucket: str, key: str):
+    """Adds created directory marker to the manifest"""
+    update_manifest(bucket, lambda manifest: add_dir(manifest, key))
+
+
+def finalize_model_version(bucket: str, name: str, version):
+    """Replaces manifest entry of the model version with one made from listing its files"""
+    listed = build_manifest(bucket, prefix=f'{name}/{version}/')
+    entry = model_entry(listed, name, version)
+    if entry is None:
+        return None
+    entry['finalized'] = True
+    entry['finalizedAt'] = time.time()
+
+    def replace_entry(manifest):
+        manifest['models'][f'{name}/{version}'] = entry
+
+    update_manifest(bucket, replace_entry)
+    return entry
+
+
+def remove_model_version(bucket: str, name: str, version):
+    def remove_entry(manifest):
+        manifest['models'].pop(f'{name}/{version}', None)
+
+    update_manifest(bucket, remove_entry)
@@ -14,86 +14,331 @@
 # limitations under the License.
 #
 
-import argparse
+import base64
+import binascii
+import json
+import re
 from botocore.exceptions import ClientError
 
-from management_api.config import minio_resource
+from management_api.config import minio_client, MODEL_PRESENCE_CACHE_SIZE, \
+    MODEL_PRESENCE_CACHE_TTL, DEFAULT_MODEL_VERSION_POLICY
 from management_api.utils.errors_handling import ModelDoesNotExistException, \
-    TenantDoesNotExistException, MinioCallException
+    TenantDoesNotExistException, MinioCallException, InvalidParamException, \
+    ModelDeleteException
+from management_api.jobs.job_utils import jobs
+from management_api.models.manifest import read_manifest, manifest_objects, model_entry, \
+    remove_model_version, finalize_model_version, manifest_stale, rebuild_manifest
 from management_api.tenants.tenants_utils import tenant_exists
+from management_api.tenants.tenant_usage import tenant_usage
+from management_api.utils.cache import TTLCache, register_cache
+from management_api.utils.kubernetes_resources import get_k8s_api_custom_client, \
+    get_model_endpoints
+from management_api.utils.minio_objects import delete_objects, prefix_exists, list_prefixes, \
+    list_pages
 from management_api.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
 
-def list_models(namespace: str, id_token):
+LIST_PAGE_SIZE = 1000
+MODEL_PROBE_KEYS = 10
+
+model_presence = register_cache('model_presence',
+                                TTLCache(MODEL_PRESENCE_CACHE_SIZE, MODEL_PRESENCE_CACHE_TTL))
+
+
+def encode_continue_token(token: dict):
+    return base64.urlsafe_b64encode(json.dumps(token).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_continue_token(token: str):
+    """Returns list_objects_v2 arguments (ContinuationToken or StartAfter) encoded in token"""
+    try:
+        token += '=' * (-len(token) % 4)
+        decoded = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+    except (binascii.Error, ValueError, UnicodeError):
+        decoded = None
+    if isinstance(decoded, dict) and isinstance(decoded.get('c'), str):
+        return {'ContinuationToken': decoded['c']}
+    if isinstance(decoded, dict) and isinstance(decoded.get('a'), str):
+        return {'StartAfter': decoded['a']}
+    raise InvalidParamException('continue', 'Invalid continue token',
+                                'Use the token returned with the previous page.')
+
+
+class ModelList:
+    """Models of a tenant bucket, listed page by page while being iterated.
+
+    One entry is returned per model file or, when aggregated, per model version with total
+    size and number of files. With limit set, iteration stops after limit entries and
+    next_token allows to continue from there; it is known once the iteration ends.
+    When models manifest is given, models are listed from it as if it was a single page.
+    """
+
+    def __init__(self, namespace: str, aggregate=False, limit=None, continue_token=None,
+                 manifest=None):
+        self.namespace = namespace
+        self.aggregate = aggregate
+        self.limit = limit
+        self.next_token = None
+        self.count = 0
+        list_args = decode_continue_token(continue_token) if continue_token else {}
+        if manifest is not None and 'ContinuationToken' not in list_args:
+            start_after = list_args.get('StartAfter', '')
+            self._first_page = {'Contents': [object for object in manifest_objects(manifest)
+                                             if object['Key'] > start_after]}
+        else:
+            # first page is read eagerly, so Minio errors are reported before streaming starts
+            self._first_page = self._list_page(list_args)
+
+    def _list_page(self, list_args):
+        page_size = self.limit if self.limit and not self.aggregate else LIST_PAGE_SIZE
+        try:
+            return minio_client.list_objects_v2(Bucket=self.namespace, MaxKeys=page_size,
+                                                **list_args)
+        except ClientError as clientError:
+            raise MinioCallException(f'An error occurred during bucket reading: {clientError}')
+
+    def _pages(self):
+        page = self._first_page
+        while True:
+            yield page
+            if not page.get('IsTruncated'):
+                return
+            page = self._list_page({'ContinuationToken': page['NextContinuationToken']})
+
+    def __iter__(self):
+        models = self._aggregated() if self.aggregate else self._files()
+        for model in models:
+            self.count += 1
+            yield model
+        logger.info(f'Listed {self.count} models in {self.namespace} tenant')
+
+    def _files(self):
+        for page in self._pages():
+            contents = page.get('Contents', [])
+            for index, object in enumerate(contents):
+                model_path = object['Key'].split('/', 2)
+                if object['Size'] > 0 and len(model_path) > 1:
+                    yield {'path': object['Key'], 'name': model_path[0],
+                           'version': model_path[1], 'size': object['Size']}
+                    if self.count == self.limit and index + 1 < len(contents):
+                        self.next_token = encode_continue_token({'a': object['Key']})
+                        return
+            if self.limit and page.get('IsTruncated'):
+                self.next_token = encode_continue_token({'c': page['NextContinuationToken']})
+                return
+
+    def _aggregated(self):
+        model = None
+        last_key = None
+        for page in self._pages():
+            for object in page.get('Contents', []):
+                model_path = object['Key'].split('/', 2)
+                if len(model_path) < 2:
+                    continue
+                name, version = model_path[:2]
+                if model is not None and (name, version) != (model['name'], model['version']):
+                    if model['files']:
+                        yield model
+                        if self.count == self.limit:
+                            self.next_token = encode_continue_token({'a': last_key})
+                            return
+                    model = None
+                if model is None:
+                    model = {'name': name, 'version': version, 'size': 0, 'files': 0}
+                if object['Size'] > 0:
+                    model['size'] += object['Size']
+                    model['files'] += 1
+                last_key = object['Key']
+        if model is not None and model['files']:
+            yield model
+
+
+def list_models(namespace: str, id_token, aggregate=False, limit=None, continue_token=None):
     # TODO Add checking if model is used by endpoint
     if not tenant_exists(namespace, id_token):
         raise TenantDoesNotExistException(namespace)
+    return ModelList(namespace, aggregate=aggregate, limit=limit, continue_token=continue_token,
+                     manifest=get_manifest(namespace))
 
+
+def get_manifest(namespace: str):
+    """Returns models manifest of the tenant or None if models have to be listed"""
     try:
-        bucket = minio_resource.Bucket(name=namespace)
-    except ClientError as clientError:
-        raise MinioCallException(f'An error occurred during bucket reading: {clientError}')
+        manifest = read_manifest(namespace)
+        if manifest is not None and manifest_stale(manifest):
+            manifest = rebuild_manifest(namespace)
+        return manifest
+    except MinioCallException as minioCallException:
+        logger.warning(f'Models manifest of {namespace} tenant not available: '
+                       f'{minioCallException}')
+        return None
+
+
+def delete_model(parameters: dict, namespace: str, id_token, force=False):
+    if not tenant_exists(namespace, id_token):
+        raise TenantDoesNotExistException(namespace)
+    if not force:
+        check_model_not_used(namespace, parameters['modelName'], parameters['modelVersion'],
+                             id_token)
 
-    models = []
-    for object in bucket.objects.all():
-        if object.size > 0:
-            model = dict()
-            model_path = object.key.split('/', 2)
-            model['path'] = object.key
-            model['name'] = model_path[0]
-            model['version'] = model_path[1]
-            model['size'] = object.size
-            models.append(model)
+    model_path = f"{parameters['modelName']}/{parameters['modelVersion']}/"
+    deleted = delete_model_objects(namespace, model_path)
+    if not deleted:
+        raise ModelDoesNotExistException(model_path)
+    remove_model_version(namespace, parameters['modelName'], parameters['modelVersion'])
+    tenant_usage.record(namespace)
+    invalidate_model_presence(namespace, parameters['modelName'])
 
-    logger.info(f'Models present in {namespace} tenant: {models}')
-    return models
+    logger.info(f'Model {model_path} deleted')
+    return model_path
 
 
-def delete_model(parameters: dict, namespace: str, id_token):
-    # TODO Add checking if model is used by endpoint
+def finalize_model(parameters: dict, namespace: str, id_token):
+    """Records files of uploaded model version in models manifest, returns its summary"""
     if not tenant_exists(namespace, id_token):
         raise TenantDoesNotExistException(namespace)
 
-    model_path = f"{parameters['modelName']}/{parameters['modelVersion']}/"
-    bucket = minio_resource.Bucket(name=namespace)
-    model_in_bucket = bucket.objects.filter(Prefix=model_path)
+    entry = finalize_model_version(namespace, parameters['modelName'],
+                                   parameters['modelVersion'])
+    tenant_usage.record(namespace)
+    if entry is None:
+        raise ModelDoesNotExistException(f"{parameters['modelName']}/"
+                                         f"{parameters['modelVersion']}/")
+    logger.info(f"Model {entry['name']}/{entry['version']} finalized in {namespace} tenant")
+    return {'name': entry['name'], 'version': entry['version'], 'size': entry['size'],
+            'files': len(entry['files'])}
+
+
+def start_model_deletion(parameters: dict, namespace: str, id_token, force=False):
+    """Returns background job deleting the model, for models too big to delete in a request"""
+    if not tenant_exists(namespace, id_token):
+        raise TenantDoesNotExistException(namespace)
+    if not force:
+        check_model_not_used(namespace, parameters['modelName'], parameters['modelVersion'],
+                             id_token)
 
-    if not model_exists(model_in_bucket):
+    model_path = f"{parameters['modelName']}/{parameters['modelVersion']}/"
+    if not model_exists(namespace, model_path):
         raise ModelDoesNotExistException(model_path)
 
-    for key in model_in_bucket:
-        key.delete()
+    return model_path, jobs.submit('delete_model', namespace, delete_model_job, namespace,
+                                   model_path)
+
+
+def delete_model_job(job, namespace: str, model_path: str):
+    def progress(deleted):
+        job.progress['deletedObjects'] = deleted
 
+    deleted = delete_model_objects(namespace, model_path, progress=progress)
+    remove_model_version(namespace, *model_path.split('/')[:2])
+    tenant_usage.record(namespace)
+    invalidate_model_presence(namespace, model_path.split('/')[0])
     logger.info(f'Model {model_path} deleted')
-    return model_path
+    return {'model_path': model_path, 'deletedObjects': deleted}
+
 
+def delete_model_objects(namespace: str, model_path: str, progress=None):
+    try:
+        deleted = delete_objects(namespace, prefix=model_path, progress=progress)
+    except ClientError as clientError:
+        raise MinioCallException(f'An error occurred during model deletion: {clientError}')
+    logger.info(f'{deleted} objects of {model_path} model deleted from {namespace} tenant')
+    return deleted
 
-def endpoints_using_model(deployments, model_path):
-    endpoint_names = []
-    for item in deployments.to_dict()['items']:
-        endpoint_name = item['metadata']['labels']['endpoint']
-        arg = item['spec']['template']['spec']['containers'][0]['args'][0]
-        model_base_path = get_model_base_path(arg)
-        if model_path == model_base_path:
-            endpoint_names.append(endpoint_name)
 
-    return endpoint_names
+def stored_versions(namespace: str, model_name: str):
+    """Returns numeric versions of the model stored in the tenant bucket, highest first"""
+    try:
+        prefixes = list(list_prefixes(namespace, f'{model_name}/'))
+    except ClientError as clientError:
+        raise MinioCallException(f'An error occurred during bucket reading: {clientError}')
+    versions = [prefix[len(model_name) + 1:].rstrip('/') for prefix in prefixes]
+    return sorted((int(version) for version in versions if version.isdigit()), reverse=True)
+
+
+def served_versions(version_policy: str, versions: list):
+    """Returns versions served under the policy or None if any version may be served.
+
+    Latest policy serves num_versions (1 by default) highest of stored versions, given
+    highest first.
+    """
+    if 'specific' in version_policy:
+        return set(int(version) for version in
+                   re.findall(r'versions:\s*(\d+)', version_policy))
+    if 'latest' in version_policy:
+        num_versions = re.search(r'num_versions:\s*(\d+)', version_policy)
+        return set(versions[:int(num_versions.group(1)) if num_versions else 1])
+    return None
+
+
+def endpoints_using_model(namespace: str, model_name: str, id_token, model_version=None):
+    """Returns endpoints serving the model (or its version, if given), sorted by name.
+
+    Endpoints are found by modelName of InferenceEndpoint specs, so every serving template
+    is covered. Versions served under latest policy are found from versions stored in the
+    bucket, which are listed only when such an endpoint exists. All versions policy may
+    serve any version.
+    """
+    endpoints = []
+    versions = None
+    crds = get_model_endpoints(get_k8s_api_custom_client(id_token), namespace, model_name,
+                               id_token)
+    for crd in crds:
+        spec = crd['spec']
+        version_policy = spec.get('modelVersionPolicy', DEFAULT_MODEL_VERSION_POLICY)
+        if model_version is not None:
+            if versions is None and 'latest' in version_policy:
+                versions = stored_versions(namespace, model_name)
+            served = served_versions(version_policy, versions)
+            if served is not None and int(model_version) not in served:
+                continue
+        endpoints.append({'name': crd['metadata']['name'],
+                          'servingName': spec.get('servingName'),
+                          'modelVersionPolicy': version_policy})
+    return sorted(endpoints, key=lambda endpoint: endpoint['name'])
+
+
+def check_model_not_used(namespace: str, model_name: str, model_version, id_token):
+    endpoints = endpoints_using_model(namespace, model_name, id_token, model_version)
+    if endpoints:
+        endpoint_names = ', '.join(endpoint['name'] for endpoint in endpoints)
+        raise ModelDeleteException(f'{model_name}/{model_version}/ may be served by endpoints: '
+                                   f'{endpoint_names}. Delete them first or use force=true.')
+
+
+def model_exists(namespace: str, model_path: str):
+    manifest = get_manifest(namespace)
+    if manifest is not None and model_entry(manifest, *model_path.split('/')[:2]):
+        return True
+    # files uploaded to Minio directly are not in the manifest
+    try:
+        return prefix_exists(namespace, model_path)
+    except ClientError as clientError:
+        raise MinioCallException(f'An error occurred during bucket reading: {clientError}')
+
 
+def model_present(namespace: str, model_name: str):
+    """Tells if any file of the model is stored, directory markers alone do not count.
 
-def model_exists(model):
-    model_keys = sum(1 for _ in model)
-    if model_keys == 0:
-        return False
-    return True
+    Models manifest is consulted first. Otherwise the model is listed in short pages until
+    a non empty object shows up, which usually is on the first page. Answers are cached
+    until the model is uploaded or deleted.
+    """
+    present = model_presence.get((namespace, model_name))
+    if present is None:
+        manifest = get_manifest(namespace)
+        present = manifest is not None and \
+            any(entry['name'] == model_name and entry['files']
+                for entry in manifest['models'].values())
+        # files uploaded to Minio directly are not in the manifest
+        present = present or any(object['Size'] > 0 for objects in
+                                 list_pages(namespace, f'{model_name}/', MODEL_PROBE_KEYS)
+                                 for object in objects)
+        model_presence.set((namespace, model_name), present)
+    return present
 
 
-def get_model_base_path(args):
-    parser = argparse.ArgumentParser()
-    parser.add_argument('tensorflow_model_server')
-    parser.add_argument('--port')
-    parser.add_argument('--model_name')
-    parser.add_argument('--model_base_path')
-    model_base_path = parser.parse_args(args.split()).model_base_path.strip('\"').split('/')[-1]
-    return model_base_path
+def invalidate_model_presence(namespace: str, model_name: str):
+    model_presence.pop((namespace, model_name))
@@ -18,22 +18,79 @@ import falcon
 from falcon.media.validators import jsonschema
 import json
 
-from management_api.models.model_utils import list_models, delete_model
-from management_api.schemas.models import model_delete_schema
+from management_api.models.model_utils import list_models, delete_model, start_model_deletion, \
+    finalize_model, endpoints_using_model, LIST_PAGE_SIZE
+from management_api.schemas.models import model_delete_schema, model_finalize_schema
+from management_api.tenants.tenants_utils import tenant_exists
+from management_api.utils.errors_handling import TenantDoesNotExistException
+from management_api.utils.params import param_is_true, get_limit
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def stream_models(models):
+    """Yields JSON response listing models in chunks, so it is never held in memory whole"""
+    chunk = '{"status": "OK", "data": {"models": ['
+    separator = ''
+    for model in models:
+        chunk += separator + json.dumps(model)
+        separator = ', '
+        if len(chunk) >= STREAM_CHUNK_SIZE:
+            yield chunk.encode('utf-8')
+            chunk = ''
+    chunk += ']'
+    next_token = getattr(models, 'next_token', None)
+    if next_token:
+        chunk += ', "continue": ' + json.dumps(next_token)
+    yield (chunk + '}}').encode('utf-8')
 
 
 class Models(object):
     def on_get(self, req, resp, tenant_name):
         namespace = tenant_name
-        response = list_models(namespace, req.params['Authorization'])
+        models = list_models(namespace, req.params['Authorization'],
+                             aggregate=param_is_true(req, 'aggregate'),
+                             limit=get_limit(req, LIST_PAGE_SIZE),
+                             continue_token=req.get_param('continue'))
         resp.status = falcon.HTTP_OK
-        resp.body = json.dumps({'status': 'OK', 'data': {'models': response}})
+        resp.stream = stream_models(models)
 
     @jsonschema.validate(model_delete_schema)
     def on_delete(self, req, resp, tenant_name):
         """Handles DELETE requests"""
         namespace = tenant_name
         body = req.media
-        response = delete_model(body, namespace, req.params['Authorization'])
+        force = param_is_true(req, 'force')
+        if param_is_true(req, 'async'):
+            response, job = start_model_deletion(body, namespace, req.params['Authorization'],
+                                                 force=force)
+            resp.status = falcon.HTTP_ACCEPTED
+            resp.location = f'/tenants/{namespace}/jobs/{job.id}'
+            resp.body = json.dumps({'status': 'ACCEPTED', 'data': {'model_path': response,
+                                                                   'job': job.to_dict()}})
+            return
+        response = delete_model(body, namespace, req.params['Authorization'], force=force)
         resp.status = falcon.HTTP_OK
         resp.body = json.dumps({'status': 'DELETED', 'data': {'model_path': response}})
+
+
+class FinalizeModel(object):
+    @jsonschema.validate(model_finalize_schema)
+    def on_post(self, req, resp, tenant_name):
+        namespace = tenant_name
+        body = req.media
+        response = finalize_model(body, namespace, req.params['Authorization'])
+        resp.status = falcon.HTTP_OK
+        resp.body = json.dumps({'status': 'OK', 'data': {'model': response}})
+
+
+class ModelEndpoints(object):
+    def on_get(self, req, resp, tenant_name, model_name):
+        namespace = tenant_name
+        id_token = req.params['Authorization']
+        if not tenant_exists(namespace, id_token):
+            raise TenantDoesNotExistException(namespace)
+        endpoints = endpoints_using_model(namespace, model_name, id_token,
+                                          model_version=req.get_param_as_int('modelVersion'))
+        resp.status = falcon.HTTP_OK
+        resp.body = json.dumps({'status': 'OK', 'data': {'endpoints': endpoints}})
@@ -44,6 +44,12 @@ upload_id = {
     "title": "Upload ID to identify whose part is being uploaded"
 }
 
+part_size = {
+    "type": "integer",
+    "title": "Size in bytes of every part but the last one",
+    "minimum": 1
+}
+
 parts = {
     "type": "array",
     "title": "Parts of uploads"
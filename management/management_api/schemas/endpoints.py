@@ -14,6 +14,7 @@
 # limitations under the License.
 #
 
+from management_api.config import ENDPOINT_BATCH_MAX_SIZE
 from management_api.schemas.elements.models import model_name, model_version_policy
 from management_api.schemas.elements.names import endpoint_name, subject_name, template_name
 from management_api.schemas.elements.resources import replicas, resources
@@ -72,3 +73,32 @@ endpoint_scale_schema = {
         "replicas": replicas,
     }
 }
+
+endpoint_batch_schema = {
+    "type": "object",
+    "title": "Endpoints batch POST Schema",
+    "required": [
+        "operations"
+    ],
+    "properties": {
+        "operations": {
+            "type": "array",
+            "minItems": 1,
+            "maxItems": ENDPOINT_BATCH_MAX_SIZE,
+            "items": {
+                "type": "object",
+                "required": [
+                    "op",
+                    "endpointName"
+                ],
+                "properties": {
+                    "op": {
+                        "type": "string",
+                        "enum": ["create", "update", "scale", "delete"]
+                    },
+                    "endpointName": endpoint_name
+                }
+            }
+        }
+    }
+}
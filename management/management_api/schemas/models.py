@@ -29,3 +29,16 @@ model_delete_schema = {
         "modelVersion": model_version,
     }
 }
+
+model_finalize_schema = {
+    "type": "object",
+    "title": "Model finalize Schema",
+    "required": [
+        "modelName",
+        "modelVersion",
+    ],
+    "properties": {
+        "modelName": model_name,
+        "modelVersion": model_version,
+    }
+}
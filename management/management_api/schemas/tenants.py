@@ -14,6 +14,7 @@
 # limitations under the License.
 #
 
+from management_api.config import TENANT_BATCH_MAX_SIZE
 from management_api.schemas.elements.names import tenant_name, scope_name
 from management_api.schemas.elements.resources import quota
 from management_api.schemas.elements.verifications import cert
@@ -36,6 +37,22 @@ tenant_post_schema = {
     }
 }
 
+tenant_batch_schema = {
+    "type": "object",
+    "title": "Tenants batch POST Schema",
+    "required": [
+        "tenants"
+    ],
+    "properties": {
+        "tenants": {
+            "type": "array",
+            "minItems": 1,
+            "maxItems": TENANT_BATCH_MAX_SIZE,
+            "items": tenant_post_schema
+        }
+    }
+}
+
 tenant_delete_schema = {
     "type": "object",
     "title": "Tenant DELETE Schema",
@@ -15,7 +15,7 @@
 #
 
 from management_api.schemas.elements.models import model_name, model_version, upload_id, \
-    file_name, parts, dir
+    file_name, parts, dir, part_size
 
 multipart_start_schema = {
     "type": "object",
@@ -28,7 +28,8 @@ multipart_start_schema = {
     "properties": {
         "modelName": model_name,
         "modelVersion": model_version,
-        "fileName": file_name
+        "fileName": file_name,
+        "partSize": part_size
     }
 }
 
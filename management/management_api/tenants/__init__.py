@@ -1 +1 @@
-from .tenants import Tenants  # noqa
+from .tenants import Tenants, TenantsBatch, TenantsSecrets, TenantsUsage, TenantUsage  # noqa
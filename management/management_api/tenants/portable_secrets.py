@@ -0,0 +1,138 @@
+#
+# Copyright (c) 2019 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+from kubernetes import client as k8s_client
+from kubernetes.client.rest import ApiException
+
+from management_api.config import PORTABLE_SECRETS_PATHS, PORTABLE_SECRETS_CACHE_SIZE, \
+    PORTABLE_SECRETS_CACHE_TTL, SECRET_PROPAGATION_CONCURRENCY, RESOURCE_DOES_NOT_EXIST
+from management_api.utils.cache import TTLCache, register_cache, token_digest
+from management_api.utils.concurrency import bounded_map
+from management_api.utils.errors_handling import KubernetesCreateException, \
+    KubernetesGetException, KubernetesUpdateException, error_response
+from management_api.utils.kubernetes_resources import get_k8s_api_client, get_cached_informer, \
+    SECRETS
+from management_api.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+PORTABLE_SECRET_LABEL = 'portable_secret'
+
+portable_secrets = register_cache('portable_secrets', TTLCache(PORTABLE_SECRETS_CACHE_SIZE,
+                                                               PORTABLE_SECRETS_CACHE_TTL))
+
+
+def read_portable_secret(api_instance, secret_path, id_token, cached=True):
+    """Returns source secret, from the watch cache, the ttl cache or the API server.
+
+    Cached secrets are kept per caller token and shared, they must not be modified.
+    """
+    namespace, name = secret_path.split('/')
+    key = (secret_path, token_digest(id_token))
+    if cached:
+        informer = get_cached_informer(SECRETS, id_token, 'get', namespace)
+        secret = informer.get(namespace, name) if informer else portable_secrets.get(key)
+        if secret is not None:
+            return secret
+    try:
+        secret = api_instance.read_namespaced_secret(name, namespace)
+    except ApiException as apiException:
+        raise KubernetesGetException('secret', apiException)
+    portable_secrets.set(key, secret)
+    return secret
+
+
+def read_portable_secrets(api_instance, id_token, cached=True):
+    return [read_portable_secret(api_instance, secret_path, id_token, cached=cached)
+            for secret_path in PORTABLE_SECRETS_PATHS]
+
+
+def secret_copy(source_secret, target_namespace):
+    metadata = k8s_client.V1ObjectMeta(name=source_secret.metadata.name,
+                                       namespace=target_namespace,
+                                       labels={PORTABLE_SECRET_LABEL: 'true'})
+    return k8s_client.V1Secret(api_version='v1', kind='Secret', metadata=metadata,
+                               type=source_secret.type, data=source_secret.data)
+
+
+def is_up_to_date(secret, source_secret):
+    return secret is not None and secret.type == source_secret.type and \
+        secret.data == source_secret.data
+
+
+def write_secret_copy(api_instance, source_secret, target_namespace, replace=False):
+    body = secret_copy(source_secret, target_namespace)
+    if replace:
+        try:
+            return api_instance.replace_namespaced_secret(body.metadata.name, target_namespace,
+                                                          body)
+        except ApiException as apiException:
+            if apiException.status != RESOURCE_DOES_NOT_EXIST:
+                raise KubernetesUpdateException('secret', apiException)
+    try:
+        return api_instance.create_namespaced_secret(namespace=target_namespace, body=body)
+    except ApiException as apiException:
+        raise KubernetesCreateException('secret', apiException)
+
+
+def propagate_portable_secrets(target_namespace, id_token):
+    """Copies all portable secrets to the namespace at once"""
+    api_instance = get_k8s_api_client(id_token)
+    source_secrets = read_portable_secrets(api_instance, id_token)
+    list(bounded_map(lambda source_secret: write_secret_copy(api_instance, source_secret,
+                                                             target_namespace),
+                     source_secrets, SECRET_PROPAGATION_CONCURRENCY))
+    logger.info('Portable secrets copied from default to {}'.format(target_namespace))
+
+
+def reconcile_portable_secrets(target_namespaces: list, id_token):
+    """Brings copies of portable secrets in the namespaces up to date, e.g. after rotation.
+
+    Source secrets are read from the API server and all labelled copies are listed with one
+    call, so only missing or outdated copies are written, up to SECRET_PROPAGATION_CONCURRENCY
+    at once. A failed copy does not stop the others.
+    """
+    api_instance = get_k8s_api_client(id_token)
+    source_secrets = read_portable_secrets(api_instance, id_token, cached=False)
+    try:
+        copies = api_instance.list_secret_for_all_namespaces(
+            label_selector=f'{PORTABLE_SECRET_LABEL}=true')
+    except ApiException as apiException:
+        raise KubernetesGetException('secrets', apiException)
+    current = {(secret.metadata.namespace, secret.metadata.name): secret
+               for secret in copies.items or []}
+    outdated = [(source_secret, namespace) for namespace in target_namespaces
+                for source_secret in source_secrets
+                if not is_up_to_date(current.get((namespace, source_secret.metadata.name)),
+                                     source_secret)]
+
+    def sync(copy):
+        source_secret, namespace = copy
+        result = {'tenant': namespace, 'secret': source_secret.metadata.name}
+        try:
+            write_secret_copy(api_instance, source_secret, namespace, replace=True)
+        except Exception as e:
+            result['status'], result['error'] = error_response(e)
+        return result
+
+    failed = [result for result in bounded_map(sync, outdated, SECRET_PROPAGATION_CONCURRENCY)
+              if 'error' in result]
+    logger.info(f'Portable secrets reconciled in {len(target_namespaces)} tenants: '
+                f'{len(outdated) - len(failed)} copies written, {len(failed)} failed')
+    return {'tenants': len(target_namespaces),
+            'unchanged': len(target_namespaces) * len(source_secrets) - len(outdated),
+            'updated': len(outdated) - len(failed), 'failed': failed}
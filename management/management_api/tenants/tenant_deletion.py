@@ -0,0 +1,100 @@
+#
+# Copyright (c) 2019 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from kubernetes.client.rest import ApiException
+
+from management_api.config import RESOURCE_DOES_NOT_EXIST, TERMINATION_IN_PROGRESS, \
+    TENANT_DELETION_TIMEOUT, TENANT_DELETION_POLL_INTERVAL, JOB_WORKERS
+from management_api.jobs.job_utils import jobs
+from management_api.tenants.tenants_utils import tenant_exists, invalidate_tenant, \
+    delete_bucket, delete_namespace
+from management_api.utils.errors_handling import TenantDoesNotExistException, \
+    KubernetesGetException
+from management_api.utils.kubernetes_resources import get_k8s_api_client
+from management_api.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# one bucket purge per running deletion job, so purges never wait behind request work
+bucket_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix='bucket-purge')
+
+
+def start_tenant_deletion(parameters, id_token):
+    """Returns background job deleting the tenant, deletion already running is reused"""
+    name = parameters['name']
+    job = jobs.find('delete_tenant', name)
+    if job is not None:
+        return job
+    if not tenant_exists(name, id_token=id_token, cached=False):
+        raise TenantDoesNotExistException(name)
+    invalidate_tenant(name)
+    logger.info('Deleting tenant in background: {}'.format(name))
+    return jobs.submit('delete_tenant', name, delete_tenant_job, name, id_token, owner=id_token)
+
+
+def delete_tenant_job(job, name, id_token):
+    """Purges the bucket while the namespace is deleted and waits until both are gone.
+
+    Both steps always run to the end; if any of them failed, the first error is raised.
+    """
+    job.progress.update({'deletedObjects': 0, 'bucket': 'deleting', 'namespace': 'deleting'})
+
+    def progress(deleted):
+        job.progress['deletedObjects'] = deleted
+
+    bucket_deletion = bucket_executor.submit(delete_bucket, name, progress=progress)
+    errors = []
+    try:
+        delete_namespace(name, id_token)
+        job.progress['namespace'] = TERMINATION_IN_PROGRESS.lower()
+        wait_for_namespace_removal(name, id_token)
+        job.progress['namespace'] = 'deleted'
+    except Exception as namespaceError:
+        job.progress['namespace'] = 'failed'
+        errors.append(namespaceError)
+    try:
+        bucket_deletion.result()
+        job.progress['bucket'] = 'deleted'
+    except Exception as bucketError:
+        job.progress['bucket'] = 'failed'
+        errors.append(bucketError)
+    invalidate_tenant(name)
+    for error in errors[1:]:
+        logger.error(f'Tenant {name} deletion also failed with: {error}')
+    if errors:
+        raise errors[0]
+    logger.info('Tenant {} deleted'.format(name))
+    return {'name': name, 'deletedObjects': job.progress['deletedObjects']}
+
+
+def wait_for_namespace_removal(name, id_token, timeout=TENANT_DELETION_TIMEOUT,
+                               interval=TENANT_DELETION_POLL_INTERVAL):
+    api_instance = get_k8s_api_client(id_token)
+    deadline = time.time() + timeout
+    while True:
+        try:
+            api_instance.read_namespace_status(name)
+        except ApiException as apiException:
+            if apiException.status == RESOURCE_DOES_NOT_EXIST:
+                return
+            raise KubernetesGetException('namespace status', apiException)
+        if time.time() >= deadline:
+            raise TimeoutError(f'Namespace {name} is still terminating after {timeout:.0f} s')
+        time.sleep(interval)
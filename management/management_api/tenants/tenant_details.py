@@ -0,0 +1,66 @@
+#
+# Copyright (c) 2019 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+from botocore.exceptions import ClientError
+
+from management_api.config import TENANT_DETAILS_CONCURRENCY
+from management_api.models.manifest import read_manifest
+from management_api.utils.concurrency import bounded_map
+from management_api.utils.endpoint_slots import get_endpoint_number
+from management_api.utils.errors_handling import ManagementApiException, MinioCallException
+from management_api.utils.kubernetes_resources import get_k8s_apps_api_client
+from management_api.utils.logger import get_logger
+from management_api.utils.minio_objects import list_pages
+
+logger = get_logger(__name__)
+
+
+def get_bucket_size(bucket: str):
+    """Returns size of models in the bucket, from models manifest if there is one"""
+    manifest = read_manifest(bucket)
+    if manifest is not None:
+        return sum(entry['size'] for entry in manifest['models'].values())
+    try:
+        return sum(object['Size'] for objects in list_pages(bucket) for object in objects)
+    except ClientError as clientError:
+        raise MinioCallException(f'An error occurred during bucket reading: {clientError}')
+
+
+def get_tenants_details(tenants: list, id_token, endpoints=False, bucket_size=False):
+    """Returns tenants with requested details, read for up to TENANT_DETAILS_CONCURRENCY
+    tenants at once. Detail which cannot be read is null, it does not fail the listing.
+    """
+    apps_api_instance = get_k8s_apps_api_client(id_token)
+
+    def read_detail(tenant, func, *args):
+        try:
+            return func(*args)
+        except ManagementApiException as managementApiException:
+            logger.warning(f'Could not read details of {tenant} tenant: '
+                           f'{managementApiException}')
+            return None
+
+    def details(tenant):
+        result = {'name': tenant}
+        if endpoints:
+            result['endpoints'] = read_detail(tenant, get_endpoint_number, apps_api_instance,
+                                              tenant, id_token)
+        if bucket_size:
+            result['bucketSize'] = read_detail(tenant, get_bucket_size, tenant)
+        return result
+
+    return list(bounded_map(details, tenants, TENANT_DETAILS_CONCURRENCY))
@@ -0,0 +1,271 @@
+#
+# Copyright (c) 2019 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+import heapq
+import threading
+import time
+from decimal import Decimal, InvalidOperation
+
+from botocore.exceptions import ClientError
+
+from management_api.config import minio_client, USAGE_RECONCILE_INTERVAL, \
+    USAGE_RECONCILE_CONCURRENCY
+from management_api.models.manifest import read_manifest, build_manifest
+from management_api.tenants.tenants_utils import list_tenant_namespaces, \
+    tenant_invalidation_callbacks
+from management_api.utils.cache import register_cache
+from management_api.utils.concurrency import bounded_map
+from management_api.utils.errors_handling import MinioCallException
+from management_api.utils.kubernetes_resources import get_k8s_api_custom_client, \
+    get_endpoints, get_all_endpoints
+from management_api.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+USAGE_MAX_LIMIT = 1000
+
+QUANTITY_SUFFIXES = {
+    'Ki': Decimal(2 ** 10), 'Mi': Decimal(2 ** 20), 'Gi': Decimal(2 ** 30),
+    'Ti': Decimal(2 ** 40), 'Pi': Decimal(2 ** 50), 'Ei': Decimal(2 ** 60),
+    'n': Decimal('1e-9'), 'u': Decimal('1e-6'), 'm': Decimal('1e-3'), 'k': Decimal('1e3'),
+    'M': Decimal('1e6'), 'G': Decimal('1e9'), 'T': Decimal('1e12'), 'P': Decimal('1e15'),
+    'E': Decimal('1e18'),
+}
+
+USAGE_SORT_KEYS = {
+    'storage': lambda usage: (usage['storage'] or {}).get('bytes', 0),
+    'objects': lambda usage: (usage['storage'] or {}).get('objects', 0),
+    'endpoints': lambda usage: usage['endpoints']['endpoints'],
+    'replicas': lambda usage: usage['endpoints']['replicas'],
+    'cpu': lambda usage: usage['endpoints']['requests']['cpu'],
+    'memory': lambda usage: usage['endpoints']['requests']['memory'],
+}
+STORAGE_SORT_KEYS = ('storage', 'objects')
+
+
+def parse_quantity(quantity):
+    """Returns Kubernetes quantity (e.g. 500m, 1.5Gi, 2e3) as Decimal"""
+    quantity = str(quantity)
+    try:
+        return Decimal(quantity)
+    except InvalidOperation:
+        pass
+    for suffix_length in (2, 1):
+        number, suffix = quantity[:-suffix_length], quantity[-suffix_length:]
+        if suffix in QUANTITY_SUFFIXES:
+            try:
+                return Decimal(number) * QUANTITY_SUFFIXES[suffix]
+            except InvalidOperation:
+                break
+    raise ValueError(f'{quantity} is not a valid quantity')
+
+
+def storage_totals(manifest: dict):
+    models = manifest['models'].values()
+    return {'bytes': sum(entry['size'] for entry in models),
+            'objects': sum(len(entry['files']) for entry in models),
+            'models': len(manifest['models'])}
+
+
+def endpoints_usage(crds: list):
+    """Returns number of endpoints, their replicas and resources requested by all replicas"""
+    replicas, cpu, memory = 0, Decimal(0), Decimal(0)
+    for crd in crds:
+        spec = crd.get('spec') or {}
+        # deployment of endpoint without replicas in spec is created with one replica
+        endpoint_replicas = spec.get('replicas')
+        endpoint_replicas = 1 if endpoint_replicas is None else endpoint_replicas
+        replicas += endpoint_replicas
+        requests = (spec.get('resources') or {}).get('requests') or {}
+        try:
+            cpu += parse_quantity(requests.get('cpu', 0)) * endpoint_replicas
+            memory += parse_quantity(requests.get('memory', 0)) * endpoint_replicas
+        except ValueError as valueError:
+            logger.warning(f'Resource requests of {crd["metadata"]["name"]} endpoint are not '
+                           f'counted: {valueError}')
+    return {'endpoints': len(crds), 'replicas': replicas,
+            'requests': {'cpu': float(cpu), 'memory': int(memory)}}
+
+
+class UsageAccounting:
+    """Storage used by tenants, kept in memory so it is never counted object by object on read.
+
+    Totals of a tenant are taken from its models manifest whenever this process changes the
+    manifest, so they follow model uploads and deletions. Changes made through other replicas
+    (or directly in Minio) show up after reconciliation, which runs in background when started
+    and then every interval seconds. It reads manifests of all tenant buckets again and lists
+    only buckets without a manifest. Totals are dropped whenever the tenant is invalidated.
+    """
+
+    def __init__(self, interval=USAGE_RECONCILE_INTERVAL,
+                 max_workers=USAGE_RECONCILE_CONCURRENCY):
+        self.interval = interval
+        self.max_workers = max_workers
+        self._storage = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self.reconciled_at = None
+        self.reconciliations = 0
+        self.updates = 0
+        self.failures = 0
+
+    def set_storage(self, tenant, manifest: dict, since=None):
+        """Stores totals of the manifest, unless totals were updated after since"""
+        totals = storage_totals(manifest)
+        with self._lock:
+            current = self._storage.get(tenant)
+            if since is not None and current is not None and current['updatedAt'] > since:
+                # changed while the bucket was listed, listing may have missed the change
+                return dict(current)
+            totals['updatedAt'] = time.time()
+            self._storage[tenant] = totals
+            self.updates += 1
+        return dict(totals)
+
+    def record(self, tenant):
+        """Takes totals of the tenant from its models manifest after the manifest was changed"""
+        try:
+            manifest = read_manifest(tenant)
+        except MinioCallException as minioCallException:
+            logger.warning(f'Could not read storage usage of {tenant}: {minioCallException}')
+            manifest = None
+        if manifest is None:
+            # counted from the bucket on next read or reconciliation
+            self.drop(tenant)
+            return
+        self.set_storage(tenant, manifest)
+
+    def drop(self, tenant):
+        with self._lock:
+            self._storage.pop(tenant, None)
+
+    def storage(self, tenant):
+        """Returns storage totals of the tenant, counted from its bucket if not known yet"""
+        with self._lock:
+            totals = self._storage.get(tenant)
+        if totals is not None:
+            return dict(totals)
+        return self.reconcile_tenant(tenant)
+
+    def reconcile_tenant(self, tenant):
+        started = time.time()
+        manifest = read_manifest(tenant)
+        if manifest is None:
+            manifest = build_manifest(tenant)
+        return self.set_storage(tenant, manifest, since=started)
+
+    def snapshot(self):
+        """Returns storage totals of all known tenants, never counted on request"""
+        with self._lock:
+            return {tenant: dict(totals) for tenant, totals in self._storage.items()}
+
+    def reconcile(self):
+        """Counts storage of all tenant buckets again, returns number of buckets counted.
+
+        Buckets of namespaces not labelled as tenants (e.g. of platform services) are skipped.
+        """
+        started = time.time()
+        tenants = set(list_tenant_namespaces())
+        try:
+            buckets = [bucket['Name'] for bucket in minio_client.list_buckets()['Buckets']
+                       if bucket['Name'] in tenants]
+        except ClientError as clientError:
+            raise MinioCallException(f'An error occurred during buckets listing: {clientError}')
+
+        def count(bucket):
+            try:
+                self.reconcile_tenant(bucket)
+                return True
+            except MinioCallException as minioCallException:
+                logger.warning(f'Could not count storage usage of {bucket}: '
+                               f'{minioCallException}')
+                return False
+
+        counted = sum(bounded_map(count, buckets, self.max_workers))
+        with self._lock:
+            for tenant in set(self._storage) - set(buckets):
+                if self._storage[tenant]['updatedAt'] <= started:
+                    del self._storage[tenant]
+            self.reconciled_at = started
+            self.reconciliations += 1
+            self.failures += len(buckets) - counted
+        logger.info(f'Storage usage of {counted} of {len(buckets)} buckets reconciled')
+        return counted
+
+    def start(self):
+        """Starts reconciliation in background, its first pass runs right away"""
+        with self._lock:
+            if self._thread is not None or not self.interval:
+                return
+            self._thread = threading.Thread(target=self._run, name='usage-reconciliation',
+                                            daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.reconcile()
+            except Exception as e:
+                logger.warning(f'Storage usage reconciliation failed: {e}')
+            time.sleep(self.interval)
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._storage), 'reconciledAt': self.reconciled_at,
+                    'reconciliations': self.reconciliations, 'updates': self.updates,
+                    'failures': self.failures}
+
+    def __len__(self):
+        return len(self._storage)
+
+
+tenant_usage = register_cache('tenant_usage', UsageAccounting())
+tenant_invalidation_callbacks.append(tenant_usage.drop)
+
+
+def get_tenant_usage(tenant, id_token):
+    custom_api_instance = get_k8s_api_custom_client(id_token)
+    return {'name': tenant, 'storage': tenant_usage.storage(tenant),
+            'endpoints': endpoints_usage(get_endpoints(custom_api_instance, tenant, id_token))}
+
+
+def get_tenants_usage(id_token, sort='storage', limit=None, endpoints=False):
+    """Returns usage of tenants which use the most of the sort key, highest first.
+
+    Storage comes from memory only, endpoint totals (included when requested or sorted by)
+    from InferenceEndpoint objects of all namespaces, listed once.
+    """
+    storage = tenant_usage.snapshot()
+    tenants = {tenant: {'name': tenant, 'storage': totals}
+               for tenant, totals in storage.items()}
+    if endpoints or sort not in STORAGE_SORT_KEYS:
+        crds = {}
+        for crd in get_all_endpoints(get_k8s_api_custom_client(id_token), id_token):
+            crds.setdefault(crd['metadata']['namespace'], []).append(crd)
+        for tenant in crds:
+            tenants.setdefault(tenant, {'name': tenant, 'storage': None})
+        for tenant, usage in tenants.items():
+            usage['endpoints'] = endpoints_usage(crds.get(tenant, []))
+    key = USAGE_SORT_KEYS[sort]
+    usages = list(tenants.values())
+    if limit:
+        usages = heapq.nlargest(limit, usages, key=key)
+    else:
+        usages.sort(key=key, reverse=True)
+    return {'tenants': usages, 'reconciledAt': tenant_usage.reconciled_at,
+            'total': {'bytes': sum(totals['bytes'] for totals in storage.values()),
+                      'objects': sum(totals['objects'] for totals in storage.values())}}
@@ -18,9 +18,19 @@ import falcon
 import json
 from falcon.media.validators import jsonschema
 
-from management_api.tenants.tenants_utils import list_tenants, create_tenant, delete_tenant
+from management_api.tenants.tenants_utils import list_tenants, create_tenant, delete_tenant, \
+    create_tenants, list_tenants_page, tenant_exists, TENANTS_PAGE_SIZE
+from management_api.tenants.tenant_details import get_tenants_details
+from management_api.tenants.tenant_deletion import start_tenant_deletion
+from management_api.tenants.portable_secrets import reconcile_portable_secrets
+from management_api.tenants.tenant_usage import get_tenant_usage, get_tenants_usage, \
+    USAGE_SORT_KEYS, USAGE_MAX_LIMIT
+from management_api.utils.errors_handling import TenantDoesNotExistException, \
+    InvalidParamException
 from management_api.utils.logger import get_logger
-from management_api.schemas.tenants import tenant_post_schema, tenant_delete_schema
+from management_api.utils.params import param_is_true, get_limit
+from management_api.schemas.tenants import tenant_post_schema, tenant_delete_schema, \
+    tenant_batch_schema
 
 logger = get_logger(__name__)
 
@@ -29,9 +39,24 @@ class Tenants(object):
 
     def on_get(self, req, resp):
         logger.info("List tenants")
-        tenants = list_tenants(id_token=req.params['Authorization'])
+        id_token = req.params['Authorization']
+        limit = get_limit(req, TENANTS_PAGE_SIZE)
+        continue_token = req.get_param('continue')
+        next_token = None
+        if limit or continue_token:
+            tenants, next_token = list_tenants_page(id_token, limit=limit or TENANTS_PAGE_SIZE,
+                                                    continue_token=continue_token)
+        else:
+            tenants = list_tenants(id_token=id_token)
+        endpoints, bucket_size = param_is_true(req, 'endpoints'), param_is_true(req, 'bucketSize')
+        if endpoints or bucket_size:
+            tenants = get_tenants_details(tenants, id_token, endpoints=endpoints,
+                                          bucket_size=bucket_size)
+        data = {'tenants': tenants}
+        if next_token:
+            data['continue'] = next_token
         resp.status = falcon.HTTP_200
-        resp.body = json.dumps({'status': 'OK', 'data': {'tenants': tenants}})
+        resp.body = json.dumps({'status': 'OK', 'data': data})
 
     @jsonschema.validate(tenant_post_schema)
     def on_post(self, req, resp):
@@ -46,6 +71,63 @@ class Tenants(object):
     @jsonschema.validate(tenant_delete_schema)
     def on_delete(self, req, resp):
         body = req.media
-        name = delete_tenant(parameters=body, id_token=req.params['Authorization'])
+        if req.get_param('async', default='true').lower() in ('false', '0'):
+            name = delete_tenant(parameters=body, id_token=req.params['Authorization'])
+            resp.status = falcon.HTTP_200
+            resp.body = json.dumps({'status': 'DELETED', 'data': {'name': name}})
+            return
+        job = start_tenant_deletion(parameters=body, id_token=req.params['Authorization'])
+        resp.status = falcon.HTTP_ACCEPTED
+        resp.location = f'/tenants/{job.tenant}/jobs/{job.id}'
+        resp.body = json.dumps({'status': 'ACCEPTED', 'data': {'name': job.tenant,
+                                                               'job': job.to_dict()}})
+
+
+class TenantsBatch(object):
+
+    @jsonschema.validate(tenant_batch_schema)
+    def on_post(self, req, resp):
+        logger.info("Create tenants batch")
+        results = create_tenants(req.media['tenants'], id_token=req.params['Authorization'])
+        failed = sum('error' in result for result in results)
+        resp.status = falcon.HTTP_200
+        resp.body = json.dumps({'status': 'OK', 'data': {'results': results,
+                                                         'succeeded': len(results) - failed,
+                                                         'failed': failed}})
+
+
+class TenantsSecrets(object):
+
+    def on_post(self, req, resp):
+        logger.info("Reconcile portable secrets of tenants")
+        id_token = req.params['Authorization']
+        data = reconcile_portable_secrets(list_tenants(id_token=id_token), id_token)
+        resp.status = falcon.HTTP_200
+        resp.body = json.dumps({'status': 'OK', 'data': data})
+
+
+class TenantsUsage(object):
+
+    def on_get(self, req, resp):
+        logger.info("Get usage of tenants")
+        sort = req.get_param('sort', default='storage')
+        if sort not in USAGE_SORT_KEYS:
+            raise InvalidParamException('sort', 'Wrong sort parameter value',
+                                        f'Sort must be one of: {", ".join(USAGE_SORT_KEYS)}.')
+        data = get_tenants_usage(req.params['Authorization'], sort=sort,
+                                 limit=get_limit(req, USAGE_MAX_LIMIT),
+                                 endpoints=param_is_true(req, 'endpoints'))
+        resp.status = falcon.HTTP_200
+        resp.body = json.dumps({'status': 'OK', 'data': data})
+
+
+class TenantUsage(object):
+
+    def on_get(self, req, resp, tenant_name):
+        namespace = tenant_name
+        id_token = req.params['Authorization']
+        if not tenant_exists(namespace, id_token=id_token):
+            raise TenantDoesNotExistException(namespace)
+        data = get_tenant_usage(namespace, id_token)
         resp.status = falcon.HTTP_200
-        resp.body = json.dumps({'status': 'DELETED', 'data': {'name': name}})
+        resp.body = json.dumps({'status': 'OK', 'data': data})
@@ -14,23 +14,43 @@
 # limitations under the License.
 #
 
+import json
+from collections import Counter
+
 import falcon
 from botocore.exceptions import ClientError
 from kubernetes import client as k8s_client
 from kubernetes.client.rest import ApiException
 from tenacity import retry, stop_after_attempt, wait_fixed
-from management_api.config import CERT_SECRET_NAME, PORTABLE_SECRETS_PATHS, \
-    minio_client, minio_resource, RESOURCE_DOES_NOT_EXIST, K8S_FORBIDDEN, \
-    NAMESPACE_BEING_DELETED, NO_SUCH_BUCKET_EXCEPTION, TERMINATION_IN_PROGRESS, PLATFORM_ADMIN_LABEL
+from management_api.config import CERT_SECRET_NAME, \
+    minio_client, RESOURCE_DOES_NOT_EXIST, K8S_FORBIDDEN, \
+    NAMESPACE_BEING_DELETED, NO_SUCH_BUCKET_EXCEPTION, TERMINATION_IN_PROGRESS, \
+    PLATFORM_ADMIN_LABEL, NO_SUCH_BUCKET_STATUS, TENANT_CACHE_TTL, TENANT_CACHE_SIZE, \
+    TENANT_BATCH_CONCURRENCY
+from management_api.tenants.portable_secrets import propagate_portable_secrets
+from management_api.utils.cache import TTLCache, register_cache, token_digest
 from management_api.utils.cert import validate_cert
+from management_api.utils.concurrency import bounded_map
 from management_api.utils.errors_handling import TenantAlreadyExistsException, MinioCallException, \
     TenantDoesNotExistException, KubernetesCreateException, KubernetesDeleteException, \
-    KubernetesGetException, KubernetesForbiddenException
-from management_api.utils.kubernetes_resources import get_k8s_api_client, get_k8s_rbac_api_client
+    KubernetesGetException, KubernetesForbiddenException, error_response
+from management_api.utils.kubernetes_resources import get_k8s_api_client, \
+    get_k8s_rbac_api_client, get_cached_informer, get_shared_api_client, NAMESPACES
 from management_api.utils.logger import get_logger
+from management_api.utils.minio_objects import delete_objects
+from management_api.utils.provisioning import Provisioning, ProvisioningStep
 
 logger = get_logger(__name__)
 
+TENANTS_LABEL_SELECTOR = f'created_by = {PLATFORM_ADMIN_LABEL}'
+TENANTS_FIELD_SELECTOR = f'status.phase!={TERMINATION_IN_PROGRESS}'
+TENANTS_PAGE_SIZE = 500
+
+existing_tenants = register_cache('tenants', TTLCache(TENANT_CACHE_SIZE, TENANT_CACHE_TTL))
+# called with the tenant name whenever it is invalidated, so state kept by other modules (e.g.
+# storage usage) is dropped on every tenant deletion path
+tenant_invalidation_callbacks = []
+
 
 def create_tenant(parameters, id_token):
     name = parameters['name']
@@ -43,30 +63,81 @@ def create_tenant(parameters, id_token):
 
     validate_cert(cert)
 
-    if tenant_exists(name, id_token):
+    if tenant_exists(name, id_token, cached=False):
         raise TenantAlreadyExistsException(name)
 
     try:
-        create_namespace(name, quota, id_token)
-        propagate_portable_secrets(target_namespace=name, id_token=id_token)
-        create_bucket(name)
-        create_secret(name, cert, id_token=id_token)
-        create_resource_quota(name, quota, id_token=id_token)
-        create_role(name, id_token=id_token)
-        create_rolebinding(name, scope, id_token=id_token)
-    except falcon.HTTPError:
-        delete_namespace(name, id_token=id_token)
-        delete_bucket(name, id_token=id_token)
-        raise
+        Provisioning(tenant_provisioning_steps()).run(parameters, id_token)
+    finally:
+        invalidate_tenant(name)
 
     logger.info('Tenant {} created'.format(name))
     return name
 
 
+def tenant_provisioning_steps():
+    """Steps of tenant creation, undoing the namespace removes all resources created in it"""
+    return (
+        ProvisioningStep('namespace',
+                         lambda tenant, id_token: create_namespace(tenant['name'], tenant['quota'],
+                                                                   id_token),
+                         undo=lambda tenant, id_token: delete_namespace(tenant['name'], id_token)),
+        ProvisioningStep('bucket', lambda tenant, id_token: create_bucket(tenant['name']),
+                         undo=lambda tenant, id_token: delete_bucket(tenant['name'])),
+        ProvisioningStep('portable secrets',
+                         lambda tenant, id_token: propagate_portable_secrets(tenant['name'],
+                                                                             id_token),
+                         requires=['namespace']),
+        ProvisioningStep('cert secret',
+                         lambda tenant, id_token: create_secret(tenant['name'], tenant['cert'],
+                                                                id_token),
+                         requires=['namespace']),
+        ProvisioningStep('resource quota',
+                         lambda tenant, id_token: create_resource_quota(tenant['name'],
+                                                                        tenant['quota'], id_token),
+                         requires=['namespace']),
+        ProvisioningStep('role', lambda tenant, id_token: create_role(tenant['name'], id_token),
+                         requires=['namespace']),
+        # binding a role requires its permissions, so the role must exist first
+        ProvisioningStep('rolebinding',
+                         lambda tenant, id_token: create_rolebinding(tenant['name'],
+                                                                     tenant['scope'], id_token),
+                         requires=['role']),
+    )
+
+
+def create_tenants(tenants: list, id_token):
+    """Creates many tenants, returns results in order of tenants.
+
+    Up to TENANT_BATCH_CONCURRENCY tenants are created at once, a failed tenant is rolled back
+    and does not stop the others.
+    """
+    names = Counter(tenant['name'] for tenant in tenants)
+
+    def create(tenant):
+        result = {'name': tenant['name']}
+        if names[tenant['name']] > 1:
+            result['status'] = falcon.HTTP_BAD_REQUEST
+            result['error'] = f"Tenant {tenant['name']} appears more than once in the batch"
+            return result
+        try:
+            create_tenant(tenant, id_token)
+        except Exception as e:
+            result['status'], result['error'] = error_response(e)
+            return result
+        result['status'] = falcon.HTTP_OK
+        return result
+
+    results = list(bounded_map(create, tenants, TENANT_BATCH_CONCURRENCY))
+    logger.info(f"Tenants batch: {sum('error' not in result for result in results)} of "
+                f"{len(results)} tenants created")
+    return results
+
+
 def create_namespace(name, quota, id_token):
     annotations = None
     if 'maxEndpoints' in quota:
-        annotations = {'maxEndpoints': str(quota.pop('maxEndpoints'))}
+        annotations = {'maxEndpoints': str(quota['maxEndpoints'])}
     name_object = k8s_client.V1ObjectMeta(name=name, annotations=annotations,
                                           labels={'created_by': PLATFORM_ADMIN_LABEL})
     namespace = k8s_client.V1Namespace(metadata=name_object)
@@ -109,7 +180,8 @@ def create_secret(name, cert, id_token):
 
 def create_resource_quota(name, quota, id_token):
     name_object = k8s_client.V1ObjectMeta(name=name)
-    resource_quota_spec = k8s_client.V1ResourceQuotaSpec(hard=quota)
+    hard = {resource: value for resource, value in quota.items() if resource != 'maxEndpoints'}
+    resource_quota_spec = k8s_client.V1ResourceQuotaSpec(hard=hard)
     body = k8s_client.V1ResourceQuota(spec=resource_quota_spec, metadata=name_object)
     api_instance = get_k8s_api_client(id_token)
     try:
@@ -122,13 +194,12 @@ def create_resource_quota(name, quota, id_token):
 
 
 @retry(stop=stop_after_attempt(5), wait=wait_fixed(2))
-def delete_bucket(name):
+def delete_bucket(name, progress=None):
     response = 'Bucket {} does not exist'.format(name)
     existed = True
     try:
-        bucket = minio_resource.Bucket(name)
-        bucket.objects.all().delete()
-        response = bucket.delete()
+        delete_objects(name, progress=progress)
+        response = minio_client.delete_bucket(Bucket=name)
     except ClientError as clientError:
         if clientError.response['Error']['Code'] != NO_SUCH_BUCKET_EXCEPTION:
             raise MinioCallException("A error occurred during bucket deletion: {}"
@@ -165,72 +236,71 @@ def delete_namespace(name, id_token):
 def delete_tenant(parameters, id_token):
     name = parameters['name']
     logger.info('Deleting tenant: {}'.format(name))
-    if tenant_exists(name, id_token=id_token):
+    if tenant_exists(name, id_token=id_token, cached=False):
+        invalidate_tenant(name)
         delete_bucket(name)
         delete_namespace(name, id_token)
+        invalidate_tenant(name)
         logger.info('Tenant {} deleted'.format(name))
     else:
         raise TenantDoesNotExistException(name)
     return name
 
 
-def propagate_secret(source_secret_path, target_namespace, id_token):
-    source_secret_namespace, source_secret_name = source_secret_path.split('/')
-    api_instance = get_k8s_api_client(id_token)
-    try:
-        source_secret = api_instance.read_namespaced_secret(
-            source_secret_name, source_secret_namespace)
-    except ApiException as apiException:
-        raise KubernetesGetException('secret', apiException)
-
-    source_secret.metadata.namespace = target_namespace
-    source_secret.metadata.resource_version = None
-
-    try:
-        api_instance.create_namespaced_secret(namespace=target_namespace,
-                                              body=source_secret)
-    except ApiException as apiException:
-        raise KubernetesCreateException('secret', apiException)
-
-
-def propagate_portable_secrets(target_namespace, id_token):
-    for portable_secret_path in PORTABLE_SECRETS_PATHS:
-        propagate_secret(portable_secret_path, target_namespace, id_token=id_token)
-    logger.info('Portable secrets copied from default to {}'.format(target_namespace))
-
-
 def does_bucket_exist(bucket_name):
     try:
-        minio_client.list_objects_v2(Bucket=bucket_name)
+        minio_client.head_bucket(Bucket=bucket_name)
     except ClientError as clientError:
         error_code = clientError.response['Error']['Code']
-        if error_code == NO_SUCH_BUCKET_EXCEPTION:
+        if error_code in (NO_SUCH_BUCKET_EXCEPTION, NO_SUCH_BUCKET_STATUS):
             return False
         raise MinioCallException("Error accessing bucket: {}".format(clientError))
     return True
 
 
 def is_namespace_available(namespace, id_token):
-    api_instance = get_k8s_api_client(id_token)
-    try:
-        response = api_instance.read_namespace_status(namespace)
-    except ApiException as apiException:
-        if apiException.status == RESOURCE_DOES_NOT_EXIST:
+    informer = get_cached_informer(NAMESPACES, id_token, 'get', namespace)
+    if informer:
+        response = informer.get(None, namespace)
+        if response is None:
             return False
-        if apiException.status == K8S_FORBIDDEN:
-            raise KubernetesForbiddenException('forbidden', apiException)
-        raise KubernetesGetException('namespace status', apiException)
+    else:
+        api_instance = get_k8s_api_client(id_token)
+        try:
+            response = api_instance.read_namespace_status(namespace)
+        except ApiException as apiException:
+            if apiException.status == RESOURCE_DOES_NOT_EXIST:
+                return False
+            if apiException.status == K8S_FORBIDDEN:
+                raise KubernetesForbiddenException('forbidden', apiException)
+            raise KubernetesGetException('namespace status', apiException)
     if response and response.status.phase == TERMINATION_IN_PROGRESS:
         return False
     return True
 
 
-def tenant_exists(tenant_name, id_token):
+def tenant_exists(tenant_name, id_token, cached=True):
+    """Checks tenant bucket and namespace, the latter with caller permissions.
+
+    Positive results are reused for TENANT_CACHE_TTL seconds per caller token, so e.g. parts
+    of one upload do not check the tenant again.
+    """
+    key = (tenant_name, token_digest(id_token))
+    if cached and existing_tenants.get(key):
+        return True
     result = does_bucket_exist(tenant_name) and is_namespace_available(tenant_name, id_token)
-    logger.info("Tenant already exists: " + str(result))
+    if result:
+        existing_tenants.set(key, True)
+    logger.debug("Tenant {} exists: {}".format(tenant_name, result))
     return result
 
 
+def invalidate_tenant(tenant_name):
+    existing_tenants.pop_matching(lambda key: key[0] == tenant_name)
+    for callback in tenant_invalidation_callbacks:
+        callback(tenant_name)
+
+
 def create_role(name, id_token):
     api_version = 'rbac.authorization.k8s.io/v1'
     meta = k8s_client.V1ObjectMeta(name=name, namespace=name)
@@ -283,22 +353,47 @@ def create_rolebinding(name, scope_name, id_token):
     try:
         response = rbac_api_instance.create_namespaced_role_binding(name, rolebinding)
     except ApiException as apiException:
-        KubernetesCreateException('rolebinding', apiException)
+        raise KubernetesCreateException('rolebinding', apiException)
 
     logger.info("Rolebinding {} created".format(name))
     return response
 
 
-def list_tenants(id_token):
-    tenants = []
+def list_tenants_page(id_token, limit=TENANTS_PAGE_SIZE, continue_token=None):
+    """Returns names of tenants on one page of namespace listing and token of the next page.
+
+    Terminating namespaces are filtered out by the API server and only names are read from
+    the response, no namespace objects are built. A page may hold fewer than limit tenants
+    also when more of them follow.
+    """
     api_instance = get_k8s_api_client(id_token)
-    label = f'created_by = {PLATFORM_ADMIN_LABEL}'
-    namespaces = {}
+    continuation = {'_continue': continue_token} if continue_token else {}
+    try:
+        response = api_instance.list_namespace(label_selector=TENANTS_LABEL_SELECTOR,
+                                               field_selector=TENANTS_FIELD_SELECTOR,
+                                               limit=limit, _preload_content=False,
+                                               **continuation)
+    except ApiException as apiException:
+        raise KubernetesGetException('namespaces', apiException)
+    namespaces = json.loads(response.data)
+    tenants = [item['metadata']['name'] for item in namespaces.get('items') or []]
+    return tenants, namespaces.get('metadata', {}).get('continue') or None
+
+
+def list_tenant_namespaces():
+    """Returns names of all tenants, listed with credentials of Management API itself"""
+    api_instance = k8s_client.CoreV1Api(get_shared_api_client())
     try:
-        namespaces = api_instance.list_namespace(label_selector=label)
+        response = api_instance.list_namespace(label_selector=TENANTS_LABEL_SELECTOR,
+                                               _preload_content=False)
     except ApiException as apiException:
-        KubernetesGetException('namespaces', apiException)
-    for item in namespaces.to_dict()['items']:
-        if item['status']['phase'] != TERMINATION_IN_PROGRESS:
-            tenants.append(item['metadata']['name'])
+        raise KubernetesGetException('namespaces', apiException)
+    return [item['metadata']['name'] for item in json.loads(response.data).get('items') or []]
+
+
+def list_tenants(id_token):
+    tenants, continue_token = list_tenants_page(id_token)
+    while continue_token:
+        page, continue_token = list_tenants_page(id_token, continue_token=continue_token)
+        tenants.extend(page)
     return tenants
@@ -23,7 +23,11 @@ from management_api.tenants.tenants_utils import tenant_exists
 from management_api.utils.errors_handling import TenantDoesNotExistException, \
     MissingParamException, InvalidParamException
 from management_api.upload.multipart_utils import create_upload, get_key, complete_upload, \
-    upload_part, abort_upload, create_dir, get_dir_key
+    upload_part, abort_upload, create_dir, get_dir_key, list_parts
+from management_api.upload.sessions import upload_sessions
+from management_api.models.manifest import record_model_file, record_model_dir
+from management_api.models.model_utils import invalidate_model_presence
+from management_api.tenants.tenant_usage import tenant_usage
 from management_api.schemas.uploads import multipart_start_schema, multipart_done_schema,\
     multipart_abort_schema, upload_dir_schema
 
@@ -37,9 +41,12 @@ class StartMultiModel(object):
         namespace = tenant_name
         body = req.media
         key = get_key(body)
-        if not tenant_exists(namespace, id_token=req.params['Authorization']):
+        id_token = req.params['Authorization']
+        if not tenant_exists(namespace, id_token=id_token):
             raise TenantDoesNotExistException(tenant_name=namespace)
         upload_id = create_upload(bucket=namespace, key=key)
+        upload_sessions.register(namespace, key, upload_id, id_token,
+                                 part_size=body.get('partSize'))
         logger.info("Key: " + key + " ID: " + upload_id)
         resp.status = falcon.HTTP_200
         resp.body = json.dumps({'status': 'OK', 'data': {'uploadId': upload_id,
@@ -65,17 +72,45 @@ class WriteMultiModel(object):
             part_number = int(req.get_param('partNumber'))
         except (ValueError, TypeError):
             raise InvalidParamException('partNumber', 'Wrong partNumber parameter value')
+        if req.content_length is None:
+            raise MissingParamException('Content-Length')
+        id_token = req.params['Authorization']
+        session = upload_sessions.get(multipart_id)
+        if session is None or not session.allows(namespace, id_token):
+            if not tenant_exists(namespace, id_token=id_token):
+                raise TenantDoesNotExistException(tenant_name=namespace)
+            session = upload_sessions.adopt(namespace, get_key(req.params), multipart_id,
+                                            id_token)
+        if session.part_size and req.content_length > session.part_size:
+            raise InvalidParamException('Content-Length', f'Part of {req.content_length} bytes '
+                                        f'is larger than declared part size',
+                                        f'Parts must not exceed {session.part_size} bytes.')
+        logger.info(f"Key: {session.key} ID: {multipart_id}")
+
+        part_etag = upload_part(stream=req.bounded_stream, content_length=req.content_length,
+                                part_number=part_number, bucket=namespace, key=session.key,
+                                multipart_id=multipart_id)
+        logger.info(f"ETag: {part_etag}")
+        resp.status = falcon.HTTP_200
+        resp.body = json.dumps({'status': 'OK', 'data': {'ETag': part_etag, 'op': 'upload_part'}})
+
+
+class ListParts(object):
+
+    def on_get(self, req, resp, tenant_name):
+        namespace = tenant_name
+        for required_key in ['modelName', 'modelVersion', 'fileName', 'uploadId']:
+            if required_key not in req.params:
+                raise MissingParamException(required_key)
+        multipart_id = req.get_param('uploadId')
         key = get_key(req.params)
-        logger.info(f"Key: {key} ID: {multipart_id}")
-        data = req.stream.read()
         if not tenant_exists(namespace, id_token=req.params['Authorization']):
             raise TenantDoesNotExistException(tenant_name=namespace)
 
-        part_etag = upload_part(data=data, part_number=part_number, bucket=namespace,
-                                key=key, multipart_id=multipart_id)
-        logger.info(f"ETag: {part_etag}")
+        parts = list_parts(bucket=namespace, key=key, multipart_id=multipart_id)
         resp.status = falcon.HTTP_200
-        resp.body = json.dumps({'status': 'OK', 'data': {'ETag': part_etag, 'op': 'upload_part'}})
+        resp.body = json.dumps({'status': 'OK', 'data': {'uploadId': multipart_id, 'parts': parts,
+                                                         'op': 'upload_parts'}})
 
 
 class CompleteMultiModel(object):
@@ -89,6 +124,10 @@ class CompleteMultiModel(object):
 
         complete_upload(bucket=namespace, key=key, multipart_id=body['uploadId'],
                         parts=body['parts'])
+        upload_sessions.pop(body['uploadId'])
+        record_model_file(bucket=namespace, key=key)
+        tenant_usage.record(namespace)
+        invalidate_model_presence(namespace, body['modelName'])
         resp.status = falcon.HTTP_200
         resp.body = json.dumps({'status': 'OK', 'data': {'uploadId': body['uploadId'],
                                                          'op': 'upload_complete'}})
@@ -104,6 +143,7 @@ class AbortMultiModel(object):
             raise TenantDoesNotExistException(tenant_name=namespace)
 
         abort_upload(bucket=namespace, key=key, multipart_id=body['uploadId'])
+        upload_sessions.pop(body['uploadId'])
         resp.status = falcon.HTTP_200
         resp.body = json.dumps({'status': 'OK', 'data': {'uploadId': body['uploadId'],
                                                          'op': 'upload_abort'}})
@@ -118,5 +158,7 @@ class UploadDir(object):
         if not tenant_exists(namespace, id_token=req.get_header('Authorization')):
             raise TenantDoesNotExistException(tenant_name=namespace)
         response = create_dir(tenant_name, key)
+        record_model_dir(bucket=namespace, key=key)
+        invalidate_model_presence(namespace, body['modelName'])
         resp.status = falcon.HTTP_200
         resp.body = json.dumps({'status': 'OK', 'data': {'dir': response, 'op': 'create_dir'}})
@@ -14,9 +14,58 @@
 # limitations under the License.
 #
 
-from management_api.config import minio_client
+import hashlib
+import re
+
+import requests
+from management_api.config import minio_client, UPLOAD_PART_URL_EXPIRATION, UPLOAD_PART_TIMEOUT, \
+    NO_SUCH_UPLOAD_EXCEPTION
 from botocore.exceptions import ClientError
-from management_api.utils.errors_handling import MinioCallException
+from management_api.utils.errors_handling import MinioCallException, InvalidParamException, \
+    UploadDoesNotExistException
+
+READ_CHUNK_SIZE = 1024 * 1024
+# ETag of a part is its MD5 only for unencrypted objects, SSE-KMS / SSE-C give opaque values
+MD5_ETAG = re.compile(r'^[0-9a-f]{32}$')
+
+upload_session = requests.Session()
+
+
+class PartReader:
+    """File-like view on first length bytes of request stream.
+
+    Data is read in chunks as the Minio request is sent and MD5 of the part is computed
+    on the way, so memory used does not depend on part size.
+    """
+
+    def __init__(self, stream, length):
+        self.stream = stream
+        self.length = length
+        self.remaining = length
+        self.md5 = hashlib.md5()
+
+    def __len__(self):
+        return self.length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > READ_CHUNK_SIZE:
+            size = READ_CHUNK_SIZE
+        data = self.stream.read(min(size, self.remaining))
+        if not data:
+            raise InvalidParamException('Content-Length', f'Part body ended after '
+                                        f'{self.length - self.remaining} bytes',
+                                        f'Body must have {self.length} bytes.')
+        self.remaining -= len(data)
+        self.md5.update(data)
+        return data
+
+    def __iter__(self):
+        data = self.read(READ_CHUNK_SIZE)
+        while data:
+            yield data
+            data = self.read(READ_CHUNK_SIZE)
 
 
 def create_upload(bucket: str, key: str):
@@ -29,14 +78,76 @@ def create_upload(bucket: str, key: str):
     return response['UploadId']
 
 
-def upload_part(data: bytes, part_number: int, bucket: str, key: str, multipart_id: str):
-    response = None
+def upload_part(stream, content_length: int, part_number: int, bucket: str, key: str,
+                multipart_id: str):
+    # Presigned requests carry unsigned payload, so the part is not read ahead for signing
+    url = minio_client.generate_presigned_url(
+        'upload_part', Params={'Bucket': bucket, 'Key': key, 'UploadId': multipart_id,
+                               'PartNumber': part_number},
+        ExpiresIn=UPLOAD_PART_URL_EXPIRATION)
+    body = PartReader(stream, content_length)
+    try:
+        response = upload_session.put(url, data=body, timeout=UPLOAD_PART_TIMEOUT)
+    except requests.RequestException as requestException:
+        raise MinioCallException(f'An error occurred during part uploading: {requestException}')
+    if response.status_code != 200:
+        raise MinioCallException(f'An error occurred during part uploading: '
+                                 f'{response.status_code} {response.text}')
+    etag = response.headers.get('ETag', '')
+    if MD5_ETAG.match(etag.strip('"')) and etag.strip('"') != body.md5.hexdigest():
+        raise MinioCallException(f'Part {part_number} checksum mismatch, ETag: {etag}, '
+                                 f'MD5: {body.md5.hexdigest()}')
+    return etag
+
+
+def _iter_parts(bucket: str, key: str, multipart_id: str, max_parts: int = 1000):
+    part_number_marker = 0
+    try:
+        while True:
+            response = minio_client.list_parts(Bucket=bucket, Key=key, UploadId=multipart_id,
+                                               PartNumberMarker=part_number_marker,
+                                               MaxParts=max_parts)
+            yield from response.get('Parts', [])
+            if not response.get('IsTruncated'):
+                break
+            part_number_marker = response['NextPartNumberMarker']
+    except ClientError as clientError:
+        if clientError.response['Error']['Code'] == NO_SUCH_UPLOAD_EXCEPTION:
+            raise UploadDoesNotExistException(multipart_id)
+        raise MinioCallException(f'An error occurred during listing of uploaded parts: '
+                                 f'{clientError}')
+
+
+def list_parts(bucket: str, key: str, multipart_id: str):
+    return [{'PartNumber': part['PartNumber'], 'ETag': part['ETag'], 'Size': part['Size']}
+            for part in _iter_parts(bucket, key, multipart_id)]
+
+
+def check_upload(bucket: str, key: str, multipart_id: str):
+    """Raises UploadDoesNotExistException unless multipart_id is in progress for the key"""
+    next(_iter_parts(bucket, key, multipart_id, max_parts=1), None)
+
+
+def last_part_time(bucket: str, key: str, multipart_id: str):
+    """Returns timestamp of the most recently uploaded part or None if there are no parts"""
+    times = [part['LastModified'].timestamp() for part in _iter_parts(bucket, key, multipart_id)
+             if part.get('LastModified')]
+    return max(times, default=None)
+
+
+def list_uploads(bucket: str):
+    """Yields multipart uploads in progress in the bucket"""
+    markers = {}
     try:
-        response = minio_client.upload_part(Body=data, PartNumber=part_number,
-                                            Bucket=bucket, Key=key, UploadId=multipart_id)
+        while True:
+            response = minio_client.list_multipart_uploads(Bucket=bucket, **markers)
+            yield from response.get('Uploads', [])
+            if not response.get('IsTruncated'):
+                break
+            markers = {'KeyMarker': response['NextKeyMarker'],
+                       'UploadIdMarker': response['NextUploadIdMarker']}
     except ClientError as clientError:
-        raise MinioCallException(f'An error occurred during part uploading: {clientError}')
-    return response['ETag']
+        raise MinioCallException(f'An error occurred during listing of uploads: {clientError}')
 
 
 def complete_upload(bucket: str, key: str, multipart_id: str, parts: list):
@@ -0,0 +1,213 @@
+#
+# Copyright (c) 2019 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import threading
+import time
+from collections import OrderedDict
+
+from management_api.config import UPLOAD_SESSION_CACHE_SIZE, UPLOAD_SESSION_TTL, \
+    UPLOAD_SESSION_GC_INTERVAL, UPLOAD_SWEEP_INTERVAL
+from management_api.tenants.tenants_utils import list_tenant_namespaces
+from management_api.upload.multipart_utils import abort_upload, check_upload, last_part_time, \
+    list_uploads
+from management_api.utils.cache import register_cache, token_digest
+from management_api.utils.errors_handling import UploadDoesNotExistException, \
+    MinioCallException
+from management_api.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class UploadSession:
+    """Multipart upload in progress and digests of tokens already allowed to write to it"""
+
+    __slots__ = ('tenant', 'key', 'upload_id', 'part_size', 'expires_at', 'token_digests')
+
+    def __init__(self, tenant, key, upload_id, part_size, expires_at):
+        self.tenant = tenant
+        self.key = key
+        self.upload_id = upload_id
+        self.part_size = part_size
+        self.expires_at = expires_at
+        self.token_digests = set()
+
+    def allows(self, tenant, id_token):
+        return self.tenant == tenant and token_digest(id_token) in self.token_digests
+
+
+class UploadSessionStore:
+    """Bounded registry of multipart uploads started through this process.
+
+    Sessions are only a fast path: Minio keeps the state of every upload, so a part sent to
+    another replica (or after the session was evicted) adopts the upload once it is confirmed
+    in Minio. Sessions without activity for ttl seconds are aborted in the background unless
+    Minio shows a part uploaded in the meantime, e.g. through another replica. Uploads without
+    a session, e.g. started through a replica which is gone, are found by a less frequent sweep
+    of all tenant buckets.
+    """
+
+    def __init__(self, maxsize=UPLOAD_SESSION_CACHE_SIZE, ttl=UPLOAD_SESSION_TTL,
+                 gc_interval=UPLOAD_SESSION_GC_INTERVAL, sweep_interval=UPLOAD_SWEEP_INTERVAL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.gc_interval = gc_interval
+        self.sweep_interval = sweep_interval
+        self._sessions = OrderedDict()
+        self._lock = threading.RLock()
+        self._thread = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.aborted = 0
+
+    def register(self, tenant, key, upload_id, id_token, part_size=None):
+        session = UploadSession(tenant, key, upload_id, part_size, time.time() + self.ttl)
+        session.token_digests.add(token_digest(id_token))
+        with self._lock:
+            self._sessions.pop(upload_id, None)
+            self._sessions[upload_id] = session
+            while len(self._sessions) > self.maxsize:
+                # evicted uploads are not aborted, they are adopted again on the next part
+                self._sessions.popitem(last=False)
+                self.evictions += 1
+        self.start()
+        return session
+
+    def get(self, upload_id):
+        with self._lock:
+            session = self._sessions.get(upload_id)
+            if session is None:
+                self.misses += 1
+                return None
+            self._sessions.move_to_end(upload_id)
+            session.expires_at = time.time() + self.ttl
+            self.hits += 1
+            return session
+
+    def adopt(self, tenant, key, upload_id, id_token):
+        """Returns session of upload confirmed in Minio, tenant access must be checked first"""
+        with self._lock:
+            session = self._sessions.get(upload_id)
+            if session is not None and session.tenant == tenant:
+                session.token_digests.add(token_digest(id_token))
+                return session
+        check_upload(bucket=tenant, key=key, multipart_id=upload_id)
+        return self.register(tenant, key, upload_id, id_token)
+
+    def pop(self, upload_id):
+        with self._lock:
+            self._sessions.pop(upload_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+
+    def collect_garbage(self):
+        now = time.time()
+        with self._lock:
+            expired = [session for session in self._sessions.values()
+                       if session.expires_at <= now]
+        for session in expired:
+            try:
+                self._collect(session, now)
+            except MinioCallException as minioCallException:
+                logger.warning(f'Could not check upload {session.upload_id}: '
+                               f'{minioCallException}')
+
+    def sweep(self):
+        """Aborts stale uploads of all tenant buckets, returns number of aborted uploads.
+
+        Uploads initiated more than ttl ago are checked like expired sessions, so ones with a
+        part uploaded in the last ttl seconds are kept. Uploads with a session are left to
+        collect_garbage.
+        """
+        now = time.time()
+        aborted = self.aborted
+        for tenant in list_tenant_namespaces():
+            try:
+                uploads = list(list_uploads(tenant))
+            except MinioCallException as minioCallException:
+                logger.warning(f'Could not list uploads of {tenant}: {minioCallException}')
+                continue
+            for upload in uploads:
+                initiated = upload['Initiated'].timestamp()
+                with self._lock:
+                    if initiated + self.ttl > now or upload['UploadId'] in self._sessions:
+                        continue
+                session = UploadSession(tenant, upload['Key'], upload['UploadId'], None,
+                                        initiated + self.ttl)
+                try:
+                    self._collect(session, now)
+                except MinioCallException as minioCallException:
+                    logger.warning(f'Could not check upload {session.upload_id}: '
+                                   f'{minioCallException}')
+        return self.aborted - aborted
+
+    def _collect(self, session, now):
+        try:
+            last_activity = last_part_time(bucket=session.tenant, key=session.key,
+                                           multipart_id=session.upload_id)
+        except UploadDoesNotExistException:
+            # completed or aborted through another replica
+            self.pop(session.upload_id)
+            return
+        if last_activity is not None and last_activity + self.ttl > now:
+            session.expires_at = last_activity + self.ttl
+            return
+        if session.expires_at > now:
+            # part received by this process while Minio was being asked
+            return
+        abort_upload(bucket=session.tenant, key=session.key, multipart_id=session.upload_id)
+        self.pop(session.upload_id)
+        self.aborted += 1
+        logger.info(f'Aborted stale upload {session.upload_id} of {session.key} in '
+                    f'{session.tenant}')
+
+    def start(self):
+        """Starts garbage collection in background, uploads are swept on its first pass"""
+        with self._lock:
+            if self._thread is not None or not self.gc_interval:
+                return
+            self._thread = threading.Thread(target=self._run, name='upload-sessions-gc',
+                                            daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        swept_at = 0
+        while True:
+            time.sleep(self.gc_interval)
+            try:
+                self.collect_garbage()
+            except Exception as e:
+                logger.warning(f'Upload sessions garbage collection failed: {e}')
+            if self.sweep_interval and time.time() - swept_at >= self.sweep_interval:
+                swept_at = time.time()
+                try:
+                    self.sweep()
+                except Exception as e:
+                    logger.warning(f'Stale uploads sweep failed: {e}')
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._sessions), 'maxsize': self.maxsize, 'hits': self.hits,
+                    'misses': self.misses, 'evictions': self.evictions,
+                    'aborted': self.aborted}
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+upload_sessions = register_cache('upload_sessions', UploadSessionStore())
@@ -0,0 +1,125 @@
+#
+# Copyright (c) 2019 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import base64
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+caches = {}
+
+
+def register_cache(name, cache):
+    caches[name] = cache
+    return cache
+
+
+def caches_stats():
+    return {name: cache.stats() for name, cache in caches.items()}
+
+
+def token_digest(id_token):
+    return hashlib.sha256(id_token.encode('utf-8')).hexdigest()
+
+
+def _unverified_jwt_part(id_token, index):
+    part = id_token.split('.')[index]
+    part += '=' * (-len(part) % 4)
+    return json.loads(base64.urlsafe_b64decode(part))
+
+
+def token_expiration(id_token):
+    """Returns exp claim of JWT without verifying it or None if it cannot be read"""
+    try:
+        return float(_unverified_jwt_part(id_token, 1)['exp'])
+    except (IndexError, ValueError, KeyError, TypeError):
+        return None
+
+
+def token_key_id(id_token):
+    """Returns kid header of JWT without verifying it or None if it cannot be read"""
+    try:
+        return _unverified_jwt_part(id_token, 0).get('kid')
+    except (IndexError, ValueError, AttributeError, TypeError):
+        return None
+
+
+class TTLCache:
+    """Bounded LRU mapping whose entries expire after ttl seconds."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at <= time.time():
+                self._evict(key)
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, expires_at=None):
+        max_expires_at = time.time() + self.ttl
+        if expires_at is None or expires_at > max_expires_at:
+            expires_at = max_expires_at
+        with self._lock:
+            if expires_at <= time.time():
+                self._data.pop(key, None)
+                return
+            self._data.pop(key, None)
+            self._data[key] = (value, expires_at)
+            while len(self._data) > self.maxsize:
+                self._evict(next(iter(self._data)))
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def pop_matching(self, predicate):
+        with self._lock:
+            for key in [key for key in self._data if predicate(key)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def _evict(self, key):
+        del self._data[key]
+        self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._data), 'maxsize': self.maxsize, 'hits': self.hits,
+                    'misses': self.misses, 'evictions': self.evictions}
+
+    def __len__(self):
+        return len(self._data)
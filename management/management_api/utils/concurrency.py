@@ -0,0 +1,66 @@
+#
+# Copyright (c) 2019 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from management_api.config import REQUEST_CONCURRENCY
+from management_api.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+request_executor = ThreadPoolExecutor(max_workers=REQUEST_CONCURRENCY,
+                                      thread_name_prefix='request')
+
+
+def submit(func, *args, **kwargs):
+    """Starts func in background, returns future of its result"""
+    return request_executor.submit(func, *args, **kwargs)
+
+
+def timed(name, func, *args, **kwargs):
+    """Calls func and logs how long the call took"""
+    start = time.perf_counter()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        logger.debug(f'{name} took {(time.perf_counter() - start) * 1000:.1f} ms')
+
+
+def bounded_map(func, items, max_workers):
+    """Like map(func, items), but with up to max_workers calls running at once.
+
+    Items are taken from the iterable only when a worker is about to be free, so a lazily
+    produced iterable (e.g. pages of a listing) is consumed together with the calls.
+    Results are yielded in order of items, the first exception is raised and calls which
+    have not started yet are cancelled.
+    """
+    if max_workers <= 1:
+        yield from map(func, items)
+        return
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        try:
+            for item in items:
+                if len(pending) >= max_workers:
+                    yield pending.popleft().result()
+                pending.append(executor.submit(func, item))
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
@@ -0,0 +1,179 @@
+#
+# Copyright (c) 2019 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import json
+import threading
+import time
+from collections import defaultdict
+
+from kubernetes.client.rest import ApiException
+
+from management_api.config import ENDPOINT_RESERVATION_TTL, RESOURCE_DOES_NOT_EXIST
+from management_api.utils.cache import register_cache
+from management_api.utils.errors_handling import KubernetesGetException
+from management_api.utils.kubernetes_resources import get_cached_informer, DEPLOYMENTS, \
+    NAMESPACES
+from management_api.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+MAX_ENDPOINTS_ANNOTATION = 'maxEndpoints'
+
+
+class EndpointReservations:
+    """Endpoints created (or being created) through this replica, per tenant.
+
+    Endpoints are counted by their deployments, which appear a moment after the endpoint
+    object is created. Until then the endpoint keeps a reserved slot, so concurrent creates
+    cannot get past maxEndpoints. Reservations are dropped when the deployment is seen, the
+    create fails or ttl passes.
+    """
+
+    def __init__(self, ttl=ENDPOINT_RESERVATION_TTL):
+        self.ttl = ttl
+        self._reservations = defaultdict(dict)
+        self._tenant_locks = defaultdict(threading.Lock)
+        self._lock = threading.Lock()
+        self.granted = 0
+        self.refused = 0
+
+    def tenant_lock(self, namespace):
+        with self._lock:
+            return self._tenant_locks[namespace]
+
+    def pending(self, namespace):
+        now = time.time()
+        with self._lock:
+            reservations = self._reservations.get(namespace, {})
+            for endpoint_name in [name for name, expires_at in reservations.items()
+                                  if expires_at <= now]:
+                del reservations[endpoint_name]
+            return list(reservations)
+
+    def add(self, namespace, endpoint_names, refused=0):
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            for endpoint_name in endpoint_names:
+                self._reservations[namespace][endpoint_name] = expires_at
+            self.granted += len(endpoint_names)
+            self.refused += refused
+
+    def discard(self, namespace, endpoint_name):
+        with self._lock:
+            reservations = self._reservations.get(namespace, {})
+            reservations.pop(endpoint_name, None)
+            if not reservations:
+                self._reservations.pop(namespace, None)
+
+    def clear(self):
+        with self._lock:
+            self._reservations.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self), 'ttl': self.ttl, 'granted': self.granted,
+                    'refused': self.refused}
+
+    def __len__(self):
+        return sum(len(reservations) for reservations in self._reservations.values())
+
+
+endpoint_reservations = register_cache('endpoint_reservations', EndpointReservations())
+
+
+def get_max_endpoints(api_instance, namespace, id_token=None):
+    """Returns maxEndpoints limit of the tenant or None if there is no limit"""
+    informer = get_cached_informer(NAMESPACES, id_token, 'get', namespace)
+    namespace_object = informer.get(None, namespace) if informer else None
+    if namespace_object is None:
+        try:
+            namespace_object = api_instance.read_namespace(namespace)
+        except ApiException as apiException:
+            raise KubernetesGetException('namespace', apiException)
+    annotations = namespace_object.metadata.annotations
+    if annotations and MAX_ENDPOINTS_ANNOTATION in annotations:
+        return int(annotations[MAX_ENDPOINTS_ANNOTATION])
+    return None
+
+
+def get_endpoint_number(apps_api_instance, namespace, id_token=None):
+    """Counts deployments of the tenant without listing all of them.
+
+    Deployments cache is used if available, otherwise a single item is listed and the rest
+    is taken from remainingItemCount of the list.
+    """
+    informer = get_cached_informer(DEPLOYMENTS, id_token, 'list', namespace)
+    if informer:
+        return informer.count(namespace)
+    try:
+        response = apps_api_instance.list_namespaced_deployment(namespace, limit=1,
+                                                                _preload_content=False)
+        deployments = json.loads(response.data)
+        metadata = deployments.get('metadata') or {}
+        if metadata.get('continue') and metadata.get('remainingItemCount') is None:
+            # API servers older than 1.15 do not count remaining items
+            return len(apps_api_instance.list_namespaced_deployment(namespace).items)
+    except ApiException as apiException:
+        raise KubernetesGetException('endpoint', apiException)
+    return len(deployments.get('items') or []) + (metadata.get('remainingItemCount') or 0)
+
+
+def deployment_exists(apps_api_instance, namespace, endpoint_name, id_token=None):
+    informer = get_cached_informer(DEPLOYMENTS, id_token, 'get', namespace)
+    if informer:
+        return informer.get(namespace, endpoint_name) is not None
+    try:
+        apps_api_instance.read_namespaced_deployment(endpoint_name, namespace,
+                                                     _preload_content=False)
+    except ApiException as apiException:
+        if apiException.status == RESOURCE_DOES_NOT_EXIST:
+            return False
+        raise KubernetesGetException('endpoint', apiException)
+    return True
+
+
+def reserve_endpoint_slots(api_instance, apps_api_instance, namespace, endpoint_names,
+                           id_token=None):
+    """Returns endpoint names, in given order, which got a slot within maxEndpoints.
+
+    Slots of endpoints about to be created are reserved under a lock of the tenant, so
+    concurrent creates through this replica are counted together with existing endpoints.
+    Slot of endpoint which failed to be created must be given back with release_endpoint_slot.
+    """
+    if not endpoint_names:
+        return []
+    max_endpoints = get_max_endpoints(api_instance, namespace, id_token)
+    if max_endpoints is None:
+        return list(endpoint_names)
+    with endpoint_reservations.tenant_lock(namespace):
+        pending = 0
+        for endpoint_name in endpoint_reservations.pending(namespace):
+            if deployment_exists(apps_api_instance, namespace, endpoint_name, id_token):
+                endpoint_reservations.discard(namespace, endpoint_name)
+            else:
+                pending += 1
+        free_slots = max_endpoints - get_endpoint_number(apps_api_instance, namespace,
+                                                         id_token) - pending
+        granted = list(endpoint_names)[:max(free_slots, 0)]
+        endpoint_reservations.add(namespace, granted,
+                                  refused=len(endpoint_names) - len(granted))
+    logger.debug(f'{len(granted)} of {len(endpoint_names)} endpoint slots reserved in '
+                 f'{namespace} tenant, {pending} pending, limit {max_endpoints}')
+    return granted
+
+
+def release_endpoint_slot(namespace, endpoint_name):
+    endpoint_reservations.discard(namespace, endpoint_name)
@@ -130,6 +130,30 @@ class TenantDoesNotExistException(ManagementApiException):
         raise falcon.HTTPNotFound(description=message)
 
 
+class UploadDoesNotExistException(ManagementApiException):
+    def __init__(self, upload_id):
+        super().__init__()
+        self.upload_id = upload_id
+
+    @staticmethod
+    def handler(ex, req, resp, params):
+        message = "Upload {} does not exist".format(ex.upload_id)
+        logger.error(message)
+        raise falcon.HTTPNotFound(description=message)
+
+
+class JobDoesNotExistException(ManagementApiException):
+    def __init__(self, job_id):
+        super().__init__()
+        self.job_id = job_id
+
+    @staticmethod
+    def handler(ex, req, resp, params):
+        message = "Job {} does not exist".format(ex.job_id)
+        logger.error(message)
+        raise falcon.HTTPNotFound(description=message)
+
+
 class EndpointDoesNotExistException(ManagementApiException):
     def __init__(self, endpoint_name):
         super().__init__()
@@ -212,7 +236,19 @@ custom_errors = [ManagementApiException, KubernetesCallException, KubernetesForb
                  TenantDoesNotExistException, InvalidParamException, MissingTokenException,
                  JsonSchemaException, EndpointDoesNotExistException, ModelDeleteException,
                  ModelDoesNotExistException, EndpointsReachedMaximumException,
-                 ResourceIsNotAvailableException]
+                 ResourceIsNotAvailableException, UploadDoesNotExistException,
+                 JobDoesNotExistException]
+
+
+def error_response(ex):
+    """Returns (status, message) which the handler of the exception would respond with"""
+    handler = getattr(ex, 'handler', None)
+    if handler is not None:
+        try:
+            handler(ex, None, None, None)
+        except falcon.HTTPError as httpError:
+            return httpError.status, httpError.description or httpError.title
+    return falcon.HTTP_INTERNAL_SERVER_ERROR, f'Unexpected error occurred: {ex}'
 
 
 def default_exception_handler(ex, req, resp, params):
@@ -0,0 +1,329 @@
+#
+# Copyright (c) 2019 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+from kubernetes import client
+from kubernetes.client.rest import ApiException
+from kubernetes.watch.watch import iter_resp_lines
+from urllib3.exceptions import ReadTimeoutError
+
+from management_api.config import K8S_ACCESS_REVIEW_TTL, K8S_ACCESS_REVIEW_CACHE_SIZE, \
+    K8S_FORBIDDEN
+from management_api.utils.cache import TTLCache, token_digest, register_cache
+from management_api.utils.errors_handling import KubernetesForbiddenException, \
+    KubernetesGetException
+from management_api.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+RESOURCE_VERSION_EXPIRED = 410
+MAX_BACKOFF = 30.0
+
+
+class ResourceVersionExpired(Exception):
+    pass
+
+
+def object_meta(obj):
+    """Returns (namespace, name, resource_version, labels) of typed or dict object"""
+    if isinstance(obj, dict):
+        metadata = obj.get('metadata') or {}
+        return metadata.get('namespace'), metadata.get('name'), \
+            metadata.get('resourceVersion'), metadata.get('labels') or {}
+    metadata = obj.metadata
+    return metadata.namespace, metadata.name, metadata.resource_version, metadata.labels or {}
+
+
+def parse_label_selector(label_selector):
+    requirements = []
+    if not label_selector:
+        return requirements
+    for requirement in label_selector.split(','):
+        if '!=' in requirement:
+            key, value = requirement.split('!=', 1)
+            requirements.append((key.strip(), value.strip(), False))
+        elif '=' in requirement:
+            key, value = requirement.replace('==', '=').split('=', 1)
+            requirements.append((key.strip(), value.strip(), True))
+    return requirements
+
+
+def labels_match(labels, requirements):
+    return all((labels.get(key) == value) == equal for key, value, equal in requirements)
+
+
+class KubernetesWatchSource:
+    """List and watch collection (cluster wide or namespaced) with a given list function.
+
+    Typed objects are deserialized to return_type, custom objects stay as dicts.
+    """
+
+    def __init__(self, list_func, *args, return_type=None, api_client=None):
+        self.list_func = list_func
+        self.args = args
+        self.return_type = return_type
+        self.api_client = api_client
+
+    def list(self):
+        response = self.list_func(*self.args)
+        if isinstance(response, dict):
+            return response.get('items') or [], response['metadata']['resourceVersion']
+        return response.items or [], response.metadata.resource_version
+
+    def watch(self, resource_version, timeout):
+        response = self.list_func(*self.args, watch=True, resource_version=resource_version,
+                                  _preload_content=False, _request_timeout=(timeout, timeout))
+        return self._events(response)
+
+    def _events(self, response):
+        try:
+            for line in iter_resp_lines(response):
+                event = json.loads(line)
+                raw_object = event['object']
+                if event['type'] == 'ERROR':
+                    if raw_object.get('code') == RESOURCE_VERSION_EXPIRED:
+                        raise ResourceVersionExpired(raw_object.get('message'))
+                    raise ApiException(status=raw_object.get('code'),
+                                       reason=raw_object.get('message'))
+                yield event['type'], self._deserialize(raw_object)
+        except ReadTimeoutError:
+            # no events within timeout, stream is reopened by the informer
+            return
+        finally:
+            response.close()
+            response.release_conn()
+
+    def _deserialize(self, raw_object):
+        if self.return_type is None:
+            return raw_object
+        data = SimpleNamespace(data=json.dumps(raw_object))
+        return self.api_client.deserialize(data, self.return_type)
+
+
+class Informer:
+    """Local copy of a resource collection kept up to date with a watch stream.
+
+    Indexes map an object to keys (e.g. endpoint it belongs to) and are updated together
+    with the store, so lookups by key do not scan the collection.
+    """
+
+    def __init__(self, resource, source, group='', max_staleness=30.0):
+        self.resource = resource
+        self.group = group
+        self.source = source
+        self.max_staleness = max_staleness
+        self.watch_timeout = max(1, int(max_staleness / 2))
+        self.resource_version = None
+        self.last_contact = None
+        self._store = {}
+        self._indexers = {}
+        self._indices = {}
+        self._lock = threading.RLock()
+        self._stopped = False
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name=f'informer-{self.resource}',
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped = True
+
+    def add_index(self, index_name, index_func):
+        with self._lock:
+            self._indexers[index_name] = index_func
+            self._indices[index_name] = {}
+            for namespace, objects in self._store.items():
+                for name, obj in objects.items():
+                    self._index_object(index_name, (namespace, name), obj)
+
+    def run(self):
+        backoff = 1.0
+        while not self._stopped:
+            try:
+                self.run_once()
+                backoff = 1.0
+            except Exception as e:
+                logger.warning(f'{self.resource} watch failed: {e}, retrying in {backoff}s')
+                time.sleep(backoff)
+                backoff = min(backoff * 2, MAX_BACKOFF)
+
+    def run_once(self):
+        if self.resource_version is None:
+            self.resync()
+        try:
+            events = self.source.watch(self.resource_version, self.watch_timeout)
+        except ApiException as apiException:
+            if apiException.status != RESOURCE_VERSION_EXPIRED:
+                raise
+            logger.info(f'{self.resource} resource version expired, listing again')
+            self.resource_version = None
+            return
+        self._touch()
+        try:
+            for event_type, obj in events:
+                self._handle_event(event_type, obj)
+        except ResourceVersionExpired:
+            logger.info(f'{self.resource} resource version expired, listing again')
+            self.resource_version = None
+
+    def resync(self):
+        items, resource_version = self.source.list()
+        store = {}
+        for item in items:
+            namespace, name, _, _ = object_meta(item)
+            store.setdefault(namespace, {})[name] = item
+        with self._lock:
+            self._store = store
+            self._indices = {index_name: {} for index_name in self._indexers}
+            for namespace, objects in store.items():
+                for name, obj in objects.items():
+                    for index_name in self._indexers:
+                        self._index_object(index_name, (namespace, name), obj)
+            self.resource_version = resource_version
+        self._touch()
+        logger.info(f'{self.resource} cache synced: {len(items)} objects')
+
+    def _handle_event(self, event_type, obj):
+        namespace, name, resource_version, _ = object_meta(obj)
+        with self._lock:
+            old = self._store.get(namespace, {}).get(name)
+            if old is not None:
+                for index_name in self._indexers:
+                    self._unindex_object(index_name, (namespace, name), old)
+            if event_type in ('ADDED', 'MODIFIED'):
+                self._store.setdefault(namespace, {})[name] = obj
+                for index_name in self._indexers:
+                    self._index_object(index_name, (namespace, name), obj)
+            elif event_type == 'DELETED':
+                objects = self._store.get(namespace, {})
+                objects.pop(name, None)
+                if not objects:
+                    self._store.pop(namespace, None)
+            if resource_version:
+                self.resource_version = resource_version
+        self._touch()
+
+    def _index_object(self, index_name, object_key, obj):
+        index = self._indices[index_name]
+        for key in self._indexers[index_name](obj):
+            index.setdefault(key, {})[object_key] = obj
+
+    def _unindex_object(self, index_name, object_key, obj):
+        index = self._indices[index_name]
+        for key in self._indexers[index_name](obj):
+            objects = index.get(key, {})
+            objects.pop(object_key, None)
+            if not objects:
+                index.pop(key, None)
+
+    def _touch(self):
+        self.last_contact = time.time()
+
+    def is_fresh(self):
+        return self.last_contact is not None and \
+            time.time() - self.last_contact <= self.max_staleness
+
+    def get(self, namespace, name):
+        with self._lock:
+            return self._store.get(namespace, {}).get(name)
+
+    def count(self, namespace):
+        with self._lock:
+            return len(self._store.get(namespace, {}))
+
+    def list(self, namespace, label_selector=None):
+        requirements = parse_label_selector(label_selector)
+        with self._lock:
+            objects = list(self._store.get(namespace, {}).values())
+        return [obj for obj in objects if labels_match(object_meta(obj)[3], requirements)]
+
+    def list_all(self):
+        with self._lock:
+            return [obj for objects in self._store.values() for obj in objects.values()]
+
+    def by_index(self, index_name, key):
+        with self._lock:
+            return list(self._indices[index_name].get(key, {}).values())
+
+
+class AccessReviewer:
+    """Answers whether the token owner may perform the verb, results are cached for a while."""
+
+    def __init__(self, authorization_client_factory, ttl=K8S_ACCESS_REVIEW_TTL,
+                 maxsize=K8S_ACCESS_REVIEW_CACHE_SIZE):
+        self.authorization_client_factory = authorization_client_factory
+        self.decisions = register_cache('kubernetes_access_reviews',
+                                        TTLCache(maxsize=maxsize, ttl=ttl))
+
+    def check(self, id_token, verb, group, resource, namespace):
+        key = (token_digest(id_token), verb, group, resource, namespace)
+        allowed = self.decisions.get(key)
+        if allowed is None:
+            allowed = self._review(id_token, verb, group, resource, namespace)
+            self.decisions.set(key, allowed)
+        if not allowed:
+            raise KubernetesForbiddenException(
+                resource, ApiException(status=K8S_FORBIDDEN,
+                                       reason=f'{verb} {resource} in {namespace} is not allowed'))
+
+    def _review(self, id_token, verb, group, resource, namespace):
+        attributes = client.V1ResourceAttributes(namespace=namespace, verb=verb, group=group,
+                                                 resource=resource)
+        body = client.V1SelfSubjectAccessReview(
+            spec=client.V1SelfSubjectAccessReviewSpec(resource_attributes=attributes))
+        try:
+            review = self.authorization_client_factory(id_token).\
+                create_self_subject_access_review(body)
+        except ApiException as apiException:
+            raise KubernetesGetException('access review', apiException)
+        return bool(review.status.allowed)
+
+
+class ResourceCache:
+
+    def __init__(self, informers, access_reviewer):
+        self.informers = informers
+        self.access_reviewer = access_reviewer
+
+    def start(self):
+        for informer in self.informers.values():
+            informer.start()
+
+    def informer(self, resource, id_token, verb, namespace):
+        """Returns informer able to answer for the caller or None if API server must be asked"""
+        informer = self.informers.get(resource)
+        if informer is None or not informer.is_fresh():
+            return None
+        self.access_reviewer.check(id_token, verb, informer.group, resource, namespace)
+        return informer
+
+
+_resource_cache = None
+
+
+def set_resource_cache(resource_cache):
+    global _resource_cache
+    _resource_cache = resource_cache
+
+
+def get_resource_cache():
+    return _resource_cache
@@ -15,17 +15,45 @@
 #
 
 import ipaddress
+import json
+from collections import Counter
 from functools import lru_cache
 from kubernetes import config, client
 from kubernetes.client.rest import ApiException
 
+from management_api.utils.cache import TTLCache, register_cache, token_digest, \
+    token_expiration
 from management_api.utils.errors_handling import InvalidParamException, KubernetesGetException
+from management_api.utils.kubernetes_cache import Informer, KubernetesWatchSource, \
+    AccessReviewer, ResourceCache, set_resource_cache, get_resource_cache, object_meta
 from management_api.utils.logger import get_logger
 from management_api.config import ING_NAME, ING_NAMESPACE, RESOURCE_DOES_NOT_EXIST, \
-    CRD_GROUP, CRD_VERSION, CRD_PLURAL
+    CRD_GROUP, CRD_VERSION, CRD_PLURAL, K8S_CACHE_MAX_STALENESS, K8S_CLIENT_CACHE_SIZE, \
+    K8S_CLIENT_CACHE_TTL, MGT_API_NAMESPACE
 
 logger = get_logger(__name__)
 
+NAMESPACES = 'namespaces'
+DEPLOYMENTS = 'deployments'
+PODS = 'pods'
+SECRETS = 'secrets'
+ENDPOINT_LABEL = 'endpoint'
+MODEL_INDEX = 'model'
+POD_PHASES = {'Running': 'running pods', 'Pending': 'pending pods', 'Failed': 'failed pods'}
+
+
+def endpoint_pods_index(pod):
+    namespace, _, _, labels = object_meta(pod)
+    if ENDPOINT_LABEL in labels:
+        return [(namespace, labels[ENDPOINT_LABEL])]
+    return []
+
+
+def endpoint_model_index(endpoint):
+    namespace, _, _, _ = object_meta(endpoint)
+    model_name = (endpoint.get('spec') or {}).get('modelName')
+    return [(namespace, model_name)] if model_name else []
+
 
 def transform_quota(quota):
     transformed = {}
@@ -48,7 +76,11 @@ def read_resource_quota(api_instance: client, name, namespace):
 
 def validate_quota_compliance(api_instance: client, namespace, endpoint_quota):
     tenant_quota = read_resource_quota(api_instance, name=namespace, namespace=namespace)
-    tenant_quota = tenant_quota.spec.hard
+    return check_quota_compliance(tenant_quota.spec.hard, namespace, endpoint_quota)
+
+
+def check_quota_compliance(tenant_quota, namespace, endpoint_quota):
+    """Checks endpoint resources against already read hard limits of the tenant quota"""
     if tenant_quota is not None:
         if endpoint_quota == {}:
             raise InvalidParamException("resources",
@@ -108,9 +140,44 @@ def get_dex_external_host(api_instance: client):
                              ing_name=ing_name)
 
 
+class TokenApiClient:
+    """Per token view on the shared ApiClient.
+
+    Requests go through the connection pool of the shared client, only the Authorization
+    header differs, so keeping a client per token costs no sockets or threads.
+    """
+
+    def __init__(self, api_client, id_token):
+        self.api_client = api_client
+        self.authorization = "Bearer " + id_token
+
+    def call_api(self, resource_path, method, path_params=None, query_params=None,
+                 header_params=None, *args, **kwargs):
+        header_params = dict(header_params or {})
+        header_params['Authorization'] = self.authorization
+        return self.api_client.call_api(resource_path, method, path_params, query_params,
+                                        header_params, *args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.api_client, name)
+
+
+token_api_clients = register_cache('kubernetes_clients',
+                                   TTLCache(maxsize=K8S_CLIENT_CACHE_SIZE,
+                                            ttl=K8S_CLIENT_CACHE_TTL))
+
+
+@lru_cache(maxsize=None)
+def get_shared_api_client():
+    return client.ApiClient(get_k8s_configuration())
+
+
 def get_simple_client(id_token):
-    api_client = client.ApiClient(get_k8s_configuration())
-    api_client.set_default_header("Authorization", "Bearer " + id_token)
+    key = token_digest(id_token)
+    api_client = token_api_clients.get(key)
+    if api_client is None:
+        api_client = TokenApiClient(get_shared_api_client(), id_token)
+        token_api_clients.set(key, api_client, expires_at=token_expiration(id_token))
     return api_client
 
 
@@ -123,43 +190,131 @@ def get_k8s_configuration():
     return configuration
 
 
-@lru_cache(maxsize=None)
 def get_k8s_api_client(id_token):
     api_instance = client.CoreV1Api(get_simple_client(id_token))
     return api_instance
 
 
-@lru_cache(maxsize=None)
 def get_k8s_api_custom_client(id_token):
     custom_obj_api_instance = client.CustomObjectsApi(get_simple_client(id_token))
     return custom_obj_api_instance
 
 
-@lru_cache(maxsize=None)
 def get_k8s_rbac_api_client(id_token):
     rbac_api_instance = client.RbacAuthorizationV1Api(get_simple_client(id_token))
     return rbac_api_instance
 
 
-@lru_cache(maxsize=None)
 def get_k8s_apps_api_client(id_token):
     apps_api_client = client.AppsV1Api(get_simple_client(id_token))
     return apps_api_client
 
 
+def get_k8s_authorization_api_client(id_token):
+    authorization_api_client = client.AuthorizationV1Api(get_simple_client(id_token))
+    return authorization_api_client
+
+
 @lru_cache(maxsize=None)
 def get_k8s_extensions_api_client():
     apps_api_client = client.ExtensionsV1beta1Api(client.ApiClient(get_k8s_configuration()))
     return apps_api_client
 
 
-def get_crd_subject_name_and_resources(custom_api_instance, namespace, endpoint_name):
+def start_resource_cache():
+    api_client = client.ApiClient(get_k8s_configuration())
+    core_api = client.CoreV1Api(api_client)
+    apps_api = client.AppsV1Api(api_client)
+    custom_api = client.CustomObjectsApi(api_client)
+    sources = {
+        NAMESPACES: ('', KubernetesWatchSource(core_api.list_namespace,
+                                               return_type='V1Namespace',
+                                               api_client=api_client)),
+        DEPLOYMENTS: ('apps', KubernetesWatchSource(apps_api.list_deployment_for_all_namespaces,
+                                                    return_type='V1Deployment',
+                                                    api_client=api_client)),
+        PODS: ('', KubernetesWatchSource(core_api.list_pod_for_all_namespaces,
+                                         return_type='V1Pod', api_client=api_client)),
+        # only secrets of management api namespace, which are copied to tenants
+        SECRETS: ('', KubernetesWatchSource(core_api.list_namespaced_secret, MGT_API_NAMESPACE,
+                                            return_type='V1Secret', api_client=api_client)),
+        CRD_PLURAL: (CRD_GROUP, KubernetesWatchSource(custom_api.list_cluster_custom_object,
+                                                      CRD_GROUP, CRD_VERSION, CRD_PLURAL)),
+    }
+    informers = {resource: Informer(resource, source, group=group,
+                                    max_staleness=K8S_CACHE_MAX_STALENESS)
+                 for resource, (group, source) in sources.items()}
+    informers[PODS].add_index(ENDPOINT_LABEL, endpoint_pods_index)
+    informers[CRD_PLURAL].add_index(MODEL_INDEX, endpoint_model_index)
+    resource_cache = ResourceCache(informers, AccessReviewer(get_k8s_authorization_api_client))
+    resource_cache.start()
+    set_resource_cache(resource_cache)
+    logger.info('Kubernetes resource cache started')
+    return resource_cache
+
+
+def get_cached_informer(resource, id_token, verb, namespace):
+    resource_cache = get_resource_cache()
+    if resource_cache is None or id_token is None:
+        return None
+    return resource_cache.informer(resource, id_token, verb, namespace)
+
+
+def get_endpoint_object(custom_api_instance, namespace, endpoint_name, id_token=None):
+    informer = get_cached_informer(CRD_PLURAL, id_token, 'get', namespace)
+    if informer:
+        crd = informer.get(namespace, endpoint_name)
+        if crd is None:
+            raise KubernetesGetException('endpoint', ApiException(status=RESOURCE_DOES_NOT_EXIST,
+                                                                  reason='Not Found'))
+        return crd
     try:
         crd = custom_api_instance.get_namespaced_custom_object(CRD_GROUP, CRD_VERSION, namespace,
                                                                CRD_PLURAL, endpoint_name)
     except ApiException as apiException:
         raise KubernetesGetException('endpoint', apiException)
+    return crd
+
 
+def get_model_endpoints(custom_api_instance, namespace, model_name, id_token=None):
+    """Returns InferenceEndpoint objects serving the model, looked up in CR specs"""
+    informer = get_cached_informer(CRD_PLURAL, id_token, 'list', namespace)
+    if informer:
+        return informer.by_index(MODEL_INDEX, (namespace, model_name))
+    try:
+        crds = custom_api_instance.list_namespaced_custom_object(CRD_GROUP, CRD_VERSION,
+                                                                 namespace, CRD_PLURAL)
+    except ApiException as apiException:
+        raise KubernetesGetException('endpoints', apiException)
+    return [crd for crd in crds.get('items') or []
+            if (crd.get('spec') or {}).get('modelName') == model_name]
+
+
+def get_endpoints(custom_api_instance, namespace, id_token=None):
+    informer = get_cached_informer(CRD_PLURAL, id_token, 'list', namespace)
+    if informer:
+        return informer.list(namespace)
+    try:
+        crds = custom_api_instance.list_namespaced_custom_object(CRD_GROUP, CRD_VERSION,
+                                                                 namespace, CRD_PLURAL)
+    except ApiException as apiException:
+        raise KubernetesGetException('endpoints', apiException)
+    return crds.get('items') or []
+
+
+def get_all_endpoints(custom_api_instance, id_token=None):
+    """Returns InferenceEndpoint objects of all namespaces, listed with a single call"""
+    informer = get_cached_informer(CRD_PLURAL, id_token, 'list', None)
+    if informer:
+        return informer.list_all()
+    try:
+        crds = custom_api_instance.list_cluster_custom_object(CRD_GROUP, CRD_VERSION, CRD_PLURAL)
+    except ApiException as apiException:
+        raise KubernetesGetException('endpoints', apiException)
+    return crds.get('items') or []
+
+
+def get_crd_subject_name_and_resources(crd):
     subject_name = crd['spec']['subjectName']
     resources = "Not specified"
     if 'resources' in crd['spec']:
@@ -168,35 +323,47 @@ def get_crd_subject_name_and_resources(custom_api_instance, namespace, endpoint_
     return subject_name, resources
 
 
-def get_replicas(apps_api_instance, namespace, endpoint_name):
-    try:
-        deployment_status = apps_api_instance.read_namespaced_deployment_status(
-            endpoint_name, namespace)
-    except ApiException as apiException:
-        raise KubernetesGetException('deployment', apiException)
+def get_replicas(apps_api_instance, namespace, endpoint_name, id_token=None):
+    informer = get_cached_informer(DEPLOYMENTS, id_token, 'get', namespace)
+    deployment_status = informer.get(namespace, endpoint_name) if informer else None
+    if deployment_status is None:
+        try:
+            deployment_status = apps_api_instance.read_namespaced_deployment_status(
+                endpoint_name, namespace)
+        except ApiException as apiException:
+            raise KubernetesGetException('deployment', apiException)
     available_replicas = deployment_status.to_dict()['status']['available_replicas']
     unavailable_replicas = deployment_status.to_dict()['status']['unavailable_replicas']
     return {'available': available_replicas, 'unavailable': unavailable_replicas}
 
 
-def get_endpoint_status(api_instance, namespace, endpoint_name):
+def get_endpoint_pod_phases(api_instance, namespace, endpoint_name, id_token=None):
+    informer = get_cached_informer(PODS, id_token, 'list', namespace)
+    if informer:
+        pods = informer.by_index(ENDPOINT_LABEL, (namespace, endpoint_name))
+        return [pod.status.phase for pod in pods]
     try:
-        pods = api_instance.list_namespaced_pod(namespace)
+        # skip deserialization to models, only pod phases are needed
+        response = api_instance.list_namespaced_pod(
+            namespace, label_selector=f'{ENDPOINT_LABEL}={endpoint_name}',
+            _preload_content=False)
     except ApiException as apiException:
         raise KubernetesGetException('pods', apiException)
-    pod_phases = []
-    for pod in pods.to_dict()['items']:
-        if pod['metadata']['labels']['endpoint'] == endpoint_name:
-            pod_phase = pod['status']['phase']
-            pod_phases.append(pod_phase)
-    running = sum(pod_phase == 'Running' for pod_phase in pod_phases)
-    pending = sum(pod_phase == 'Pending' for pod_phase in pod_phases)
-    failed = sum(pod_phase == 'Failed' for pod_phase in pod_phases)
-    status = {'running pods': running, 'pending pods': pending, 'failed pods': failed}
+    pods = json.loads(response.data)['items']
+    return [pod.get('status', {}).get('phase') for pod in pods]
+
+
+def get_endpoint_status(api_instance, namespace, endpoint_name, id_token=None):
+    phases_count = Counter(get_endpoint_pod_phases(api_instance, namespace, endpoint_name,
+                                                   id_token))
+    status = {status_name: phases_count[phase] for phase, status_name in POD_PHASES.items()}
     return status
 
 
 def endpoint_exists(endpoint_name, namespace, id_token: str):
+    informer = get_cached_informer(CRD_PLURAL, id_token, 'get', namespace)
+    if informer:
+        return informer.get(namespace, endpoint_name) is not None
     custom_api_instance = get_k8s_api_custom_client(id_token)
     try:
         custom_api_instance.get_namespaced_custom_object(CRD_GROUP, CRD_VERSION, namespace,
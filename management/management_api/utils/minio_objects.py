@@ -0,0 +1,92 @@
+#
+# Copyright (c) 2019 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from functools import partial
+
+from management_api.config import minio_client, MINIO_DELETE_CONCURRENCY
+from management_api.utils.concurrency import bounded_map
+from management_api.utils.errors_handling import MinioCallException
+from management_api.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DELETE_BATCH_SIZE = 1000
+
+
+def list_pages(bucket: str, prefix: str = '', page_size: int = DELETE_BATCH_SIZE):
+    """Yields non empty lists of up to page_size objects with the prefix"""
+    continuation = {}
+    while True:
+        response = minio_client.list_objects_v2(Bucket=bucket, Prefix=prefix,
+                                                MaxKeys=page_size, **continuation)
+        if response.get('Contents'):
+            yield response['Contents']
+        if not response.get('IsTruncated'):
+            return
+        continuation = {'ContinuationToken': response['NextContinuationToken']}
+
+
+def list_keys(bucket: str, prefix: str = ''):
+    """Yields keys of objects with the prefix in lists of up to DELETE_BATCH_SIZE keys"""
+    for objects in list_pages(bucket, prefix):
+        yield [object['Key'] for object in objects]
+
+
+def list_prefixes(bucket: str, prefix: str = ''):
+    """Yields common prefixes one level below the prefix, e.g. versions of a model"""
+    continuation = {}
+    while True:
+        response = minio_client.list_objects_v2(Bucket=bucket, Prefix=prefix, Delimiter='/',
+                                                MaxKeys=DELETE_BATCH_SIZE, **continuation)
+        for common_prefix in response.get('CommonPrefixes', []):
+            yield common_prefix['Prefix']
+        if not response.get('IsTruncated'):
+            return
+        continuation = {'ContinuationToken': response['NextContinuationToken']}
+
+
+def prefix_exists(bucket: str, prefix: str):
+    response = minio_client.list_objects_v2(Bucket=bucket, Prefix=prefix, MaxKeys=1)
+    return bool(response.get('Contents'))
+
+
+def delete_keys(bucket: str, keys: list):
+    response = minio_client.delete_objects(
+        Bucket=bucket, Delete={'Objects': [{'Key': key} for key in keys], 'Quiet': True})
+    errors = response.get('Errors', [])
+    if errors:
+        raise MinioCallException(f'{len(errors)} objects could not be deleted from {bucket}, '
+                                 f'e.g. {errors[0].get("Key")}: {errors[0].get("Message")}')
+    return len(keys)
+
+
+def delete_objects(bucket: str, prefix: str = '', progress=None,
+                   max_workers=MINIO_DELETE_CONCURRENCY):
+    """Deletes objects with the prefix using batched DeleteObjects calls.
+
+    Keys are listed once and batches are deleted while the listing goes on, up to
+    max_workers batches at once. progress, if given, is called with the number of objects
+    deleted so far after every batch. Returns number of deleted objects, Minio call
+    failures are raised as ClientError.
+    """
+    deleted = 0
+    for count in bounded_map(partial(delete_keys, bucket), list_keys(bucket, prefix),
+                             max_workers):
+        deleted += count
+        logger.debug(f'{deleted} objects deleted from {bucket}/{prefix}')
+        if progress is not None:
+            progress(deleted)
+    return deleted
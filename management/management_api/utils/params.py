@@ -0,0 +1,36 @@
+#
+# Copyright (c) 2019 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+from management_api.utils.errors_handling import InvalidParamException
+
+
+def param_is_true(req, name):
+    return req.get_param(name, default='false').lower() in ('true', '1')
+
+
+def get_limit(req, max_limit):
+    limit = req.get_param('limit')
+    if limit is None:
+        return None
+    try:
+        limit = int(limit)
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= max_limit:
+        raise InvalidParamException('limit', 'Wrong limit parameter value',
+                                    f'Limit must be an integer from 1 to {max_limit}.')
+    return limit
@@ -0,0 +1,87 @@
+#
+# Copyright (c) 2019 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+from concurrent.futures import wait, FIRST_COMPLETED
+
+from management_api.utils.concurrency import submit
+from management_api.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class ProvisioningStep:
+    """Step creating one resource, with optional undo removing it again"""
+
+    __slots__ = ('name', 'run', 'undo', 'requires')
+
+    def __init__(self, name, run, undo=None, requires=()):
+        self.name = name
+        self.run = run
+        self.undo = undo
+        self.requires = tuple(requires)
+
+
+class Provisioning:
+    """Runs provisioning steps and undoes the completed ones if any step fails.
+
+    A step starts as soon as all steps it requires are completed, so independent steps run
+    at the same time. Completed steps are recorded in order of completion and rollback undoes
+    exactly them in reverse order, never resources which existed before or were not created.
+    """
+
+    def __init__(self, steps):
+        self.steps = {step.name: step for step in steps}
+        self.completed = []
+
+    def run(self, *args):
+        pending = dict(self.steps)
+        running = {}
+        error = None
+        while running or (pending and error is None):
+            if error is None:
+                ready = [step for step in pending.values()
+                         if all(name in self.completed for name in step.requires)]
+                for step in ready:
+                    running[submit(step.run, *args)] = pending.pop(step.name)
+                if not running:
+                    raise ValueError(f'Provisioning steps {sorted(pending)} cannot be started')
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                step = running.pop(future)
+                try:
+                    future.result()
+                except Exception as e:
+                    logger.error(f'Provisioning step {step.name} failed: {e}')
+                    error = error or e
+                else:
+                    self.completed.append(step.name)
+        if error is not None:
+            self.rollback(*args)
+            raise error
+        return self.completed
+
+    def rollback(self, *args):
+        """Undoes completed steps, failures are logged so the remaining steps are undone"""
+        for name in reversed(self.completed):
+            step = self.steps[name]
+            if step.undo is None:
+                continue
+            try:
+                step.undo(*args)
+            except Exception as e:
+                logger.error(f'Could not undo provisioning step {name}: {e}')
+        self.completed = []
@@ -15,28 +15,41 @@
 #
 
 from management_api.upload.multipart import StartMultiModel, CompleteMultiModel, WriteMultiModel, \
-    AbortMultiModel, UploadDir
-from management_api.tenants import Tenants
-from management_api.endpoints import Endpoints, EndpointScale, Endpoint
+    AbortMultiModel, UploadDir, ListParts
+from management_api.tenants import Tenants, TenantsBatch, TenantsSecrets, TenantsUsage, \
+    TenantUsage
+from management_api.endpoints import Endpoints, EndpointsBatch, EndpointScale, Endpoint
 from management_api.authenticate import Authenticate, Token
-from management_api.models import Models
+from management_api.models import Models, FinalizeModel, ModelEndpoints
 from management_api.servings import Servings, Serving
+from management_api.metrics import CacheMetrics
+from management_api.jobs import Job
 
 routes = [
     dict(resource=Tenants(), url='/tenants'),
+    dict(resource=TenantsBatch(), url='/tenants:batch'),
+    dict(resource=TenantsSecrets(), url='/tenants:reconcileSecrets'),
+    dict(resource=TenantsUsage(), url='/tenants:usage'),
+    dict(resource=TenantUsage(), url='/tenants/{tenant_name}/usage'),
     dict(resource=Endpoints(), url='/tenants/{tenant_name}/endpoints'),
+    dict(resource=EndpointsBatch(), url='/tenants/{tenant_name}/endpoints:batch'),
     dict(resource=EndpointScale(), url='/tenants/{tenant_name}/endpoints/{endpoint_name}/replicas'),
     dict(resource=Endpoint(), url='/tenants/{tenant_name}/endpoints/{endpoint_name}'),
     dict(resource=StartMultiModel(), url='/tenants/{tenant_name}/upload/start'),
     dict(resource=WriteMultiModel(), url='/tenants/{tenant_name}/upload'),
+    dict(resource=ListParts(), url='/tenants/{tenant_name}/upload/parts'),
     dict(resource=CompleteMultiModel(), url='/tenants/{tenant_name}/upload/done'),
     dict(resource=AbortMultiModel(), url='/tenants/{tenant_name}/upload/abort'),
     dict(resource=UploadDir(), url='/tenants/{tenant_name}/upload/dir'),
     dict(resource=Authenticate(), url='/authenticate'),
     dict(resource=Token(), url='/authenticate/token'),
     dict(resource=Models(), url='/tenants/{tenant_name}/models'),
+    dict(resource=FinalizeModel(), url='/tenants/{tenant_name}/models/finalize'),
+    dict(resource=ModelEndpoints(), url='/tenants/{tenant_name}/models/{model_name}/endpoints'),
+    dict(resource=Job(), url='/tenants/{tenant_name}/jobs/{job_id}'),
     dict(resource=Servings(), url='/servings'),
     dict(resource=Serving(), url='/servings/{serving_name}'),
+    dict(resource=CacheMetrics(), url='/metrics/caches'),
 ]
 
 
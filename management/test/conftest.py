@@ -24,14 +24,18 @@ from unittest import mock
 
 @pytest.fixture(scope='session')
 def client():
-    with mock.patch('management_api.main.AuthMiddleware') as middleware:
+    with mock.patch('management_api.main.AuthMiddleware') as middleware, \
+            mock.patch('management_api.main.tenant_usage'), \
+            mock.patch('management_api.main.upload_sessions'):
         middleware.return_value = AuthMiddlewareMock()
         return testing.TestClient(create_app())
 
 
 @pytest.fixture(scope='session')
 def client_with_auth():
-    return testing.TestClient(create_app())
+    with mock.patch('management_api.main.tenant_usage'), \
+            mock.patch('management_api.main.upload_sessions'):
+        return testing.TestClient(create_app())
 
 
 @pytest.fixture(scope='function')
@@ -16,6 +16,12 @@
 
 import pytest
 import falcon
+from unittest.mock import Mock
+
+from management_api.authenticate.authenticate import TokenDecoder
+from test_utils.token_stuff import user_token, admin_token
+
+KEY_ID = 'e5b2b3f988394aab01f05c7c0f23cb9c02a736f4'
 
 
 @pytest.mark.parametrize("params, expected_redirect_url", [({'offline': True}, 'oob'),
@@ -39,3 +45,46 @@ def test_token_post(mocker, client, body, expected_status):
     if expected_status is falcon.HTTP_OK:
         get_token_mock.assert_called_once()
         assert 'token' in result.text
+
+
+def key_store_mock(keys):
+    key_store = Mock()
+    key_store.get.side_effect = keys.get
+    key_store.keys.return_value = keys
+    return key_store
+
+
+def test_token_decoder_caches_verified_claims(mocker):
+    mocker.patch('management_api.utils.cache.time.time').return_value = 1538148672.0
+    key_store = key_store_mock({KEY_ID: 'key', 'other': 'other key'})
+    token_decoder = TokenDecoder(key_store=key_store)
+    jwt_decode_mock = mocker.patch.object(token_decoder.jwt, 'decode')
+    jwt_decode_mock.side_effect = lambda token, key: {'exp': 1538560869, 'token': token}
+
+    for _ in range(3):
+        assert token_decoder.decode(user_token)['token'] == user_token
+    assert token_decoder.decode(admin_token)['token'] == admin_token
+
+    assert jwt_decode_mock.call_count == 2
+    assert all(call[0][1] == 'key' for call in jwt_decode_mock.call_args_list)
+    assert token_decoder.verified_tokens.stats()['hits'] == 2
+
+
+def test_token_decoder_does_not_cache_failures(mocker):
+    token_decoder = TokenDecoder(key_store=key_store_mock({KEY_ID: 'key'}))
+    jwt_decode_mock = mocker.patch.object(token_decoder.jwt, 'decode')
+    jwt_decode_mock.side_effect = Exception('invalid signature')
+
+    assert token_decoder.decode(user_token) is None
+    assert token_decoder.decode(user_token) is None
+    assert jwt_decode_mock.call_count == 2
+
+
+def test_token_decoder_rejects_unknown_key_id(mocker):
+    key_store = key_store_mock({'old': 'old key'})
+    token_decoder = TokenDecoder(key_store=key_store)
+    jwt_decode_mock = mocker.patch.object(token_decoder.jwt, 'decode')
+
+    assert token_decoder.decode(user_token) is None
+    key_store.get.assert_called_once_with(KEY_ID)
+    jwt_decode_mock.assert_not_called()
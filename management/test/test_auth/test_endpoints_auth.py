@@ -18,7 +18,6 @@ import pytest
 import falcon
 import json
 from jwt import jwk_from_dict
-from cryptography.hazmat.primitives.serialization import Encoding, PublicFormat
 
 from test_utils.token_stuff import keys_json, user_token,\
     admin_token, invalid_token
@@ -26,15 +25,10 @@ from test_utils.token_stuff import keys_json, user_token,\
 
 def get_keys():
     data = json.loads(keys_json)
-    keys = []
+    keys = {}
     for k in data['keys']:
-        jwk = jwk_from_dict(k)
-        print(jwk.keyobj.public_bytes(Encoding.PEM, PublicFormat.SubjectPublicKeyInfo))
-        keys.append(jwk)
-
-    print("Number of imported keys :" + str(len(keys)))
-    print("Keys: {}".format(keys))
-    return keys
+        keys[k['kid']] = jwk_from_dict(k)
+    return keys, None
 
 
 @pytest.mark.parametrize("body, tenant_name, expected_status",
@@ -0,0 +1,142 @@
+#
+# Copyright (c) 2019 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from management_api.authenticate.auth_controller import get_keys_from_dex, cache_max_age
+from management_api.authenticate.key_store import KeyStore
+from test_utils.token_stuff import keys_json
+
+KEY_ID = 'e5b2b3f988394aab01f05c7c0f23cb9c02a736f4'
+
+
+@pytest.fixture(scope='function')
+def jwks_server(mocker):
+    requests_served = []
+
+    class JWKSHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests_served.append(self.path)
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Cache-Control', 'max-age=120, must-revalidate, no-transform')
+            self.end_headers()
+            self.wfile.write(keys_json.encode('utf-8'))
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(('127.0.0.1', 0), JWKSHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    mocker.patch('management_api.authenticate.auth_controller.DEX_URL',
+                 f'http://127.0.0.1:{server.server_port}')
+    yield requests_served
+    server.shutdown()
+    server.server_close()
+
+
+class SlowFetch:
+
+    def __init__(self, results, delay=0.1):
+        self.results = list(results)
+        self.delay = delay
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        time.sleep(self.delay)
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result, 60
+
+
+@pytest.mark.parametrize("cache_control, expected_max_age",
+                         [(None, None), ('max-age=120, must-revalidate', 120),
+                          ('public', None), ('no-store', 0)])
+def test_cache_max_age(cache_control, expected_max_age):
+    assert cache_max_age(cache_control) == expected_max_age
+
+
+def test_get_keys_from_dex(jwks_server):
+    keys, max_age = get_keys_from_dex()
+
+    assert list(keys) == [KEY_ID]
+    assert max_age == 120
+    assert jwks_server == ['/dex/keys']
+
+
+def test_key_store_fetches_once_for_concurrent_readers(jwks_server, mocker):
+    mocker.patch.object(KeyStore, '_start')
+    key_store = KeyStore()
+    found = []
+    readers = [threading.Thread(target=lambda: found.append(key_store.get(KEY_ID)))
+               for _ in range(5)]
+    for reader in readers:
+        reader.start()
+    for reader in readers:
+        reader.join()
+
+    assert len(found) == 5 and all(found)
+    assert len(jwks_server) == 1
+    assert key_store.next_refresh - key_store.last_fetch == pytest.approx(120, abs=1)
+    KeyStore._start.assert_called_once()
+
+
+def test_key_store_refreshes_in_background_for_unknown_key(mocker):
+    mocker.patch.object(KeyStore, '_start')
+    fetch = SlowFetch([{'old': 'old key'}, {'old': 'old key', 'new': 'new key'}])
+    key_store = KeyStore(fetch=fetch, min_refresh_interval=0.05)
+    assert key_store.get('old') == 'old key'
+
+    time.sleep(0.05)
+    started = time.time()
+    assert key_store.get('new') is None
+    assert key_store.get('new') is None
+    assert time.time() - started < fetch.delay
+
+    deadline = time.time() + 5
+    while 'new' not in key_store.keys() and time.time() < deadline:
+        time.sleep(0.01)
+    assert key_store.get('new') == 'new key'
+    assert fetch.calls == 2
+
+
+def test_key_store_limits_refreshes(mocker):
+    mocker.patch.object(KeyStore, '_start')
+    fetch = SlowFetch([{'old': 'old key'}], delay=0)
+    key_store = KeyStore(fetch=fetch, min_refresh_interval=60)
+
+    for _ in range(10):
+        assert key_store.get('unknown') is None
+    assert fetch.calls == 1
+
+
+def test_key_store_keeps_keys_when_fetch_fails(mocker):
+    mocker.patch.object(KeyStore, '_start')
+    fetch = SlowFetch([ConnectionError('dex down'), {'old': 'old key'},
+                       ConnectionError('dex down')], delay=0)
+    key_store = KeyStore(fetch=fetch, min_refresh_interval=0)
+
+    assert key_store.get('old') is None
+    assert key_store.get('old') == 'old key'
+    assert key_store.refresh() is False
+    assert key_store.get('old') == 'old key'
@@ -15,9 +15,12 @@
 #
 
 from management_api.endpoints.endpoint_utils import create_endpoint, delete_endpoint, \
-    create_url_to_service, update_endpoint, scale_endpoint, list_endpoints, view_endpoint
+    create_url_to_service, update_endpoint, scale_endpoint, list_endpoints, view_endpoint, \
+    check_endpoint_model, run_endpoints_batch
+from botocore.exceptions import ClientError
 from kubernetes.client.rest import ApiException
 import pytest
+import threading
 from unittest.mock import Mock
 
 from test_utils.token_stuff import user_token
@@ -42,9 +45,9 @@ def test_create_endpoint(mocker, url_to_service_endpoint_utils,
     ing_ip_mock, ing_ip_mock_return_values = url_to_service_endpoint_utils
     create_custom_client_mock, custom_client = custom_client_mock_endpoint_utils
     create_apps_client_mock, apps_client = apps_client_mock_endpoint_utils
-    verify_endpoint_amount_mock = mocker.patch(
-         'management_api.endpoints.endpoint_utils.verify_endpoint_amount')
-    verify_endpoint_amount_mock.return_value = None
+    reserve_endpoint_slots_mock = mocker.patch(
+         'management_api.endpoints.endpoint_utils.reserve_endpoint_slots')
+    reserve_endpoint_slots_mock.return_value = ['test']
     validate_quota_compliance_mock = mocker.patch(
         'management_api.endpoints.endpoint_utils.validate_quota_compliance')
     parameters_resources_mock = mocker.patch(
@@ -84,51 +87,40 @@ def test_delete_endpoint(custom_client_mock_endpoint_utils,
     create_custom_client_mock.assert_called_once()
 
 
-call_data = [(scale_endpoint, {'replicas': 2}),
+call_data = [(scale_endpoint, {'replicas': 2}, {'spec': {'replicas': 2}}),
              (update_endpoint, {'modelName': 'test',
-                                'modelVersionPolicy': '{specific {versions: 2}}'})]
+                                'modelVersionPolicy': '{specific {versions: 2}}'},
+              {'spec': {'modelName': 'test',
+                        'modelVersionPolicy': '{specific{versions:2 }}'}}),
+             (update_endpoint, {'resources': {'limits.cpu': '2'}},
+              {'spec': {'resources': {'limits': {'cpu': '2'}}}})]
 
 
-@pytest.mark.parametrize("method, arguments", call_data)
-def test_read_endpoint_fail(custom_client_mock_endpoint_utils, api_client_mock_endpoint_utils,
-                            url_to_service_endpoint_utils, method, arguments):
-    ing_ip_mock, ing_ip_mock_return_values = url_to_service_endpoint_utils
-    create_custom_client_mock, custom_client = custom_client_mock_endpoint_utils
-    with pytest.raises(KubernetesGetException):
-        custom_client.get_namespaced_custom_object.side_effect = ApiException()
-        method(parameters=arguments, namespace="test", endpoint_name="test",
-               id_token=user_token)
-    create_custom_client_mock.assert_called_once()
-    custom_client.get_namespaced_custom_object.assert_called_once()
-
-
-@pytest.mark.parametrize("method, arguments", call_data)
+@pytest.mark.parametrize("method, arguments, patch", call_data)
 def test_patch_endpoint_fail(custom_client_mock_endpoint_utils,
-                             url_to_service_endpoint_utils, method, arguments):
+                             url_to_service_endpoint_utils, method, arguments, patch):
     ing_ip_mock, ing_ip_mock_return_values = url_to_service_endpoint_utils
     create_custom_client_mock, custom_client = custom_client_mock_endpoint_utils
     with pytest.raises(KubernetesUpdateException):
-        custom_client.get_namespaced_custom_object.return_value = {'spec': {}}
         custom_client.patch_namespaced_custom_object.side_effect = ApiException()
         method(parameters=arguments, namespace="test", endpoint_name="test",
                id_token=user_token)
-        method(parameters=arguments, namespace="test", id_token=user_token)
     create_custom_client_mock.assert_called_once()
-    custom_client.get_namespaced_custom_object.assert_called_once()
+    custom_client.get_namespaced_custom_object.assert_not_called()
     custom_client.patch_namespaced_custom_object.assert_called_once()
 
 
-@pytest.mark.parametrize("method, arguments", call_data)
+@pytest.mark.parametrize("method, arguments, patch", call_data)
 def test_patch_endpoint_success(custom_client_mock_endpoint_utils,
-                                url_to_service_endpoint_utils, method, arguments):
+                                url_to_service_endpoint_utils, method, arguments, patch):
     ing_ip_mock, ing_ip_mock_return_values = url_to_service_endpoint_utils
     create_custom_client_mock, custom_client = custom_client_mock_endpoint_utils
-    custom_client.get_namespaced_custom_object.return_value = {'spec': {}}
     method(parameters=arguments, namespace="test", endpoint_name="test",
            id_token=user_token)
     create_custom_client_mock.assert_called_once()
-    custom_client.get_namespaced_custom_object.assert_called_once()
-    custom_client.patch_namespaced_custom_object.assert_called_once()
+    custom_client.get_namespaced_custom_object.assert_not_called()
+    custom_client.patch_namespaced_custom_object.assert_called_once_with(
+        'ai.intel.com', 'v1', 'test', 'inference-endpoints', 'test', patch)
     ing_ip_mock.assert_called_once()
 
 
@@ -165,6 +157,22 @@ def test_list_endpoints(mocker, apps_client_mock_endpoint_utils, tenant_exceptio
     tenant_exists_mock.assert_called_once()
 
 
+def test_list_endpoints_from_cache(mocker, apps_client_mock_endpoint_utils):
+    mocker.patch('management_api.endpoints.endpoint_utils.tenant_exists').return_value = True
+    informer = Mock()
+    informer.list.return_value = []
+    cached_informer_mock = mocker.patch(
+        'management_api.endpoints.endpoint_utils.get_cached_informer')
+    cached_informer_mock.return_value = informer
+    create_apps_client_mock, apps_client = apps_client_mock_endpoint_utils
+
+    assert list_endpoints(namespace="test", id_token=user_token) == []
+
+    cached_informer_mock.assert_called_once_with('deployments', user_token, 'list', 'test')
+    informer.list.assert_called_once_with('test')
+    apps_client.list_namespaced_deployment.assert_not_called()
+
+
 def test_create_url_to_service(mocker):
     api_client = Mock()
     create_custom_client_mock = mocker.patch('management_api.endpoints.endpoint_utils.'
@@ -183,21 +191,26 @@ def test_create_url_to_service(mocker):
 @pytest.mark.parametrize("tenant_exception, endpoint_exception",
                          [(True, False),
                           (False, True)])
-def test_view_endpoint_fail(mocker, tenant_exception, endpoint_exception):
+def test_view_endpoint_fail(mocker, tenant_exception, endpoint_exception,
+                            api_client_mock_endpoint_utils, custom_client_mock_endpoint_utils,
+                            apps_client_mock_endpoint_utils):
     tenant_exists_mock = mocker.patch(
         'management_api.endpoints.endpoint_utils.tenant_exists')
-    endpoint_exists_mock = mocker.patch('management_api.endpoints.endpoint_utils.endpoint_exists')
+    endpoint_object_mock = mocker.patch(
+        'management_api.endpoints.endpoint_utils.get_endpoint_object')
+    mocker.patch('management_api.endpoints.endpoint_utils.get_endpoint_status')
+    mocker.patch('management_api.endpoints.endpoint_utils.get_replicas')
     if tenant_exception:
         with pytest.raises(TenantDoesNotExistException):
             tenant_exists_mock.return_value = False
             view_endpoint(namespace="test", endpoint_name="test", id_token=user_token)
     elif endpoint_exception:
         with pytest.raises(EndpointDoesNotExistException):
-            endpoint_exists_mock.return_value = False
+            endpoint_object_mock.side_effect = KubernetesGetException(
+                'endpoint', ApiException(status=404, reason='Not Found'))
             view_endpoint(namespace="test", endpoint_name="test", id_token=user_token)
 
-            tenant_exists_mock.assert_called_once()
-            endpoint_exists_mock.assert_called_once()
+        endpoint_object_mock.assert_called_once()
 
     tenant_exists_mock.assert_called_once()
 
@@ -206,9 +219,10 @@ def test_view_endpoint_success(mocker, api_client_mock_endpoint_utils,
                                custom_client_mock_endpoint_utils, apps_client_mock_endpoint_utils):
     tenant_exists_mock = mocker.patch(
         'management_api.endpoints.endpoint_utils.tenant_exists')
-    endpoint_exists_mock = mocker.patch('management_api.endpoints.endpoint_utils.endpoint_exists')
+    endpoint_object_mock = mocker.patch(
+        'management_api.endpoints.endpoint_utils.get_endpoint_object')
     tenant_exists_mock.return_value = True
-    endpoint_exists_mock.return_value = True
+    endpoint_object_mock.return_value = {'spec': {'subjectName': 'client'}}
 
     create_api_client_mock, api_client = api_client_mock_endpoint_utils
     create_custom_client_mock, custom_client = custom_client_mock_endpoint_utils
@@ -230,11 +244,95 @@ def test_view_endpoint_success(mocker, api_client_mock_endpoint_utils,
     view_endpoint(namespace="test", endpoint_name="test", id_token=user_token)
 
     tenant_exists_mock.assert_called_once()
-    endpoint_exists_mock.assert_called_once()
+    endpoint_object_mock.assert_called_once()
+    subject_name_resources_mock.assert_called_once_with(endpoint_object_mock.return_value)
     endpoint_status_mock.assert_called_once()
     model_path_mock.assert_called_once()
-    subject_name_resources_mock.assert_called_once()
     replicas_mock.assert_called_once()
     create_api_client_mock.assert_called_once()
     create_custom_client_mock.assert_called_once()
     create_apps_client_mock.assert_called_once()
+
+
+def test_view_endpoint_reads_concurrently(mocker, api_client_mock_endpoint_utils,
+                                          custom_client_mock_endpoint_utils,
+                                          apps_client_mock_endpoint_utils):
+    # every read waits until all four have started, so sequential reads would time out
+    barrier = threading.Barrier(4, timeout=5)
+
+    def read(result):
+        def wait(*args, **kwargs):
+            barrier.wait()
+            return result
+        return wait
+
+    mocker.patch('management_api.endpoints.endpoint_utils.tenant_exists', read(True))
+    mocker.patch('management_api.endpoints.endpoint_utils.get_endpoint_object',
+                 read({'spec': {'subjectName': 'client', 'resources': {}}}))
+    mocker.patch('management_api.endpoints.endpoint_utils.get_endpoint_status', read({}))
+    mocker.patch('management_api.endpoints.endpoint_utils.get_replicas', read({'available': 1}))
+
+    endpoint = view_endpoint(namespace="test", endpoint_name="test", id_token=user_token)
+
+    assert endpoint['subject name'] == 'client'
+    assert endpoint['replicas'] == {'available': 1}
+
+
+@pytest.mark.parametrize("present, raise_error, expected",
+                         [(True, False, True), (False, False, False), (True, True, False)])
+def test_check_endpoint_model(mocker, present, raise_error, expected):
+    model_present_mock = mocker.patch('management_api.endpoints.endpoint_utils.model_present')
+    model_present_mock.return_value = present
+    if raise_error:
+        model_present_mock.side_effect = ClientError({'Error': {'Code': 'NoSuchBucket'}},
+                                                     'ListObjectsV2')
+
+    assert check_endpoint_model('tenant', 'test') == expected
+    model_present_mock.assert_called_once_with('tenant', 'test')
+
+
+def test_run_endpoints_batch(mocker, custom_client_mock_endpoint_utils,
+                             api_client_mock_endpoint_utils, apps_client_mock_endpoint_utils):
+    mocker.patch('management_api.endpoints.endpoint_utils.tenant_exists').return_value = True
+    read_quota_mock = mocker.patch('management_api.endpoints.endpoint_utils.read_resource_quota')
+    read_quota_mock.return_value.spec.hard = {'requests.cpu': '2', 'limits.cpu': '4'}
+    reserve_slots_mock = mocker.patch('management_api.endpoints.endpoint_utils.'
+                                      'reserve_endpoint_slots')
+    reserve_slots_mock.side_effect = lambda api, apps_api, namespace, names, id_token: names[:1]
+    mocker.patch('management_api.endpoints.endpoint_utils.model_present').return_value = True
+    _, custom_client = custom_client_mock_endpoint_utils
+    custom_client.get_namespaced_custom_object.return_value = {'spec': {}}
+
+    def delete(group, version, namespace, plural, name, body, **kwargs):
+        if name == 'ep-f':
+            raise ApiException(status=404, reason='Not Found')
+
+    custom_client.delete_namespaced_custom_object.side_effect = delete
+    operations = [
+        {'op': 'create', 'endpointName': 'ep-a', 'modelName': 'resnet', 'subjectName': 'client',
+         'resources': {'requests.cpu': '1', 'limits.cpu': '1'}},
+        {'op': 'create', 'endpointName': 'ep-b', 'modelName': 'resnet', 'subjectName': 'client',
+         'resources': {'limits.cpu': '1'}},
+        {'op': 'create', 'endpointName': 'ep-c', 'modelName': 'resnet', 'subjectName': 'client',
+         'resources': {'requests.cpu': '1', 'limits.cpu': '1'}},
+        {'op': 'scale', 'endpointName': 'ep-d', 'replicas': 2},
+        {'op': 'update', 'endpointName': 'ep-e', 'modelName': 'vgg'},
+        {'op': 'delete', 'endpointName': 'ep-f'},
+        {'op': 'scale', 'endpointName': 'ep-g', 'replicas': 'two'},
+        {'op': 'delete', 'endpointName': 'ep-a'},
+    ]
+
+    results = run_endpoints_batch(operations, 'test', user_token)
+
+    assert [result['status'][:3] for result in results] == \
+        ['200', '400', '409', '200', '200', '400', '400', '400']
+    assert [result['endpointName'] for result in results] == \
+        [f'ep-{name}' for name in 'abcdefga']
+    assert results[0]['data']['warning'] == ''
+    assert results[3]['data']['values'] == {'replicas': 2}
+    assert 'Missing resources values' in results[1]['error']
+    assert 'more than once' in results[7]['error']
+    read_quota_mock.assert_called_once()
+    assert reserve_slots_mock.call_args[0][3] == ['ep-a', 'ep-c']
+    assert custom_client.create_namespaced_custom_object.call_count == 1
+    assert custom_client.patch_namespaced_custom_object.call_count == 2
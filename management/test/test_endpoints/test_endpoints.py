@@ -126,3 +126,21 @@ def test_endpoints_get(mocker, client, functionality, method_name,
     assert expected_status == result.status
     assert expected_message == json.loads(result.text)
     get_endpoint_mock.assert_called_once()
+
+
+def test_endpoints_batch(mocker, client):
+    run_batch_mock = mocker.patch('management_api.endpoints.endpoints.run_endpoints_batch')
+    run_batch_mock.return_value = [
+        {'op': 'scale', 'endpointName': 'ep-a', 'status': falcon.HTTP_OK, 'data': {'url': 'a'}},
+        {'op': 'delete', 'endpointName': 'ep-b', 'status': falcon.HTTP_BAD_REQUEST,
+         'error': 'An error occurred during endpoint deletion: Not Found'}]
+    body = {'operations': [{'op': 'scale', 'endpointName': 'ep-a', 'replicas': 2},
+                           {'op': 'delete', 'endpointName': 'ep-b'}]}
+
+    result = client.simulate_request(method='POST', path='/tenants/default/endpoints:batch',
+                                     headers={}, json=body)
+
+    assert falcon.HTTP_OK == result.status
+    assert result.json['data'] == {'results': run_batch_mock.return_value, 'succeeded': 1,
+                                   'failed': 1}
+    run_batch_mock.assert_called_once_with(body['operations'], 'default', id_token='TOKEN')
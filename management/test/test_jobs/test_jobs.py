@@ -0,0 +1,109 @@
+#
+# Copyright (c) 2019 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import threading
+
+import falcon
+import pytest
+
+from management_api.jobs.job_utils import JobRegistry, JobStatus, jobs
+
+
+def wait_for(job):
+    for _ in range(500):
+        if job.finished():
+            return
+        threading.Event().wait(0.01)
+
+
+def test_job_registry_runs_jobs():
+    registry = JobRegistry(max_workers=2, retention=60)
+    started = threading.Event()
+    release = threading.Event()
+
+    def work(job, value):
+        job.progress['value'] = value
+        started.set()
+        release.wait(5)
+        return value * 2
+
+    job = registry.submit('test', 'tenant', work, 21)
+    started.wait(5)
+    assert registry.get(job.id).status == JobStatus.RUNNING
+    assert job.to_dict()['progress'] == {'value': 21}
+    release.set()
+    wait_for(job)
+
+    assert job.status == JobStatus.SUCCEEDED
+    assert job.result == 42
+
+
+def test_job_registry_reports_failures_and_forgets_old_jobs(mocker):
+    registry = JobRegistry(max_workers=1, retention=60)
+
+    def fail(job):
+        raise ValueError('broken')
+
+    job = registry.submit('test', 'tenant', fail)
+    wait_for(job)
+    assert job.status == JobStatus.FAILED
+    assert job.error == 'broken'
+
+    time_mock = mocker.patch('management_api.jobs.job_utils.time.time')
+    time_mock.return_value = job.finished_at + 61
+    assert registry.get(job.id) is None
+
+
+@pytest.mark.parametrize("tenant_exists, job_tenant, expected_status",
+                         [(True, 'default', falcon.HTTP_OK),
+                          (True, 'other', falcon.HTTP_NOT_FOUND),
+                          (False, 'default', falcon.HTTP_NOT_FOUND)])
+def test_job_get(client, mocker, tenant_exists, job_tenant, expected_status):
+    mocker.patch('management_api.jobs.jobs.tenant_exists').return_value = tenant_exists
+    job = jobs.submit('test', job_tenant, lambda job: 'done')
+    wait_for(job)
+
+    result = client.simulate_request(method='GET', path=f'/tenants/default/jobs/{job.id}',
+                                     headers={})
+
+    assert expected_status == result.status
+    if expected_status == falcon.HTTP_OK:
+        assert result.json['data']['status'] == JobStatus.SUCCEEDED
+        assert result.json['data']['result'] == 'done'
+
+
+def test_job_get_unknown(client, mocker):
+    mocker.patch('management_api.jobs.jobs.tenant_exists').return_value = True
+    result = client.simulate_request(method='GET', path='/tenants/default/jobs/unknown',
+                                     headers={})
+    assert falcon.HTTP_NOT_FOUND == result.status
+
+
+def test_job_get_by_owner_of_deleted_tenant(client, mocker):
+    mocker.patch('management_api.jobs.jobs.tenant_exists').return_value = False
+    job = jobs.submit('delete_tenant', 'default', lambda job: 'done', owner='TOKEN')
+    other_job = jobs.submit('delete_tenant', 'default', lambda job: 'done', owner='OTHER')
+    wait_for(job)
+    wait_for(other_job)
+
+    result = client.simulate_request(method='GET', path=f'/tenants/default/jobs/{job.id}',
+                                     headers={})
+    assert falcon.HTTP_OK == result.status
+    assert 'owner' not in result.json['data']
+
+    result = client.simulate_request(method='GET', path=f'/tenants/default/jobs/{other_job.id}',
+                                     headers={})
+    assert falcon.HTTP_NOT_FOUND == result.status
@@ -0,0 +1,200 @@
+#
+# Copyright (c) 2019 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import io
+import json
+
+import pytest
+from botocore.exceptions import ClientError
+
+from management_api.config import MODELS_MANIFEST_KEY
+from management_api.models.manifest import manifests, read_manifest, record_model_file, \
+    finalize_model_version, remove_model_version, update_manifest, record_model_dir, \
+    manifest_objects
+from management_api.models.model_utils import ModelList, decode_continue_token, get_manifest
+
+
+class FakeBucket:
+    """Objects of a single bucket served like by minio_client"""
+
+    def __init__(self, objects):
+        self.objects = {key: (body, f'"etag-{key}"') for key, body in objects.items()}
+        self.versions = 0
+        self.gets = 0
+        self.on_put = None
+
+    def _store(self, key, body):
+        self.versions += 1
+        self.objects[key] = (body, f'"v{self.versions}"')
+
+    def get_object(self, Bucket, Key, IfNoneMatch=None):
+        self.gets += 1
+        if Key not in self.objects:
+            raise ClientError({'Error': {'Code': 'NoSuchKey'}}, 'GetObject')
+        body, etag = self.objects[Key]
+        if IfNoneMatch == etag:
+            raise ClientError({'Error': {'Code': '304'}}, 'GetObject')
+        return {'Body': io.BytesIO(body), 'ETag': etag}
+
+    def put_object(self, Bucket, Key, Body, ContentType):
+        self._store(Key, Body)
+        etag = self.objects[Key][1]
+        if self.on_put:
+            self.on_put()
+        return {'ETag': etag}
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop(Key, None)
+
+    def head_object(self, Bucket, Key):
+        body, etag = self.objects[Key]
+        return {'ContentLength': len(body), 'ETag': etag}
+
+    def list_objects_v2(self, Bucket, Prefix, MaxKeys, ContinuationToken=None):
+        keys = sorted(key for key in self.objects if key.startswith(Prefix))
+        return {'Contents': [{'Key': key, 'Size': len(self.objects[key][0]),
+                              'ETag': self.objects[key][1]} for key in keys],
+                'IsTruncated': False}
+
+    def manifest(self):
+        return json.loads(self.objects[MODELS_MANIFEST_KEY][0])
+
+
+@pytest.fixture(scope='function')
+def bucket(mocker):
+    manifests.clear()
+    bucket = FakeBucket({'resnet/1/saved_model.pb': b'12345',
+                         'resnet/1/variables/': b'',
+                         'resnet/1/variables/variables.index': b'123'})
+    mocker.patch('management_api.models.manifest.minio_client', bucket)
+    mocker.patch('management_api.utils.minio_objects.minio_client', bucket)
+    yield bucket
+    manifests.clear()
+
+
+def test_manifest_is_built_then_updated(bucket):
+    assert read_manifest('tenant') is None
+
+    bucket.objects['resnet/2/saved_model.pb'] = (b'1234567', '"etag-v2"')
+    record_model_file('tenant', 'resnet/2/saved_model.pb')
+
+    models = bucket.manifest()['models']
+    assert models['resnet/1']['size'] == 8
+    assert set(models['resnet/1']['files']) == {'saved_model.pb', 'variables/variables.index'}
+    assert models['resnet/2'] == {'name': 'resnet', 'version': '2', 'size': 7,
+                                  'finalized': False,
+                                  'files': {'saved_model.pb': {'size': 7, 'etag': '"etag-v2"'}}}
+
+
+def test_manifest_cached_copy_is_revalidated(bucket):
+    record_model_file('tenant', 'resnet/1/saved_model.pb')
+    first = read_manifest('tenant')
+    assert read_manifest('tenant') is first
+
+    other_replica = bucket.manifest()
+    other_replica['models'].pop('resnet/1')
+    bucket._store(MODELS_MANIFEST_KEY, json.dumps(other_replica).encode())
+
+    assert read_manifest('tenant')['models'] == {}
+
+
+def test_manifest_update_survives_concurrent_writer(bucket):
+    record_model_file('tenant', 'resnet/1/saved_model.pb')
+    bucket.objects['resnet/3/saved_model.pb'] = (b'12', '"etag-v3"')
+
+    def other_replica_write():
+        bucket.on_put = None
+        stale = bucket.manifest()
+        stale['models'].pop('resnet/3')
+        bucket._store(MODELS_MANIFEST_KEY, json.dumps(stale).encode())
+
+    bucket.on_put = other_replica_write
+    record_model_file('tenant', 'resnet/3/saved_model.pb')
+
+    assert 'resnet/3' in bucket.manifest()['models']
+
+
+def test_manifest_is_removed_when_update_fails(bucket):
+    record_model_file('tenant', 'resnet/1/saved_model.pb')
+
+    def always_changing(manifest):
+        manifest['models']['counter'] = bucket.versions
+
+    update_manifest('tenant', always_changing)
+
+    assert MODELS_MANIFEST_KEY not in bucket.objects
+    assert read_manifest('tenant') is None
+
+
+def test_finalize_and_remove_model_version(bucket):
+    record_model_file('tenant', 'resnet/1/saved_model.pb')
+    bucket.objects['resnet/1/assets/vocab.txt'] = (b'1', '"etag-vocab"')
+
+    entry = finalize_model_version('tenant', 'resnet', 1)
+
+    assert entry['finalized']
+    assert entry['size'] == 9
+    assert bucket.manifest()['models']['resnet/1']['files']['assets/vocab.txt']['size'] == 1
+    assert finalize_model_version('tenant', 'vgg', 1) is None
+
+    remove_model_version('tenant', 'resnet', 1)
+    assert bucket.manifest()['models'] == {}
+
+
+def test_manifest_describes_directories(bucket):
+    bucket.objects['vgg/1/assets/'] = (b'', '"etag-dir"')
+    record_model_dir('tenant', 'vgg/1/assets/')
+    record_model_dir('tenant', 'vgg/1/assets/')
+
+    listed = bucket.list_objects_v2(Bucket='tenant', Prefix='', MaxKeys=1000)['Contents']
+    assert [(object['Key'], object['Size']) for object in listed
+            if object['Key'] != MODELS_MANIFEST_KEY] == \
+        [(object['Key'], object['Size']) for object in manifest_objects(bucket.manifest())]
+    assert bucket.manifest()['models']['vgg/1']['dirs'] == ['assets/']
+    assert bucket.manifest()['models']['vgg/1']['files'] == {}
+    assert bucket.manifest()['models']['resnet/1']['dirs'] == ['variables/']
+
+
+def test_models_listed_from_manifest(bucket):
+    bucket.objects['vgg/1/saved_model.pb'] = (b'1', '"etag-vgg"')
+    record_model_file('tenant', 'vgg/1/saved_model.pb')
+    listing_calls = bucket.gets
+
+    models = ModelList('tenant', limit=2, manifest=read_manifest('tenant'))
+    assert [model['path'] for model in models] == ['resnet/1/saved_model.pb',
+                                                   'resnet/1/variables/variables.index']
+    assert decode_continue_token(models.next_token) == \
+        {'StartAfter': 'resnet/1/variables/variables.index'}
+
+    models = ModelList('tenant', aggregate=True, continue_token=models.next_token,
+                       manifest=read_manifest('tenant'))
+    assert list(models) == [{'name': 'vgg', 'version': '1', 'size': 1, 'files': 1}]
+    assert models.next_token is None
+    assert bucket.gets == listing_calls + 2
+
+
+def test_stale_manifest_is_rebuilt(bucket, mocker):
+    record_model_file('tenant', 'resnet/1/saved_model.pb')
+    finalize_model_version('tenant', 'resnet', 1)
+    bucket.objects['vgg/1/saved_model.pb'] = (b'1', '"etag-vgg"')
+
+    assert 'vgg/1' not in get_manifest('tenant')['models']
+
+    mocker.patch('management_api.models.manifest.MODELS_MANIFEST_MAX_AGE', -1)
+    models = get_manifest('tenant')['models']
+    assert models['vgg/1']['files'] == {'saved_model.pb': {'size': 1, 'etag': '"etag-vgg"'}}
+    assert models['resnet/1']['finalized']
+    assert bucket.manifest()['models'] == models
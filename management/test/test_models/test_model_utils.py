@@ -0,0 +1,279 @@
+#
+# Copyright (c) 2019 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import threading
+import time
+
+import pytest
+from botocore.exceptions import ClientError
+
+from management_api.jobs.job_utils import JobStatus
+from management_api.models.model_utils import list_models, decode_continue_token, delete_model, \
+    start_model_deletion, model_present, model_presence, invalidate_model_presence, \
+    endpoints_using_model
+from management_api.utils.errors_handling import InvalidParamException, MinioCallException, \
+    TenantDoesNotExistException, ModelDoesNotExistException, ModelDeleteException
+
+PAGES = [{'Contents': [{'Key': 'resnet/1/saved_model.pb', 'Size': 5},
+                       {'Key': 'resnet/1/variables/', 'Size': 0},
+                       {'Key': 'resnet/1/variables/variables.index', 'Size': 3},
+                       {'Key': 'resnet/2/saved_model.pb', 'Size': 1}],
+          'IsTruncated': True, 'NextContinuationToken': 'next-page'},
+         {'Contents': [{'Key': 'resnet/2/variables/variables.index', 'Size': 1},
+                       {'Key': 'empty/1/', 'Size': 0},
+                       {'Key': 'vgg/1/saved_model.pb', 'Size': 7}],
+          'IsTruncated': False}]
+
+
+@pytest.fixture(scope='function', autouse=True)
+def manifest_mock(mocker):
+    manifest_mock = mocker.patch('management_api.models.model_utils.read_manifest')
+    manifest_mock.return_value = None
+    mocker.patch('management_api.models.model_utils.remove_model_version')
+    mocker.patch('management_api.models.model_utils.tenant_usage')
+    mocker.patch('management_api.models.model_utils.get_k8s_api_custom_client')
+    mocker.patch('management_api.models.model_utils.get_model_endpoints').return_value = []
+    model_presence.clear()
+    return manifest_mock
+
+
+@pytest.fixture(scope='function')
+def list_objects_mock(mocker):
+    mocker.patch('management_api.models.model_utils.tenant_exists').return_value = True
+    list_objects_mock = mocker.patch('management_api.models.model_utils.minio_client.'
+                                     'list_objects_v2')
+    list_objects_mock.side_effect = lambda **kwargs: \
+        PAGES[1] if kwargs.get('ContinuationToken') == 'next-page' else PAGES[0]
+    return list_objects_mock
+
+
+def test_list_models_files(list_objects_mock):
+    models = list(list_models('test', 'token'))
+
+    assert [model['path'] for model in models] == [
+        'resnet/1/saved_model.pb', 'resnet/1/variables/variables.index',
+        'resnet/2/saved_model.pb', 'resnet/2/variables/variables.index', 'vgg/1/saved_model.pb']
+    assert models[0] == {'path': 'resnet/1/saved_model.pb', 'name': 'resnet', 'version': '1',
+                         'size': 5}
+    assert list_objects_mock.call_count == 2
+
+
+def test_list_models_aggregated(list_objects_mock):
+    models = list(list_models('test', 'token', aggregate=True))
+
+    assert models == [{'name': 'resnet', 'version': '1', 'size': 8, 'files': 2},
+                      {'name': 'resnet', 'version': '2', 'size': 2, 'files': 2},
+                      {'name': 'vgg', 'version': '1', 'size': 7, 'files': 1}]
+
+
+def test_list_models_files_page(list_objects_mock):
+    models = list_models('test', 'token', limit=4)
+
+    assert len(list(models)) == 3
+    assert list_objects_mock.call_args[1]['MaxKeys'] == 4
+    assert decode_continue_token(models.next_token) == {'ContinuationToken': 'next-page'}
+
+    list_models('test', 'token', limit=4, continue_token=models.next_token)
+    assert list_objects_mock.call_args[1]['ContinuationToken'] == 'next-page'
+
+
+def test_list_models_aggregated_page(list_objects_mock):
+    models = list_models('test', 'token', aggregate=True, limit=1)
+
+    assert list(models) == [{'name': 'resnet', 'version': '1', 'size': 8, 'files': 2}]
+    assert decode_continue_token(models.next_token) == \
+        {'StartAfter': 'resnet/1/variables/variables.index'}
+
+    models = list_models('test', 'token', aggregate=True, limit=2)
+    assert len(list(models)) == 2
+    assert models.next_token is not None
+
+    models = list_models('test', 'token', aggregate=True, limit=3)
+    assert len(list(models)) == 3
+    assert models.next_token is None
+
+
+@pytest.mark.parametrize("token", ['not-base64!', 'eyJ4IjogMX0', 'bnVsbA'])
+def test_list_models_invalid_token(list_objects_mock, token):
+    with pytest.raises(InvalidParamException):
+        list_models('test', 'token', continue_token=token)
+    list_objects_mock.assert_not_called()
+
+
+def test_list_models_errors(mocker, list_objects_mock):
+    list_objects_mock.side_effect = ClientError({'Error': {'Code': 'AccessDenied'}},
+                                                'ListObjectsV2')
+    with pytest.raises(MinioCallException):
+        list_models('test', 'token')
+
+    mocker.patch('management_api.models.model_utils.tenant_exists').return_value = False
+    with pytest.raises(TenantDoesNotExistException):
+        list_models('test', 'token')
+
+
+@pytest.mark.parametrize("deleted", [3, 0])
+def test_delete_model(mocker, deleted):
+    mocker.patch('management_api.models.model_utils.tenant_exists').return_value = True
+    delete_objects_mock = mocker.patch('management_api.models.model_utils.delete_objects')
+    delete_objects_mock.return_value = deleted
+    tenant_usage_mock = mocker.patch('management_api.models.model_utils.tenant_usage')
+    parameters = {'modelName': 'resnet', 'modelVersion': 1}
+
+    if deleted:
+        assert delete_model(parameters, 'test', 'token') == 'resnet/1/'
+    else:
+        with pytest.raises(ModelDoesNotExistException):
+            delete_model(parameters, 'test', 'token')
+    delete_objects_mock.assert_called_once_with('test', prefix='resnet/1/', progress=None)
+    if deleted:
+        assert model_presence.get(('test', 'resnet')) is None
+        tenant_usage_mock.record.assert_called_once_with('test')
+    else:
+        tenant_usage_mock.record.assert_not_called()
+
+
+def test_start_model_deletion(mocker):
+    mocker.patch('management_api.models.model_utils.tenant_exists').return_value = True
+    model_exists_mock = mocker.patch('management_api.models.model_utils.prefix_exists')
+    model_exists_mock.return_value = True
+
+    def delete_objects(bucket, prefix, progress):
+        progress(1000)
+        progress(1500)
+        return 1500
+
+    mocker.patch('management_api.models.model_utils.delete_objects', delete_objects)
+    parameters = {'modelName': 'resnet', 'modelVersion': 1}
+
+    model_path, job = start_model_deletion(parameters, 'test', 'token')
+    for _ in range(500):
+        if job.finished():
+            break
+        threading.Event().wait(0.01)
+
+    assert model_path == 'resnet/1/'
+    assert job.status == JobStatus.SUCCEEDED
+    assert job.progress == {'deletedObjects': 1500}
+    assert job.result == {'model_path': 'resnet/1/', 'deletedObjects': 1500}
+
+    model_exists_mock.return_value = False
+    with pytest.raises(ModelDoesNotExistException):
+        start_model_deletion(parameters, 'test', 'token')
+
+
+@pytest.mark.parametrize("response, expected",
+                         [({'Contents': [{'Key': 'resnet/1/', 'Size': 0},
+                                         {'Key': 'resnet/1/variables/', 'Size': 0}]}, False),
+                          ({'Contents': [{'Key': 'resnet/', 'Size': 0}]}, False),
+                          ({'Contents': [{'Key': 'resnet/1/model.pb', 'Size': 3}]}, True),
+                          ({}, False)])
+def test_model_present(mocker, response, expected):
+    list_objects_mock = mocker.patch('management_api.utils.minio_objects.minio_client.'
+                                     'list_objects_v2')
+    list_objects_mock.return_value = response
+
+    assert model_present('test', 'resnet') == expected
+    assert model_present('test', 'resnet') == expected
+    list_objects_mock.assert_called_once_with(Bucket='test', Prefix='resnet/', MaxKeys=10)
+
+    invalidate_model_presence('test', 'resnet')
+    model_present('test', 'resnet')
+    assert list_objects_mock.call_count == 2
+
+
+def test_model_present_pages_past_markers(mocker):
+    list_objects_mock = mocker.patch('management_api.utils.minio_objects.minio_client.'
+                                     'list_objects_v2')
+    list_objects_mock.side_effect = [
+        {'Contents': [{'Key': 'resnet/1/', 'Size': 0}], 'IsTruncated': True,
+         'NextContinuationToken': 'next'},
+        {'Contents': [{'Key': 'resnet/1/model.pb', 'Size': 3}], 'IsTruncated': False}]
+
+    assert model_present('test', 'resnet')
+    assert list_objects_mock.call_count == 2
+
+
+def test_model_present_in_manifest(mocker, manifest_mock):
+    list_objects_mock = mocker.patch('management_api.utils.minio_objects.minio_client.'
+                                     'list_objects_v2')
+    manifest_mock.return_value = {'format': 1, 'models': {'resnet/1': {
+        'name': 'resnet', 'version': '1', 'size': 3, 'finalized': True,
+        'files': {'model.pb': {'size': 3, 'etag': 'a'}}}}, 'builtAt': time.time()}
+
+    assert model_present('test', 'resnet')
+    list_objects_mock.assert_not_called()
+
+
+def endpoint(name, model_name, version_policy=None):
+    spec = {'modelName': model_name, 'servingName': 'ovms'}
+    if version_policy:
+        spec['modelVersionPolicy'] = version_policy
+    return {'metadata': {'name': name, 'namespace': 'test'}, 'spec': spec}
+
+
+@pytest.mark.parametrize("model_version, expected",
+                         [(None, ['all', 'default', 'latest-2', 'specific']),
+                          (1, ['all', 'specific']), (2, ['all']),
+                          ('3', ['all', 'latest-2', 'specific']),
+                          (10, ['all', 'default', 'latest-2'])])
+def test_endpoints_using_model(mocker, model_version, expected):
+    get_model_endpoints_mock = mocker.patch('management_api.models.model_utils.'
+                                            'get_model_endpoints')
+    get_model_endpoints_mock.return_value = [
+        endpoint('specific', 'resnet', '{specific{versions: 1 versions: 3 }}'),
+        endpoint('default', 'resnet'), endpoint('all', 'resnet', '{all{}}'),
+        endpoint('latest-2', 'resnet', '{latest{num_versions: 2}}')]
+    list_prefixes_mock = mocker.patch('management_api.models.model_utils.list_prefixes')
+    list_prefixes_mock.return_value = ['resnet/1/', 'resnet/10/', 'resnet/3/', 'resnet/tmp/']
+
+    endpoints = endpoints_using_model('test', 'resnet', 'token', model_version)
+
+    assert [endpoint['name'] for endpoint in endpoints] == expected
+    assert get_model_endpoints_mock.call_args[0][1:] == ('test', 'resnet', 'token')
+    assert list_prefixes_mock.call_count == (0 if model_version is None else 1)
+
+
+def test_delete_used_model(mocker):
+    mocker.patch('management_api.models.model_utils.tenant_exists').return_value = True
+    mocker.patch('management_api.models.model_utils.list_prefixes').return_value = \
+        ['resnet/1/']
+    mocker.patch('management_api.models.model_utils.get_model_endpoints').return_value = \
+        [endpoint('resnet-endpoint', 'resnet')]
+    delete_objects_mock = mocker.patch('management_api.models.model_utils.delete_objects')
+    delete_objects_mock.return_value = 3
+    parameters = {'modelName': 'resnet', 'modelVersion': 1}
+
+    with pytest.raises(ModelDeleteException):
+        delete_model(parameters, 'test', 'token')
+    with pytest.raises(ModelDeleteException):
+        start_model_deletion(parameters, 'test', 'token')
+    delete_objects_mock.assert_not_called()
+
+    assert delete_model(parameters, 'test', 'token', force=True) == 'resnet/1/'
+
+
+def test_delete_version_not_latest(mocker):
+    mocker.patch('management_api.models.model_utils.tenant_exists').return_value = True
+    mocker.patch('management_api.models.model_utils.get_model_endpoints').return_value = \
+        [endpoint('resnet-endpoint', 'resnet')]
+    mocker.patch('management_api.models.model_utils.list_prefixes').return_value = \
+        ['resnet/1/', 'resnet/2/']
+    mocker.patch('management_api.models.model_utils.delete_objects').return_value = 3
+
+    assert delete_model({'modelName': 'resnet', 'modelVersion': 1}, 'test', 'token') == \
+        'resnet/1/'
+    with pytest.raises(ModelDeleteException):
+        delete_model({'modelName': 'resnet', 'modelVersion': 2}, 'test', 'token')
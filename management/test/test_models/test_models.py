@@ -15,19 +15,64 @@
 #
 
 import falcon
+import pytest
+
+from management_api.models import models
 
 
 def test_models_get(mocker, client):
     list_models_mock = mocker.patch('management_api.models.models.list_models')
-    list_models_mock.return_value = 'test'
+    list_models_mock.return_value = [{'path': 'test/1/saved_model.pb', 'name': 'test',
+                                      'version': '1', 'size': 5}]
     expected_status = falcon.HTTP_OK
 
     result = client.simulate_request(method='GET', path='/tenants/default/models', headers={})
 
     assert expected_status == result.status
+    assert result.json == {'status': 'OK', 'data': {'models': list_models_mock.return_value}}
     list_models_mock.assert_called_once()
 
 
+def test_models_get_page(mocker, client):
+    list_models_mock = mocker.patch('management_api.models.models.list_models')
+    model_list = mocker.MagicMock(next_token='token')
+    model_list.__iter__.return_value = iter([{'name': 'test', 'version': '1', 'size': 5,
+                                              'files': 1}] * 3)
+    list_models_mock.return_value = model_list
+    mocker.patch('management_api.models.models.STREAM_CHUNK_SIZE', 10)
+
+    result = client.simulate_request(method='GET', path='/tenants/default/models', headers={},
+                                     params={'aggregate': 'true', 'limit': '3',
+                                             'continue': 'previous'})
+
+    assert falcon.HTTP_OK == result.status
+    assert len(result.json['data']['models']) == 3
+    assert result.json['data']['continue'] == 'token'
+    assert list_models_mock.call_args[1] == {'aggregate': True, 'limit': 3,
+                                             'continue_token': 'previous'}
+
+
+@pytest.mark.parametrize("limit", ['0', '1001', 'ten'])
+def test_models_get_wrong_limit(mocker, client, limit):
+    list_models_mock = mocker.patch('management_api.models.models.list_models')
+
+    result = client.simulate_request(method='GET', path='/tenants/default/models', headers={},
+                                     params={'limit': limit})
+
+    assert falcon.HTTP_BAD_REQUEST == result.status
+    list_models_mock.assert_not_called()
+
+
+def test_stream_models_chunks(mocker):
+    mocker.patch('management_api.models.models.STREAM_CHUNK_SIZE', 100)
+    model = {'path': 'test/1/saved_model.pb', 'name': 'test', 'version': '1', 'size': 5}
+
+    chunks = list(models.stream_models([model] * 10))
+
+    assert len(chunks) > 1
+    assert all(len(chunk) < 200 for chunk in chunks)
+
+
 def test_models_delete(mocker, client):
     delete_model_mock = mocker.patch('management_api.models.models.delete_model')
     delete_model_mock.return_value = 'test'
@@ -40,3 +85,63 @@ def test_models_delete(mocker, client):
 
     assert expected_status == result.status
     delete_model_mock.assert_called_once()
+    assert delete_model_mock.call_args[1] == {'force': False}
+
+
+def test_models_delete_used_model(mocker, client):
+    mocker.patch('management_api.models.model_utils.tenant_exists').return_value = True
+    endpoints_mock = mocker.patch('management_api.models.model_utils.endpoints_using_model')
+    endpoints_mock.return_value = [{'name': 'resnet-endpoint'}]
+    delete_objects_mock = mocker.patch('management_api.models.model_utils.delete_objects')
+    body = {'modelName': 'test', 'modelVersion': 1}
+
+    result = client.simulate_request(method='DELETE', path='/tenants/default/models',
+                                     headers={}, json=body)
+
+    assert falcon.HTTP_CONFLICT == result.status
+    assert 'resnet-endpoint' in result.json['description']
+    delete_objects_mock.assert_not_called()
+
+
+def test_models_delete_async(mocker, client):
+    start_model_deletion_mock = mocker.patch('management_api.models.models.'
+                                             'start_model_deletion')
+    job = mocker.Mock(id='job-id')
+    job.to_dict.return_value = {'id': 'job-id', 'status': 'pending'}
+    start_model_deletion_mock.return_value = ('test/1/', job)
+    body = {'modelName': 'test', 'modelVersion': 1}
+
+    result = client.simulate_request(method='DELETE', path='/tenants/default/models',
+                                     headers={}, params={'async': 'true'}, json=body)
+
+    assert falcon.HTTP_ACCEPTED == result.status
+    assert result.headers['location'].endswith('/tenants/default/jobs/job-id')
+    assert result.json['data'] == {'model_path': 'test/1/', 'job': job.to_dict.return_value}
+
+
+def test_models_finalize(mocker, client):
+    finalize_model_mock = mocker.patch('management_api.models.models.finalize_model')
+    finalize_model_mock.return_value = {'name': 'test', 'version': 1, 'size': 5, 'files': 1}
+    body = {'modelName': 'test', 'modelVersion': 1}
+
+    result = client.simulate_request(method='POST', path='/tenants/default/models/finalize',
+                                     headers={}, json=body)
+
+    assert falcon.HTTP_OK == result.status
+    assert result.json['data'] == {'model': finalize_model_mock.return_value}
+    finalize_model_mock.assert_called_once()
+
+
+def test_model_endpoints(mocker, client):
+    mocker.patch('management_api.models.models.tenant_exists').return_value = True
+    endpoints_mock = mocker.patch('management_api.models.models.endpoints_using_model')
+    endpoints_mock.return_value = [{'name': 'resnet-endpoint', 'servingName': 'ovms',
+                                    'modelVersionPolicy': '{latest{}}'}]
+
+    result = client.simulate_request(method='GET',
+                                     path='/tenants/default/models/resnet/endpoints',
+                                     headers={}, params={'modelVersion': '2'})
+
+    assert falcon.HTTP_OK == result.status
+    assert result.json['data'] == {'endpoints': endpoints_mock.return_value}
+    endpoints_mock.assert_called_once_with('default', 'resnet', 'TOKEN', model_version=2)
@@ -0,0 +1,101 @@
+#
+# Copyright (c) 2019 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+import pytest
+from kubernetes.client import V1ObjectMeta, V1Secret, V1SecretList
+from kubernetes.client.rest import ApiException
+from unittest.mock import Mock
+
+from management_api.tenants.portable_secrets import propagate_portable_secrets, \
+    reconcile_portable_secrets, portable_secrets
+from management_api.utils.errors_handling import KubernetesCreateException
+
+
+def secret(name, namespace='man-api', data='value'):
+    return V1Secret(metadata=V1ObjectMeta(name=name, namespace=namespace), type='Opaque',
+                    data={'key': data})
+
+
+@pytest.fixture(scope='function')
+def api_instance(mocker):
+    portable_secrets.clear()
+    api_instance = mocker.patch('management_api.tenants.portable_secrets.get_k8s_api_client')\
+        .return_value
+    api_instance.read_namespaced_secret.side_effect = lambda name, namespace: secret(name)
+    yield api_instance
+    portable_secrets.clear()
+
+
+def test_propagate_portable_secrets_reads_sources_once(api_instance):
+    for namespace in ('first', 'second', 'third'):
+        propagate_portable_secrets(namespace, 'token')
+
+    assert api_instance.read_namespaced_secret.call_count == 2
+    assert api_instance.create_namespaced_secret.call_count == 6
+    body = api_instance.create_namespaced_secret.call_args[1]['body']
+    assert body.metadata.namespace == 'third'
+    assert body.metadata.labels == {'portable_secret': 'true'}
+    assert body.metadata.resource_version is None
+
+
+def test_propagate_portable_secrets_from_watch_cache(mocker, api_instance):
+    informer = Mock()
+    informer.get.side_effect = lambda namespace, name: secret(name)
+    get_informer_mock = mocker.patch('management_api.tenants.portable_secrets.'
+                                     'get_cached_informer')
+    get_informer_mock.return_value = informer
+
+    propagate_portable_secrets('tenant', 'token')
+
+    api_instance.read_namespaced_secret.assert_not_called()
+    get_informer_mock.assert_called_with('secrets', 'token', 'get', 'man-api')
+    assert api_instance.create_namespaced_secret.call_count == 2
+
+
+def test_propagate_portable_secrets_fail(api_instance):
+    api_instance.create_namespaced_secret.side_effect = ApiException(status=409)
+    with pytest.raises(KubernetesCreateException):
+        propagate_portable_secrets('tenant', 'token')
+
+
+def test_reconcile_portable_secrets(api_instance):
+    api_instance.list_secret_for_all_namespaces.return_value = V1SecretList(items=[
+        secret('minio-access-info', 'first'), secret('tls-secret', 'first'),
+        secret('minio-access-info', 'second', data='rotated')])
+
+    def replace_secret(name, namespace, body):
+        if namespace == 'third':
+            raise ApiException(status=403)
+        if name == 'tls-secret':
+            raise ApiException(status=404)
+
+    api_instance.replace_namespaced_secret.side_effect = replace_secret
+
+    result = reconcile_portable_secrets(['first', 'second', 'third'], 'token')
+
+    api_instance.list_secret_for_all_namespaces.assert_called_once_with(
+        label_selector='portable_secret=true')
+    written = sorted((call[0][1], call[0][0])
+                     for call in api_instance.replace_namespaced_secret.call_args_list)
+    assert written == [('second', 'minio-access-info'), ('second', 'tls-secret'),
+                       ('third', 'minio-access-info'), ('third', 'tls-secret')]
+    api_instance.create_namespaced_secret.assert_called_once()
+    assert result['tenants'] == 3
+    assert result['unchanged'] == 2
+    assert result['updated'] == 2
+    assert [(failure['tenant'], failure['status']) for failure in result['failed']] == \
+        [('third', '403 Forbidden'), ('third', '403 Forbidden')]
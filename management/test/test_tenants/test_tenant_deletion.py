@@ -0,0 +1,122 @@
+#
+# Copyright (c) 2019 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+import threading
+
+import pytest
+from kubernetes.client.rest import ApiException
+
+from management_api.jobs.job_utils import JobStatus
+from management_api.tenants.tenant_deletion import start_tenant_deletion, \
+    wait_for_namespace_removal
+from management_api.utils.errors_handling import TenantDoesNotExistException
+
+
+def wait_for(job):
+    for _ in range(500):
+        if job.finished():
+            return
+        threading.Event().wait(0.01)
+
+
+@pytest.fixture(scope='function')
+def deletion_mocks(mocker):
+    mocker.patch('management_api.tenants.tenant_deletion.tenant_exists').return_value = True
+    mocker.patch('management_api.tenants.tenant_deletion.time.sleep')
+
+    def delete_bucket(name, progress=None):
+        for deleted in (1000, 1500):
+            progress(deleted)
+
+    delete_bucket_mock = mocker.patch('management_api.tenants.tenant_deletion.delete_bucket')
+    delete_bucket_mock.side_effect = delete_bucket
+    delete_namespace_mock = mocker.patch('management_api.tenants.tenant_deletion.'
+                                         'delete_namespace')
+    api_instance = mocker.patch('management_api.tenants.tenant_deletion.get_k8s_api_client')\
+        .return_value
+    api_instance.read_namespace_status.side_effect = [None, None, ApiException(status=404)]
+    return delete_bucket_mock, delete_namespace_mock, api_instance
+
+
+def test_tenant_deletion_job(deletion_mocks):
+    delete_bucket_mock, delete_namespace_mock, api_instance = deletion_mocks
+
+    job = start_tenant_deletion({'name': 'tenant'}, 'token')
+    wait_for(job)
+
+    assert job.status == JobStatus.SUCCEEDED
+    assert job.kind == 'delete_tenant'
+    assert job.owned_by('token')
+    assert job.result == {'name': 'tenant', 'deletedObjects': 1500}
+    assert job.progress == {'deletedObjects': 1500, 'bucket': 'deleted',
+                            'namespace': 'deleted'}
+    delete_namespace_mock.assert_called_once_with('tenant', 'token')
+    assert api_instance.read_namespace_status.call_count == 3
+
+
+def test_tenant_deletion_job_reports_bucket_failure(deletion_mocks):
+    delete_bucket_mock, _, _ = deletion_mocks
+    delete_bucket_mock.side_effect = ValueError('bucket error')
+
+    job = start_tenant_deletion({'name': 'tenant'}, 'token')
+    wait_for(job)
+
+    assert job.status == JobStatus.FAILED
+    assert job.error == 'bucket error'
+    assert job.progress['namespace'] == 'deleted'
+    assert job.progress['bucket'] == 'failed'
+
+
+def test_tenant_deletion_job_reports_first_failure(deletion_mocks):
+    delete_bucket_mock, delete_namespace_mock, _ = deletion_mocks
+    delete_bucket_mock.side_effect = ValueError('bucket error')
+    delete_namespace_mock.side_effect = ValueError('namespace error')
+
+    job = start_tenant_deletion({'name': 'tenant'}, 'token')
+    wait_for(job)
+
+    assert job.status == JobStatus.FAILED
+    assert job.error == 'namespace error'
+    assert job.progress['namespace'] == 'failed'
+    assert job.progress['bucket'] == 'failed'
+    delete_bucket_mock.assert_called_once()
+
+
+def test_running_tenant_deletion_is_reused(deletion_mocks):
+    _, delete_namespace_mock, _ = deletion_mocks
+    release = threading.Event()
+    delete_namespace_mock.side_effect = lambda name, id_token: release.wait(5)
+
+    job = start_tenant_deletion({'name': 'tenant'}, 'token')
+    assert start_tenant_deletion({'name': 'tenant'}, 'other token') is job
+    release.set()
+    wait_for(job)
+
+    delete_namespace_mock.assert_called_once()
+
+
+def test_start_tenant_deletion_of_missing_tenant(mocker):
+    mocker.patch('management_api.tenants.tenant_deletion.tenant_exists').return_value = False
+    with pytest.raises(TenantDoesNotExistException):
+        start_tenant_deletion({'name': 'missing'}, 'token')
+
+
+def test_wait_for_namespace_removal_timeout(mocker):
+    mocker.patch('management_api.tenants.tenant_deletion.time.sleep')
+    mocker.patch('management_api.tenants.tenant_deletion.get_k8s_api_client')
+    with pytest.raises(TimeoutError):
+        wait_for_namespace_removal('tenant', 'token', timeout=0)
@@ -0,0 +1,57 @@
+#
+# Copyright (c) 2019 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+from management_api.tenants.tenant_details import get_bucket_size, get_tenants_details
+from management_api.utils.errors_handling import MinioCallException
+
+
+def test_get_bucket_size_from_manifest(mocker):
+    mocker.patch('management_api.tenants.tenant_details.read_manifest').return_value = {
+        'models': {'resnet/1': {'size': 100}, 'resnet/2': {'size': 50}}}
+    list_pages_mock = mocker.patch('management_api.tenants.tenant_details.list_pages')
+
+    assert get_bucket_size('tenant') == 150
+    list_pages_mock.assert_not_called()
+
+
+def test_get_bucket_size_from_listing(mocker):
+    mocker.patch('management_api.tenants.tenant_details.read_manifest').return_value = None
+    mocker.patch('management_api.tenants.tenant_details.list_pages').return_value = iter(
+        [[{'Size': 10}, {'Size': 20}], [{'Size': 5}]])
+
+    assert get_bucket_size('tenant') == 35
+
+
+def test_get_tenants_details(mocker):
+    mocker.patch('management_api.tenants.tenant_details.get_k8s_apps_api_client')
+    mocker.patch('management_api.tenants.tenant_details.get_endpoint_number').side_effect = \
+        lambda apps_api_instance, namespace, id_token: len(namespace)
+
+    def bucket_size(bucket):
+        if bucket == 'broken':
+            raise MinioCallException('error')
+        return 100
+
+    mocker.patch('management_api.tenants.tenant_details.get_bucket_size').side_effect = \
+        bucket_size
+
+    assert get_tenants_details(['first', 'broken'], 'token', endpoints=True,
+                               bucket_size=True) == [
+        {'name': 'first', 'endpoints': 5, 'bucketSize': 100},
+        {'name': 'broken', 'endpoints': 6, 'bucketSize': None}]
+    assert get_tenants_details(['first'], 'token', bucket_size=True) == \
+        [{'name': 'first', 'bucketSize': 100}]
@@ -0,0 +1,181 @@
+#
+# Copyright (c) 2019 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+import pytest
+import threading
+import time
+from decimal import Decimal
+
+from management_api.tenants.tenant_usage import UsageAccounting, parse_quantity, \
+    endpoints_usage, get_tenants_usage
+from management_api.utils.errors_handling import MinioCallException
+
+
+def manifest(*sizes):
+    return {'format': 1, 'models': {
+        f'resnet/{version}': {'name': 'resnet', 'version': version, 'size': sum(files),
+                              'files': {str(index): {'size': size}
+                                        for index, size in enumerate(files)}}
+        for version, files in enumerate(sizes)}}
+
+
+def crd(namespace, name, replicas=None, requests=None):
+    spec = {'modelName': 'resnet'}
+    if replicas is not None:
+        spec['replicas'] = replicas
+    if requests is not None:
+        spec['resources'] = {'requests': requests}
+    return {'metadata': {'name': name, 'namespace': namespace}, 'spec': spec}
+
+
+@pytest.mark.parametrize("quantity, expected", [('2', 2), (3, 3), ('500m', Decimal('0.5')),
+                                                ('1.5Gi', 1.5 * 2 ** 30), ('2e3', 2000),
+                                                ('1k', 1000), ('1E', 10 ** 18)])
+def test_parse_quantity(quantity, expected):
+    assert parse_quantity(quantity) == expected
+
+
+@pytest.mark.parametrize("quantity", ['', 'Gi', '1Xi', '1.5.1M'])
+def test_parse_quantity_fail(quantity):
+    with pytest.raises(ValueError):
+        parse_quantity(quantity)
+
+
+def test_endpoints_usage():
+    crds = [crd('test', 'a', replicas=2, requests={'cpu': '500m', 'memory': '1Gi'}),
+            crd('test', 'b'),
+            crd('test', 'c', replicas=0, requests={'cpu': '2'}),
+            crd('test', 'd', replicas=1, requests={'cpu': 'wrong'})]
+
+    assert endpoints_usage(crds) == {'endpoints': 4, 'replicas': 4,
+                                     'requests': {'cpu': 1.0, 'memory': 2 ** 31}}
+    assert endpoints_usage([]) == {'endpoints': 0, 'replicas': 0,
+                                   'requests': {'cpu': 0.0, 'memory': 0}}
+
+
+def test_usage_follows_manifest(mocker):
+    read_manifest_mock = mocker.patch('management_api.tenants.tenant_usage.read_manifest')
+    build_manifest_mock = mocker.patch('management_api.tenants.tenant_usage.build_manifest')
+    usage = UsageAccounting(interval=0)
+
+    read_manifest_mock.return_value = manifest([10, 5], [1])
+    usage.record('tenant')
+    assert usage.storage('tenant')['bytes'] == 16
+    assert usage.storage('tenant')['objects'] == 3
+    assert usage.storage('tenant')['models'] == 2
+
+    read_manifest_mock.side_effect = MinioCallException('error')
+    usage.record('tenant')
+    assert len(usage) == 0
+
+    read_manifest_mock.side_effect = None
+    read_manifest_mock.return_value = manifest([3])
+    assert usage.storage('tenant')['bytes'] == 3
+    build_manifest_mock.assert_not_called()
+
+    usage.drop('tenant')
+    read_manifest_mock.return_value = None
+    build_manifest_mock.return_value = manifest([7])
+    assert usage.storage('tenant')['bytes'] == 7
+    build_manifest_mock.assert_called_once_with('tenant')
+
+
+def test_listing_does_not_override_newer_totals():
+    usage = UsageAccounting(interval=0)
+    started = time.time()
+    usage.set_storage('tenant', manifest([10]))
+
+    assert usage.set_storage('tenant', manifest([1]), since=started)['bytes'] == 10
+    assert usage.set_storage('tenant', manifest([1]), since=time.time())['bytes'] == 1
+
+
+def test_reconcile(mocker):
+    mocker.patch('management_api.tenants.tenant_usage.minio_client.list_buckets').\
+        return_value = {'Buckets': [{'Name': 'first'}, {'Name': 'second'}, {'Name': 'broken'},
+                                    {'Name': 'platform'}]}
+    mocker.patch('management_api.tenants.tenant_usage.list_tenant_namespaces').return_value = \
+        ['first', 'second', 'broken', 'without-bucket']
+
+    def build_manifest(bucket):
+        if bucket == 'broken':
+            raise MinioCallException('error')
+        return manifest([len(bucket)])
+
+    build_manifest_mock = mocker.patch('management_api.tenants.tenant_usage.build_manifest')
+    build_manifest_mock.side_effect = build_manifest
+    read_manifest_mock = mocker.patch('management_api.tenants.tenant_usage.read_manifest')
+    read_manifest_mock.side_effect = lambda bucket: manifest([10]) if bucket == 'first' else None
+    usage = UsageAccounting(interval=0)
+    usage.set_storage('deleted', manifest([1]))
+    usage._storage['deleted']['updatedAt'] = 0
+
+    assert usage.snapshot().keys() == {'deleted'}
+    assert usage.reconciled_at is None
+    build_manifest_mock.assert_not_called()
+
+    assert usage.reconcile() == 2
+    assert {tenant: totals['bytes'] for tenant, totals in usage.snapshot().items()} == \
+        {'first': 10, 'second': 6}
+    assert usage.reconciled_at is not None
+    assert usage.stats()['failures'] == 1
+    assert [call[0][0] for call in build_manifest_mock.call_args_list] == ['second', 'broken']
+
+
+def test_reconciliation_starts_in_background(mocker):
+    usage = UsageAccounting(interval=60)
+    reconciled = threading.Event()
+    mocker.patch.object(usage, 'reconcile', side_effect=lambda: reconciled.set())
+
+    usage.start()
+    usage.start()
+
+    assert reconciled.wait(5)
+    assert usage.reconcile.call_count == 1
+
+    disabled = UsageAccounting(interval=0)
+    disabled.start()
+    assert disabled._thread is None
+
+
+def test_get_tenants_usage(mocker):
+    usage = UsageAccounting(interval=0)
+    usage.reconciled_at = 1.0
+    usage.set_storage('first', manifest([10]))
+    usage.set_storage('second', manifest([20, 30]))
+    usage.set_storage('third', manifest([5]))
+    mocker.patch('management_api.tenants.tenant_usage.tenant_usage', usage)
+    mocker.patch('management_api.tenants.tenant_usage.get_k8s_api_custom_client')
+    get_all_endpoints_mock = mocker.patch(
+        'management_api.tenants.tenant_usage.get_all_endpoints')
+    get_all_endpoints_mock.return_value = [crd('third', 'a', replicas=3),
+                                           crd('other', 'b', replicas=1)]
+
+    data = get_tenants_usage('token', limit=2)
+    assert [tenant['name'] for tenant in data['tenants']] == ['second', 'first']
+    assert 'endpoints' not in data['tenants'][0]
+    assert data['total'] == {'bytes': 65, 'objects': 4}
+    assert data['reconciledAt'] == 1.0
+    get_all_endpoints_mock.assert_not_called()
+
+    data = get_tenants_usage('token', sort='replicas', limit=2)
+    assert [tenant['name'] for tenant in data['tenants']] == ['third', 'other']
+    assert data['tenants'][1]['storage'] is None
+    assert data['tenants'][0]['endpoints']['replicas'] == 3
+
+    data = get_tenants_usage('token', endpoints=True)
+    assert [tenant['name'] for tenant in data['tenants']][:3] == ['second', 'first', 'third']
+    assert all('endpoints' in tenant for tenant in data['tenants'])
@@ -0,0 +1,141 @@
+#
+# Copyright (c) 2019 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+import falcon
+import pytest
+from unittest.mock import Mock
+
+
+def test_tenants_batch(mocker, client):
+    create_tenants_mock = mocker.patch('management_api.tenants.tenants.create_tenants')
+    create_tenants_mock.return_value = [
+        {'name': 'first', 'status': falcon.HTTP_OK},
+        {'name': 'second', 'status': falcon.HTTP_CONFLICT,
+         'error': 'Tenant second already exists'}]
+    tenant = {'cert': 'cert', 'scope': 'scope', 'quota': {'maxEndpoints': 5}}
+    body = {'tenants': [dict(tenant, name='first'), dict(tenant, name='second')]}
+
+    result = client.simulate_request(method='POST', path='/tenants:batch', headers={},
+                                     json=body)
+
+    assert falcon.HTTP_OK == result.status
+    assert result.json['data'] == {'results': create_tenants_mock.return_value,
+                                   'succeeded': 1, 'failed': 1}
+    create_tenants_mock.assert_called_once_with(body['tenants'], id_token='TOKEN')
+
+
+def test_tenants_reconcile_secrets(mocker, client):
+    mocker.patch('management_api.tenants.tenants.list_tenants').return_value = ['first']
+    reconcile_mock = mocker.patch('management_api.tenants.tenants.reconcile_portable_secrets')
+    reconcile_mock.return_value = {'tenants': 1, 'unchanged': 1, 'updated': 1, 'failed': []}
+
+    result = client.simulate_request(method='POST', path='/tenants:reconcileSecrets',
+                                     headers={})
+
+    assert falcon.HTTP_OK == result.status
+    assert result.json['data'] == reconcile_mock.return_value
+    reconcile_mock.assert_called_once_with(['first'], 'TOKEN')
+
+
+def test_delete_tenant_in_background(mocker, client):
+    job = Mock(id='job-id', tenant='tenant')
+    job.to_dict.return_value = {'id': 'job-id', 'kind': 'delete_tenant'}
+    start_deletion_mock = mocker.patch('management_api.tenants.tenants.start_tenant_deletion')
+    start_deletion_mock.return_value = job
+
+    result = client.simulate_request(method='DELETE', path='/tenants', headers={},
+                                     json={'name': 'tenant'})
+
+    assert falcon.HTTP_ACCEPTED == result.status
+    assert result.headers['location'].endswith('/tenants/tenant/jobs/job-id')
+    assert result.json['data'] == {'name': 'tenant', 'job': job.to_dict.return_value}
+    start_deletion_mock.assert_called_once_with(parameters={'name': 'tenant'}, id_token='TOKEN')
+
+
+def test_delete_tenant_synchronously(mocker, client):
+    delete_mock = mocker.patch('management_api.tenants.tenants.delete_tenant')
+    delete_mock.return_value = 'tenant'
+
+    result = client.simulate_request(method='DELETE', path='/tenants', headers={},
+                                     json={'name': 'tenant'}, query_string='async=false')
+
+    assert falcon.HTTP_OK == result.status
+    assert result.json == {'status': 'DELETED', 'data': {'name': 'tenant'}}
+
+
+def test_list_tenants(mocker, client):
+    list_mock = mocker.patch('management_api.tenants.tenants.list_tenants')
+    list_mock.return_value = ['first', 'second']
+    details_mock = mocker.patch('management_api.tenants.tenants.get_tenants_details')
+
+    result = client.simulate_request(method='GET', path='/tenants', headers={})
+
+    assert falcon.HTTP_OK == result.status
+    assert result.json == {'status': 'OK', 'data': {'tenants': ['first', 'second']}}
+    details_mock.assert_not_called()
+
+
+def test_list_tenants_page_with_details(mocker, client):
+    page_mock = mocker.patch('management_api.tenants.tenants.list_tenants_page')
+    page_mock.return_value = (['first'], 'next')
+    details_mock = mocker.patch('management_api.tenants.tenants.get_tenants_details')
+    details_mock.return_value = [{'name': 'first', 'endpoints': 2}]
+
+    result = client.simulate_request(method='GET', path='/tenants', headers={},
+                                     query_string='limit=1&endpoints=true')
+
+    assert falcon.HTTP_OK == result.status
+    assert result.json['data'] == {'tenants': details_mock.return_value, 'continue': 'next'}
+    page_mock.assert_called_once_with('TOKEN', limit=1, continue_token=None)
+    details_mock.assert_called_once_with(['first'], 'TOKEN', endpoints=True, bucket_size=False)
+
+
+@pytest.mark.parametrize("tenant_exists, expected_status",
+                         [(True, falcon.HTTP_OK),
+                          (False, falcon.HTTP_404)])
+def test_tenant_usage(mocker, client, tenant_exists, expected_status):
+    mocker.patch('management_api.tenants.tenants.tenant_exists').return_value = tenant_exists
+    usage_mock = mocker.patch('management_api.tenants.tenants.get_tenant_usage')
+    usage_mock.return_value = {'name': 'tenant', 'storage': {'bytes': 10}}
+
+    result = client.simulate_request(method='GET', path='/tenants/tenant/usage', headers={})
+
+    assert expected_status == result.status
+    if tenant_exists:
+        assert result.json['data'] == usage_mock.return_value
+        usage_mock.assert_called_once_with('tenant', 'TOKEN')
+    else:
+        usage_mock.assert_not_called()
+
+
+def test_tenants_usage(mocker, client):
+    usage_mock = mocker.patch('management_api.tenants.tenants.get_tenants_usage')
+    usage_mock.return_value = {'tenants': [], 'reconciledAt': 1.0,
+                               'total': {'bytes': 0, 'objects': 0}}
+
+    result = client.simulate_request(method='GET', path='/tenants:usage', headers={},
+                                     query_string='sort=replicas&limit=5')
+
+    assert falcon.HTTP_OK == result.status
+    assert result.json['data'] == usage_mock.return_value
+    usage_mock.assert_called_once_with('TOKEN', sort='replicas', limit=5, endpoints=False)
+
+    result = client.simulate_request(method='GET', path='/tenants:usage', headers={},
+                                     query_string='sort=name')
+
+    assert falcon.HTTP_400 == result.status
+    usage_mock.assert_called_once()
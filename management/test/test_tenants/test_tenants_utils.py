@@ -0,0 +1,244 @@
+#
+# Copyright (c) 2019 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import json
+from unittest.mock import Mock
+
+import falcon
+import pytest
+from botocore.exceptions import ClientError
+from kubernetes.client import V1ObjectMeta, V1Secret
+from kubernetes.client.rest import ApiException
+
+from management_api.tenants.portable_secrets import portable_secrets
+from management_api.tenants.tenants_utils import tenant_exists, delete_tenant, \
+    existing_tenants, create_tenant, create_tenants, list_tenants, list_tenants_page, \
+    list_tenant_namespaces
+from management_api.utils.errors_handling import MinioCallException, \
+    KubernetesCreateException, KubernetesGetException
+
+
+@pytest.fixture(scope='function')
+def tenant_checks(mocker):
+    existing_tenants.clear()
+    minio_client_mock = mocker.patch('management_api.tenants.tenants_utils.minio_client')
+    namespace_mock = mocker.patch('management_api.tenants.tenants_utils.is_namespace_available')
+    namespace_mock.return_value = True
+    yield minio_client_mock, namespace_mock
+    existing_tenants.clear()
+
+
+def test_tenant_exists_is_cached_per_token(tenant_checks):
+    minio_client_mock, namespace_mock = tenant_checks
+
+    for _ in range(3):
+        assert tenant_exists('tenant', 'token')
+    assert tenant_exists('tenant', 'other token')
+
+    minio_client_mock.head_bucket.assert_called_with(Bucket='tenant')
+    assert minio_client_mock.head_bucket.call_count == 2
+    assert namespace_mock.call_count == 2
+    minio_client_mock.list_objects_v2.assert_not_called()
+
+
+@pytest.mark.parametrize("error_code", ['404', 'NoSuchBucket'])
+def test_tenant_exists_missing_bucket_is_not_cached(tenant_checks, error_code):
+    minio_client_mock, namespace_mock = tenant_checks
+    minio_client_mock.head_bucket.side_effect = ClientError(
+        {'Error': {'Code': error_code}}, 'HeadBucket')
+
+    assert not tenant_exists('tenant', 'token')
+    assert not tenant_exists('tenant', 'token')
+
+    assert minio_client_mock.head_bucket.call_count == 2
+    namespace_mock.assert_not_called()
+
+
+def test_tenant_exists_minio_error(tenant_checks):
+    minio_client_mock, _ = tenant_checks
+    minio_client_mock.head_bucket.side_effect = ClientError(
+        {'Error': {'Code': '403'}}, 'HeadBucket')
+
+    with pytest.raises(MinioCallException):
+        tenant_exists('tenant', 'token')
+
+
+def test_delete_tenant_invalidates_cache(mocker, tenant_checks):
+    minio_client_mock, namespace_mock = tenant_checks
+    mocker.patch('management_api.tenants.tenants_utils.delete_bucket')
+    mocker.patch('management_api.tenants.tenants_utils.delete_namespace')
+    callback = Mock()
+    mocker.patch('management_api.tenants.tenants_utils.tenant_invalidation_callbacks',
+                 [callback])
+    assert tenant_exists('tenant', 'token')
+    assert tenant_exists('other', 'token')
+
+    delete_tenant({'name': 'tenant'}, 'admin token')
+    callback.assert_called_with('tenant')
+    namespace_mock.return_value = False
+
+    assert not tenant_exists('tenant', 'token')
+    assert tenant_exists('other', 'token')
+    assert len(existing_tenants) == 1
+
+
+TENANT = {'name': 'tenant', 'cert': 'cert', 'scope': 'scope',
+          'quota': {'maxEndpoints': 5, 'requests.cpu': '1'}}
+
+
+@pytest.fixture(scope='function')
+def fake_clients(mocker):
+    existing_tenants.clear()
+    mocker.patch('management_api.tenants.tenants_utils.validate_cert')
+    mocker.patch('management_api.tenants.tenants_utils.tenant_exists').return_value = False
+    mocker.patch('management_api.tenants.tenants_utils.delete_objects')
+    minio_client_mock = mocker.patch('management_api.tenants.tenants_utils.minio_client')
+    api_instance = mocker.patch('management_api.tenants.tenants_utils.get_k8s_api_client')\
+        .return_value
+    mocker.patch('management_api.tenants.portable_secrets.get_k8s_api_client').return_value = \
+        api_instance
+    api_instance.read_namespaced_secret.side_effect = lambda name, namespace: V1Secret(
+        metadata=V1ObjectMeta(name=name, namespace=namespace), data={'key': 'value'})
+    portable_secrets.clear()
+    rbac_api_instance = mocker.patch('management_api.tenants.tenants_utils.'
+                                     'get_k8s_rbac_api_client').return_value
+    rolebinding_mock = mocker.patch('management_api.tenants.tenants_utils.create_rolebinding')
+    yield minio_client_mock, api_instance, rbac_api_instance, rolebinding_mock
+    existing_tenants.clear()
+
+
+def test_create_tenant(fake_clients):
+    minio_client_mock, api_instance, rbac_api_instance, rolebinding_mock = fake_clients
+
+    assert create_tenant(TENANT, 'token') == 'tenant'
+
+    namespace = api_instance.create_namespace.call_args[0][0]
+    assert namespace.metadata.annotations == {'maxEndpoints': '5'}
+    quota = api_instance.create_namespaced_resource_quota.call_args[0][1]
+    assert quota.spec.hard == {'requests.cpu': '1'}
+    assert TENANT['quota'] == {'maxEndpoints': 5, 'requests.cpu': '1'}
+    minio_client_mock.create_bucket.assert_called_once_with(Bucket='tenant')
+    assert api_instance.create_namespaced_secret.call_count == 3
+    rbac_api_instance.create_namespaced_role.assert_called_once()
+    rolebinding_mock.assert_called_once_with('tenant', 'scope', 'token')
+    api_instance.delete_namespace.assert_not_called()
+    minio_client_mock.delete_bucket.assert_not_called()
+
+
+def test_create_tenant_rolls_back_created_resources(fake_clients):
+    minio_client_mock, api_instance, rbac_api_instance, rolebinding_mock = fake_clients
+    rbac_api_instance.create_namespaced_role.side_effect = ApiException(status=500)
+
+    with pytest.raises(KubernetesCreateException):
+        create_tenant(TENANT, 'token')
+
+    rolebinding_mock.assert_not_called()
+    api_instance.delete_namespace.assert_called_once()
+    minio_client_mock.delete_bucket.assert_called_once_with(Bucket='tenant')
+
+
+def test_create_tenant_keeps_existing_namespace(fake_clients):
+    minio_client_mock, api_instance, _, _ = fake_clients
+    api_instance.create_namespace.side_effect = ApiException(status=409)
+
+    with pytest.raises(KubernetesCreateException):
+        create_tenant(TENANT, 'token')
+
+    api_instance.create_namespaced_secret.assert_not_called()
+    api_instance.delete_namespace.assert_not_called()
+    minio_client_mock.delete_bucket.assert_called_once_with(Bucket='tenant')
+
+
+def test_create_tenant_keeps_existing_bucket(fake_clients):
+    minio_client_mock, api_instance, _, _ = fake_clients
+    minio_client_mock.create_bucket.side_effect = ClientError(
+        {'Error': {'Code': 'BucketAlreadyOwnedByYou'}}, 'CreateBucket')
+
+    with pytest.raises(MinioCallException):
+        create_tenant(TENANT, 'token')
+
+    minio_client_mock.delete_bucket.assert_not_called()
+    api_instance.delete_namespace.assert_called_once()
+
+
+def test_create_tenants(fake_clients):
+    minio_client_mock = fake_clients[0]
+
+    def create_bucket(Bucket):
+        if Bucket == 'broken':
+            raise ClientError({'Error': {'Code': '500'}}, 'CreateBucket')
+
+    minio_client_mock.create_bucket.side_effect = create_bucket
+    tenants = [dict(TENANT, name=name) for name in ('first', 'broken', 'twice', 'twice')]
+
+    results = create_tenants(tenants, 'token')
+
+    assert [(result['name'], result['status']) for result in results] == [
+        ('first', falcon.HTTP_OK), ('broken', falcon.HTTP_INTERNAL_SERVER_ERROR),
+        ('twice', falcon.HTTP_BAD_REQUEST), ('twice', falcon.HTTP_BAD_REQUEST)]
+    assert 'error' not in results[0]
+    assert minio_client_mock.create_bucket.call_count == 2
+
+
+def namespaces_page(names, next_page=None):
+    metadata = {'continue': next_page} if next_page else {}
+    return Mock(data=json.dumps({'items': [{'metadata': {'name': name}} for name in names],
+                                 'metadata': metadata}).encode())
+
+
+def test_list_tenants_page(mocker):
+    api_instance = mocker.patch('management_api.tenants.tenants_utils.get_k8s_api_client')\
+        .return_value
+    api_instance.list_namespace.return_value = namespaces_page(['first', 'second'], 'next')
+
+    assert list_tenants_page('token', limit=2, continue_token='page') == \
+        (['first', 'second'], 'next')
+    api_instance.list_namespace.assert_called_once_with(
+        label_selector='created_by = platform_admin', field_selector='status.phase!=Terminating',
+        limit=2, _preload_content=False, _continue='page')
+
+
+def test_list_tenants_follows_pages(mocker):
+    api_instance = mocker.patch('management_api.tenants.tenants_utils.get_k8s_api_client')\
+        .return_value
+    api_instance.list_namespace.side_effect = [namespaces_page(['first'], 'next'),
+                                               namespaces_page([])]
+
+    assert list_tenants('token') == ['first']
+    assert api_instance.list_namespace.call_args[1]['_continue'] == 'next'
+
+
+def test_list_tenant_namespaces(mocker):
+    mocker.patch('management_api.tenants.tenants_utils.get_shared_api_client')
+    core_api_mock = mocker.patch('management_api.tenants.tenants_utils.k8s_client.CoreV1Api')
+    list_namespace_mock = core_api_mock.return_value.list_namespace
+    list_namespace_mock.return_value = namespaces_page(['first', 'second'])
+
+    assert list_tenant_namespaces() == ['first', 'second']
+    list_namespace_mock.assert_called_once_with(label_selector='created_by = platform_admin',
+                                                _preload_content=False)
+
+    list_namespace_mock.side_effect = ApiException(status=403)
+    with pytest.raises(KubernetesGetException):
+        list_tenant_namespaces()
+
+
+def test_list_tenants_fail(mocker):
+    api_instance = mocker.patch('management_api.tenants.tenants_utils.get_k8s_api_client')\
+        .return_value
+    api_instance.list_namespace.side_effect = ApiException(status=403)
+    with pytest.raises(KubernetesGetException):
+        list_tenants('token')
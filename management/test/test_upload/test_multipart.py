@@ -17,6 +17,19 @@
 import pytest
 import falcon
 
+from management_api.upload.sessions import upload_sessions
+from management_api.utils.errors_handling import UploadDoesNotExistException
+
+WRITE_PARAMS = {'partNumber': '1', 'uploadId': 'some-id', 'modelName': 'model',
+                'modelVersion': '1', 'fileName': 'filename'}
+
+
+@pytest.fixture(autouse=True)
+def clear_upload_sessions():
+    upload_sessions.clear()
+    yield
+    upload_sessions.clear()
+
 
 @pytest.mark.parametrize("tenant_exists, expected_status",
                          [(True, falcon.HTTP_OK),
@@ -43,6 +56,7 @@ def test_multipart_start(client, mocker, tenant_exists, expected_status):
 def test_multipart_write(client, mocker, tenant_exists, expected_status):
     tenant_existence_mock = mocker.patch('management_api.upload.multipart.tenant_exists')
     tenant_existence_mock.return_value = tenant_exists
+    check_upload_mock = mocker.patch('management_api.upload.sessions.check_upload')
     upload_part_mock = mocker.patch('management_api.upload.multipart.upload_part')
     upload_part_mock.return_value = 'part_etag'
     result = client.simulate_request(method='PUT',
@@ -52,11 +66,90 @@ def test_multipart_write(client, mocker, tenant_exists, expected_status):
                                              'modelName': 'model',
                                              'modelVersion': '1',
                                              'fileName': 'filename'},
+                                     headers={}, body=b'part-bytes')
+    assert expected_status == result.status
+    tenant_existence_mock.assert_called_once()
+    if tenant_exists:
+        check_upload_mock.assert_called_once_with(bucket='default', key='model/1/filename',
+                                                  multipart_id='some-id')
+        upload_part_mock.assert_called_once()
+        assert upload_part_mock.call_args[1]['content_length'] == len(b'part-bytes')
+
+
+def test_multipart_write_uses_started_session(client, mocker):
+    tenant_existence_mock = mocker.patch('management_api.upload.multipart.tenant_exists')
+    tenant_existence_mock.return_value = True
+    mocker.patch('management_api.upload.multipart.create_upload').return_value = 'some-id'
+    check_upload_mock = mocker.patch('management_api.upload.sessions.check_upload')
+    upload_part_mock = mocker.patch('management_api.upload.multipart.upload_part')
+    upload_part_mock.return_value = 'part_etag'
+    client.simulate_request(method='POST', path='/tenants/default/upload/start', headers={},
+                            json={'modelName': 'model', 'modelVersion': 1,
+                                  'fileName': 'filename', 'partSize': 10})
+
+    for part_number in range(1, 4):
+        result = client.simulate_request(method='PUT', path='/tenants/default/upload',
+                                         params=dict(WRITE_PARAMS, partNumber=str(part_number)),
+                                         headers={}, body=b'part-bytes')
+        assert falcon.HTTP_OK == result.status
+
+    tenant_existence_mock.assert_called_once()
+    check_upload_mock.assert_not_called()
+    assert upload_part_mock.call_args[1]['key'] == 'model/1/filename'
+    assert upload_part_mock.call_args[1]['part_number'] == 3
+
+    result = client.simulate_request(method='PUT', path='/tenants/default/upload',
+                                     params=WRITE_PARAMS, headers={}, body=b'part-bytes!')
+    assert falcon.HTTP_BAD_REQUEST == result.status
+    assert upload_part_mock.call_count == 3
+
+
+def test_multipart_write_to_unknown_upload(client, mocker):
+    mocker.patch('management_api.upload.multipart.tenant_exists').return_value = True
+    check_upload_mock = mocker.patch('management_api.upload.sessions.check_upload')
+    check_upload_mock.side_effect = UploadDoesNotExistException('some-id')
+    upload_part_mock = mocker.patch('management_api.upload.multipart.upload_part')
+    result = client.simulate_request(method='PUT', path='/tenants/default/upload',
+                                     params=WRITE_PARAMS, headers={}, body=b'part-bytes')
+    assert falcon.HTTP_NOT_FOUND == result.status
+    upload_part_mock.assert_not_called()
+    assert upload_sessions.get('some-id') is None
+
+
+def test_multipart_write_requires_content_length(client, mocker):
+    tenant_existence_mock = mocker.patch('management_api.upload.multipart.tenant_exists')
+    upload_part_mock = mocker.patch('management_api.upload.multipart.upload_part')
+    result = client.simulate_request(method='PUT',
+                                     path='/tenants/default/upload',
+                                     params={'partNumber': '1',
+                                             'uploadId': 'some-id',
+                                             'modelName': 'model',
+                                             'modelVersion': '1',
+                                             'fileName': 'filename'},
+                                     headers={})
+    assert falcon.HTTP_BAD_REQUEST == result.status
+    tenant_existence_mock.assert_not_called()
+    upload_part_mock.assert_not_called()
+
+
+@pytest.mark.parametrize("tenant_exists, expected_status",
+                         [(True, falcon.HTTP_OK),
+                          (False, falcon.HTTP_404)])
+def test_multipart_list_parts(client, mocker, tenant_exists, expected_status):
+    tenant_existence_mock = mocker.patch('management_api.upload.multipart.tenant_exists')
+    tenant_existence_mock.return_value = tenant_exists
+    list_parts_mock = mocker.patch('management_api.upload.multipart.list_parts')
+    list_parts_mock.return_value = [{'PartNumber': 1, 'ETag': '"etag"', 'Size': 5}]
+    result = client.simulate_request(method='GET', path='/tenants/default/upload/parts',
+                                     params={'uploadId': 'some-id', 'modelName': 'model',
+                                             'modelVersion': '1', 'fileName': 'filename'},
                                      headers={})
     assert expected_status == result.status
     tenant_existence_mock.assert_called_once()
     if tenant_exists:
-        upload_part_mock.upload_part_mock()
+        list_parts_mock.assert_called_once_with(bucket='default', key='model/1/filename',
+                                                multipart_id='some-id')
+        assert result.json['data']['parts'] == list_parts_mock.return_value
 
 
 @pytest.mark.parametrize("tenant_exists, expected_status",
@@ -68,6 +161,9 @@ def test_multipart_done(client, mocker, tenant_exists, expected_status):
     tenant_existence_mock = mocker.patch('management_api.upload.multipart.tenant_exists')
     tenant_existence_mock.return_value = tenant_exists
     complete_upload_mock = mocker.patch('management_api.upload.multipart.complete_upload')
+    record_model_file_mock = mocker.patch('management_api.upload.multipart.record_model_file')
+    tenant_usage_mock = mocker.patch('management_api.upload.multipart.tenant_usage')
+    upload_sessions.register('default', 'test/3/filename', 'some-id', 'TOKEN')
     result = client.simulate_request(method='POST', path='/tenants/default/upload/done',
                                      headers={},
                                      json=body)
@@ -75,6 +171,10 @@ def test_multipart_done(client, mocker, tenant_exists, expected_status):
     tenant_existence_mock.assert_called_once()
     if tenant_exists:
         complete_upload_mock.complete_upload_mock()
+        assert upload_sessions.get('some-id') is None
+        record_model_file_mock.assert_called_once_with(bucket='default',
+                                                       key='test/3/filename')
+        tenant_usage_mock.record.assert_called_once_with('default')
 
 
 @pytest.mark.parametrize("tenant_exists, expected_status",
@@ -93,3 +193,24 @@ def test_multipart_abort(client, mocker, tenant_exists, expected_status):
     tenant_existence_mock.assert_called_once()
     if tenant_exists:
         abort_upload_mock.complete_upload_mock()
+
+
+@pytest.mark.parametrize("tenant_exists, expected_status",
+                         [(True, falcon.HTTP_OK),
+                          (False, falcon.HTTP_404)])
+def test_upload_dir(client, mocker, tenant_exists, expected_status):
+    body = {'modelName': 'test', 'modelVersion': 3, 'key': 'variables'}
+    mocker.patch('management_api.upload.multipart.tenant_exists').return_value = tenant_exists
+    create_dir_mock = mocker.patch('management_api.upload.multipart.create_dir')
+    create_dir_mock.return_value = {}
+    record_model_dir_mock = mocker.patch('management_api.upload.multipart.record_model_dir')
+    invalidate_mock = mocker.patch('management_api.upload.multipart.invalidate_model_presence')
+    result = client.simulate_request(method='POST', path='/tenants/default/upload/dir',
+                                     headers={}, json=body)
+    assert expected_status == result.status
+    if tenant_exists:
+        create_dir_mock.assert_called_once_with('default', 'test/3/variables/')
+        record_model_dir_mock.assert_called_once_with(bucket='default', key='test/3/variables/')
+        invalidate_mock.assert_called_once_with('default', 'test')
+    else:
+        record_model_dir_mock.assert_not_called()
@@ -14,12 +14,76 @@
 # limitations under the License.
 #
 
+import hashlib
+import io
+import resource
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import urlparse, parse_qs
+
+import boto3
 import pytest
+import requests
+from botocore.client import Config
 from botocore.exceptions import ClientError
 
 from management_api.upload.multipart_utils import create_upload, upload_part, complete_upload, \
-    abort_upload
-from management_api.utils.errors_handling import MinioCallException
+    abort_upload, list_parts, last_part_time, list_uploads
+from management_api.utils.errors_handling import MinioCallException, InvalidParamException, \
+    UploadDoesNotExistException
+
+
+class ZeroStream:
+    """Request stream of given size which is never held in memory as a whole"""
+
+    def __init__(self, size):
+        self.remaining = size
+
+    def read(self, size=-1):
+        size = min(size, self.remaining)
+        self.remaining -= size
+        return b'\0' * size
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+@pytest.fixture(scope='function')
+def s3_stub(mocker):
+    """Minimal S3 UploadPart endpoint reading the body in chunks and returning its MD5"""
+    uploaded = []
+
+    class UploadPartHandler(BaseHTTPRequestHandler):
+        def do_PUT(self):
+            query = parse_qs(urlparse(self.path).query)
+            remaining = int(self.headers['Content-Length'])
+            md5 = hashlib.md5()
+            while remaining:
+                data = self.rfile.read(min(remaining, 64 * 1024))
+                remaining -= len(data)
+                md5.update(data)
+            uploaded.append((query, int(self.headers['Content-Length'])))
+            self.send_response(200)
+            self.send_header('ETag', f'"{md5.hexdigest()}"')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), UploadPartHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    stub_client = boto3.client('s3', endpoint_url=f'http://127.0.0.1:{server.server_port}',
+                               aws_access_key_id='key', aws_secret_access_key='secret',
+                               config=Config(signature_version='s3v4'),
+                               region_name='us-east-1')
+    mocker.patch('management_api.upload.multipart_utils.minio_client', stub_client)
+    yield uploaded
+    server.shutdown()
+    server.server_close()
 
 
 @pytest.mark.parametrize("raise_exception, create_multipart_return_value",
@@ -49,17 +113,110 @@ def test_upload_part(mocker, raise_exception):
     bucket = "test"
     key = "test-file"
     multipart_id = "some-id"
-    upload_part_mock = mocker.patch('management_api.upload.multipart_utils.minio_client.'
-                                    'upload_part')
+    mocker.patch('management_api.upload.multipart_utils.minio_client.generate_presigned_url')
+    put_mock = mocker.patch('management_api.upload.multipart_utils.upload_session.put')
+    put_mock.side_effect = lambda url, data, timeout: \
+        mocker.Mock(status_code=200, headers={'ETag': f'"{hashlib.md5(data.read()).hexdigest()}"'})
     if raise_exception:
         with pytest.raises(MinioCallException):
-            upload_part_mock.side_effect = ClientError(operation_name="test", error_response={})
-            upload_part(data=data, part_number=part_number, bucket=bucket, key=key,
+            put_mock.side_effect = requests.ConnectionError('connection refused')
+            upload_part(stream=io.BytesIO(data), content_length=len(data),
+                        part_number=part_number, bucket=bucket, key=key,
                         multipart_id=multipart_id)
     else:
-        upload_part(data=data, part_number=part_number, bucket=bucket, key=key,
-                    multipart_id=multipart_id)
-    upload_part_mock.assert_called_once()
+        etag = upload_part(stream=io.BytesIO(data), content_length=len(data),
+                           part_number=part_number, bucket=bucket, key=key,
+                           multipart_id=multipart_id)
+        assert etag == f'"{hashlib.md5(data).hexdigest()}"'
+    put_mock.assert_called_once()
+
+
+def test_upload_part_streams_with_bounded_memory(s3_stub):
+    etag = upload_part(stream=ZeroStream(8 * 1024 * 1024), content_length=8 * 1024 * 1024,
+                       part_number=1, bucket='test', key='test-file', multipart_id='some-id')
+    assert etag == f'"{hashlib.md5(bytes(8 * 1024 * 1024)).hexdigest()}"'
+    peak_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    part_size = 256 * 1024 * 1024
+    upload_part(stream=ZeroStream(part_size), content_length=part_size, part_number=2,
+                bucket='test', key='test-file', multipart_id='some-id')
+
+    assert resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - peak_rss_kb < 32 * 1024
+    query, content_length = s3_stub[-1]
+    assert content_length == part_size
+    assert query['partNumber'] == ['2'] and query['uploadId'] == ['some-id']
+    assert 'X-Amz-Signature' in query
+
+
+def test_upload_part_short_body(s3_stub):
+    with pytest.raises(InvalidParamException):
+        upload_part(stream=io.BytesIO(b'short'), content_length=1024, part_number=1,
+                    bucket='test', key='test-file', multipart_id='some-id')
+
+
+def test_upload_part_checksum_mismatch(mocker):
+    mocker.patch('management_api.upload.multipart_utils.minio_client.generate_presigned_url')
+    put_mock = mocker.patch('management_api.upload.multipart_utils.upload_session.put')
+    put_mock.return_value.status_code = 200
+    put_mock.return_value.headers = {'ETag': '"0123456789abcdef0123456789abcdef"'}
+
+    with pytest.raises(MinioCallException):
+        upload_part(stream=io.BytesIO(b'part-bytes'), content_length=10, part_number=1,
+                    bucket='test', key='test-file', multipart_id='some-id')
+
+
+def test_upload_part_encrypted_etag(mocker):
+    mocker.patch('management_api.upload.multipart_utils.minio_client.generate_presigned_url')
+    put_mock = mocker.patch('management_api.upload.multipart_utils.upload_session.put')
+    put_mock.return_value.status_code = 200
+    put_mock.return_value.headers = {'ETag': '"5f0e1a2b3c4d5e6f7a8b9c0d1e2f3a4b-sse"'}
+
+    etag = upload_part(stream=io.BytesIO(b'part-bytes'), content_length=10, part_number=1,
+                       bucket='test', key='test-file', multipart_id='some-id')
+    assert etag == '"5f0e1a2b3c4d5e6f7a8b9c0d1e2f3a4b-sse"'
+
+
+def test_list_parts_follows_pages(mocker):
+    list_parts_mock = mocker.patch('management_api.upload.multipart_utils.minio_client.'
+                                   'list_parts')
+    list_parts_mock.side_effect = [
+        {'Parts': [{'PartNumber': 1, 'ETag': '"a"', 'Size': 5, 'LastModified': None}],
+         'IsTruncated': True, 'NextPartNumberMarker': 1},
+        {'Parts': [{'PartNumber': 3, 'ETag': '"c"', 'Size': 2}], 'IsTruncated': False}]
+
+    parts = list_parts(bucket='test', key='test-file', multipart_id='some-id')
+
+    assert parts == [{'PartNumber': 1, 'ETag': '"a"', 'Size': 5},
+                     {'PartNumber': 3, 'ETag': '"c"', 'Size': 2}]
+    assert list_parts_mock.call_args[1]['PartNumberMarker'] == 1
+
+
+@pytest.mark.parametrize("parts, expected_time",
+                         [([], None),
+                          ([{'PartNumber': 1, 'LastModified': datetime(2019, 1, 1, 12,
+                                                                       tzinfo=timezone.utc)},
+                            {'PartNumber': 2, 'LastModified': datetime(2019, 1, 1, 11,
+                                                                       tzinfo=timezone.utc)}],
+                           1546344000.0)])
+def test_last_part_time(mocker, parts, expected_time):
+    list_parts_mock = mocker.patch('management_api.upload.multipart_utils.minio_client.'
+                                   'list_parts')
+    list_parts_mock.return_value = {'Parts': parts, 'IsTruncated': False}
+
+    assert last_part_time(bucket='test', key='test-file', multipart_id='some-id') == \
+        expected_time
+
+
+@pytest.mark.parametrize("error_code, expected_exception",
+                         [('NoSuchUpload', UploadDoesNotExistException),
+                          ('AccessDenied', MinioCallException)])
+def test_list_parts_errors(mocker, error_code, expected_exception):
+    list_parts_mock = mocker.patch('management_api.upload.multipart_utils.minio_client.'
+                                   'list_parts')
+    list_parts_mock.side_effect = ClientError({'Error': {'Code': error_code}}, 'ListParts')
+
+    with pytest.raises(expected_exception):
+        list_parts(bucket='test', key='test-file', multipart_id='some-id')
 
 
 @pytest.mark.parametrize("raise_exception", [True, False])
@@ -95,3 +252,21 @@ def test_abort_upload(mocker, raise_exception):
         abort_upload(bucket=bucket, key=key, multipart_id=multipart_id)
 
     abort_upload_mock.assert_called_once()
+
+
+def test_list_uploads_follows_pages(mocker):
+    list_uploads_mock = mocker.patch('management_api.upload.multipart_utils.minio_client.'
+                                     'list_multipart_uploads')
+    list_uploads_mock.side_effect = [
+        {'Uploads': [{'Key': 'a', 'UploadId': '1'}], 'IsTruncated': True,
+         'NextKeyMarker': 'a', 'NextUploadIdMarker': '1'},
+        {'Uploads': [{'Key': 'b', 'UploadId': '2'}], 'IsTruncated': False}]
+
+    assert [upload['UploadId'] for upload in list_uploads('test')] == ['1', '2']
+    assert list_uploads_mock.call_args[1] == {'Bucket': 'test', 'KeyMarker': 'a',
+                                              'UploadIdMarker': '1'}
+
+    list_uploads_mock.side_effect = ClientError({'Error': {'Code': 'NoSuchBucket'}},
+                                                'ListMultipartUploads')
+    with pytest.raises(MinioCallException):
+        list(list_uploads('test'))
@@ -0,0 +1,139 @@
+#
+# Copyright (c) 2019 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from datetime import datetime, timezone
+
+import pytest
+
+from management_api.upload.sessions import UploadSessionStore
+from management_api.utils.errors_handling import UploadDoesNotExistException, \
+    MinioCallException
+
+
+@pytest.fixture(scope='function')
+def time_mock(mocker):
+    time_mock = mocker.patch('management_api.upload.sessions.time.time')
+    time_mock.return_value = 1000.0
+    return time_mock
+
+
+def test_session_store_is_bounded(time_mock):
+    store = UploadSessionStore(maxsize=2, ttl=60, gc_interval=0)
+    for upload_id in ['a', 'b', 'c']:
+        store.register('tenant', f'model/1/{upload_id}', upload_id, 'token')
+
+    assert store.get('a') is None
+    assert store.get('c').key == 'model/1/c'
+    assert store.get('c').allows('tenant', 'token')
+    assert not store.get('c').allows('tenant', 'other-token')
+    assert not store.get('c').allows('other-tenant', 'token')
+    assert store.stats() == {'size': 2, 'maxsize': 2, 'hits': 4, 'misses': 1, 'evictions': 1,
+                             'aborted': 0}
+
+
+def test_session_store_adopts_upload(mocker, time_mock):
+    check_upload_mock = mocker.patch('management_api.upload.sessions.check_upload')
+    store = UploadSessionStore(maxsize=10, ttl=60, gc_interval=0)
+
+    session = store.adopt('tenant', 'model/1/file', 'some-id', 'token')
+    assert store.adopt('tenant', 'model/1/file', 'some-id', 'refreshed-token') is session
+
+    check_upload_mock.assert_called_once_with(bucket='tenant', key='model/1/file',
+                                              multipart_id='some-id')
+    assert session.allows('tenant', 'refreshed-token')
+
+    check_upload_mock.side_effect = UploadDoesNotExistException('other-id')
+    with pytest.raises(UploadDoesNotExistException):
+        store.adopt('tenant', 'model/1/file', 'other-id', 'token')
+    assert store.get('other-id') is None
+
+
+@pytest.mark.parametrize("last_part_time, aborted",
+                         [(1050.0, False),
+                          (None, True),
+                          (900.0, True)])
+def test_session_store_aborts_stale_uploads(mocker, time_mock, last_part_time, aborted):
+    last_part_time_mock = mocker.patch('management_api.upload.sessions.last_part_time')
+    last_part_time_mock.return_value = last_part_time
+    abort_upload_mock = mocker.patch('management_api.upload.sessions.abort_upload')
+    store = UploadSessionStore(maxsize=10, ttl=60, gc_interval=0)
+    store.register('tenant', 'model/1/file', 'some-id', 'token')
+    store.register('tenant', 'model/1/other', 'other-id', 'token')
+
+    time_mock.return_value = 1070.0
+    store.get('other-id')
+    time_mock.return_value = 1100.0
+    store.collect_garbage()
+
+    last_part_time_mock.assert_called_once_with(bucket='tenant', key='model/1/file',
+                                                multipart_id='some-id')
+    assert store.get('other-id') is not None
+    if aborted:
+        abort_upload_mock.assert_called_once_with(bucket='tenant', key='model/1/file',
+                                                  multipart_id='some-id')
+        assert len(store) == 1
+        assert store.stats()['aborted'] == 1
+    else:
+        abort_upload_mock.assert_not_called()
+        assert store._sessions['some-id'].expires_at == 1110.0
+
+
+def test_session_store_drops_finished_uploads(mocker, time_mock):
+    last_part_time_mock = mocker.patch('management_api.upload.sessions.last_part_time')
+    last_part_time_mock.side_effect = UploadDoesNotExistException('some-id')
+    abort_upload_mock = mocker.patch('management_api.upload.sessions.abort_upload')
+    store = UploadSessionStore(maxsize=10, ttl=60, gc_interval=0)
+    store.register('tenant', 'model/1/file', 'some-id', 'token')
+
+    time_mock.return_value = 1100.0
+    store.collect_garbage()
+
+    abort_upload_mock.assert_not_called()
+    assert len(store) == 0
+
+
+def test_session_store_sweeps_uploads_without_session(mocker, time_mock):
+    def initiated(timestamp):
+        return datetime.fromtimestamp(timestamp, tz=timezone.utc)
+
+    mocker.patch('management_api.upload.sessions.list_tenant_namespaces').return_value = \
+        ['broken', 'tenant']
+    uploads = [{'Key': 'model/1/stale', 'UploadId': 'stale', 'Initiated': initiated(900.0)},
+               {'Key': 'model/1/active', 'UploadId': 'active', 'Initiated': initiated(900.0)},
+               {'Key': 'model/1/fresh', 'UploadId': 'fresh', 'Initiated': initiated(1090.0)},
+               {'Key': 'model/1/file', 'UploadId': 'some-id', 'Initiated': initiated(900.0)}]
+
+    def list_uploads(bucket):
+        if bucket == 'broken':
+            raise MinioCallException('error')
+        return iter(uploads)
+
+    mocker.patch('management_api.upload.sessions.list_uploads').side_effect = list_uploads
+    last_part_time_mock = mocker.patch('management_api.upload.sessions.last_part_time')
+    last_part_time_mock.side_effect = lambda bucket, key, multipart_id: \
+        1050.0 if multipart_id == 'active' else None
+    abort_upload_mock = mocker.patch('management_api.upload.sessions.abort_upload')
+    store = UploadSessionStore(maxsize=10, ttl=60, gc_interval=0)
+    store.register('tenant', 'model/1/file', 'some-id', 'token')
+
+    time_mock.return_value = 1100.0
+    assert store.sweep() == 1
+
+    abort_upload_mock.assert_called_once_with(bucket='tenant', key='model/1/stale',
+                                              multipart_id='stale')
+    assert [call[1]['multipart_id'] for call in last_part_time_mock.call_args_list] == \
+        ['stale', 'active']
+    assert len(store) == 1
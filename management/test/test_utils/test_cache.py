@@ -0,0 +1,68 @@
+#
+# Copyright (c) 2019 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import falcon
+import pytest
+
+from management_api.utils.cache import TTLCache, token_expiration, register_cache
+from test_utils.token_stuff import user_token, invalid_token
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert cache.stats() == {'size': 2, 'maxsize': 2, 'hits': 3, 'misses': 1, 'evictions': 1}
+
+
+def test_ttl_cache_expires_entries(mocker):
+    time_mock = mocker.patch('management_api.utils.cache.time.time')
+    time_mock.return_value = 100.0
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set('ttl', 1)
+    cache.set('exp', 2, expires_at=110.0)
+    cache.set('capped', 3, expires_at=1000.0)
+
+    time_mock.return_value = 120.0
+    assert cache.get('exp') is None
+    assert cache.get('ttl') == 1
+
+    time_mock.return_value = 161.0
+    assert cache.get('ttl') is None
+    assert cache.get('capped') is None
+    assert cache.stats()['evictions'] == 3
+
+
+@pytest.mark.parametrize("token, expected_exp", [(user_token, 1538560869.0),
+                                                 (invalid_token, None)])
+def test_token_expiration(token, expected_exp):
+    assert token_expiration(token) == expected_exp
+
+
+def test_cache_metrics(client):
+    cache = register_cache('test_cache', TTLCache(maxsize=1, ttl=1))
+    cache.get('missing')
+
+    result = client.simulate_request(method='GET', path='/metrics/caches')
+
+    assert result.status == falcon.HTTP_OK
+    assert result.json['data']['caches']['test_cache']['misses'] == 1
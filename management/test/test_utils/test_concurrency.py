@@ -0,0 +1,77 @@
+#
+# Copyright (c) 2019 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import threading
+import time
+
+import pytest
+
+from management_api.utils.concurrency import bounded_map, timed
+
+
+def test_bounded_map_keeps_order_and_bound():
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def work(item):
+        with lock:
+            running.append(item)
+            peak.append(len(running))
+        time.sleep(0.01 * (item % 3))
+        with lock:
+            running.remove(item)
+        return item * 2
+
+    assert list(bounded_map(work, range(20), max_workers=4)) == [item * 2 for item in range(20)]
+    assert max(peak) <= 4
+
+
+def test_bounded_map_consumes_items_lazily():
+    consumed = []
+
+    def items():
+        for item in range(10):
+            consumed.append(item)
+            yield item
+
+    results = bounded_map(lambda item: item, items(), max_workers=2)
+    assert next(results) == 0
+    assert len(consumed) <= 3
+
+
+@pytest.mark.parametrize("max_workers", [1, 3])
+def test_bounded_map_raises_first_error(max_workers):
+    def work(item):
+        if item == 2:
+            raise ValueError(item)
+        return item
+
+    results = bounded_map(work, range(10), max_workers=max_workers)
+    assert [next(results), next(results)] == [0, 1]
+    with pytest.raises(ValueError):
+        next(results)
+
+
+def test_timed_logs_duration(mocker):
+    logger_mock = mocker.patch('management_api.utils.concurrency.logger')
+
+    assert timed('addition', lambda a, b: a + b, 1, b=2) == 3
+    with pytest.raises(ValueError):
+        timed('failure', int, 'not a number')
+
+    messages = [call[0][0] for call in logger_mock.debug.call_args_list]
+    assert messages[0].startswith('addition took ') and messages[1].startswith('failure took ')
@@ -0,0 +1,135 @@
+#
+# Copyright (c) 2019 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import json
+import threading
+
+import pytest
+from kubernetes import client
+from kubernetes.client.rest import ApiException
+from unittest.mock import Mock
+
+from management_api.utils.endpoint_slots import get_endpoint_number, \
+    reserve_endpoint_slots, release_endpoint_slot, endpoint_reservations
+from management_api.utils.errors_handling import KubernetesGetException
+
+
+@pytest.fixture(scope='function', autouse=True)
+def clear_reservations():
+    endpoint_reservations.clear()
+    yield
+    endpoint_reservations.clear()
+
+
+def namespace_object(max_endpoints=None):
+    annotations = {'maxEndpoints': str(max_endpoints)} if max_endpoints else None
+    return client.V1Namespace(metadata=client.V1ObjectMeta(name='test',
+                                                           annotations=annotations))
+
+
+def deployments_page(items, remaining=None, next_page=None):
+    metadata = {'continue': next_page} if next_page else {}
+    if remaining is not None:
+        metadata['remainingItemCount'] = remaining
+    return Mock(data=json.dumps({'items': [{}] * items, 'metadata': metadata}).encode())
+
+
+@pytest.mark.parametrize("page, expected", [(deployments_page(1, 41, 'next'), 42),
+                                            (deployments_page(1), 1),
+                                            (deployments_page(0), 0)])
+def test_get_endpoint_number(page, expected):
+    apps_api_instance = Mock()
+    apps_api_instance.list_namespaced_deployment.return_value = page
+
+    assert get_endpoint_number(apps_api_instance, 'test') == expected
+    apps_api_instance.list_namespaced_deployment.assert_called_once_with(
+        'test', limit=1, _preload_content=False)
+
+
+def test_get_endpoint_number_without_remaining_count():
+    apps_api_instance = Mock()
+    apps_api_instance.list_namespaced_deployment.side_effect = [
+        deployments_page(1, next_page='next'), Mock(items=[Mock()] * 5)]
+
+    assert get_endpoint_number(apps_api_instance, 'test') == 5
+
+
+def test_get_endpoint_number_fail():
+    apps_api_instance = Mock()
+    apps_api_instance.list_namespaced_deployment.side_effect = ApiException()
+    with pytest.raises(KubernetesGetException):
+        get_endpoint_number(apps_api_instance, 'test')
+
+
+def test_get_endpoint_number_from_cache(mocker):
+    informer = Mock()
+    informer.count.return_value = 7
+    mocker.patch('management_api.utils.endpoint_slots.get_cached_informer').\
+        return_value = informer
+    apps_api_instance = Mock()
+
+    assert get_endpoint_number(apps_api_instance, 'test', id_token='token') == 7
+    apps_api_instance.list_namespaced_deployment.assert_not_called()
+
+
+def test_reserve_endpoint_slots_without_limit():
+    api_instance = Mock()
+    api_instance.read_namespace.return_value = namespace_object()
+    apps_api_instance = Mock()
+
+    assert reserve_endpoint_slots(api_instance, apps_api_instance, 'test', ['a', 'b']) == \
+        ['a', 'b']
+    apps_api_instance.list_namespaced_deployment.assert_not_called()
+    assert len(endpoint_reservations) == 0
+
+
+def test_reserve_endpoint_slots_concurrently():
+    api_instance = Mock()
+    api_instance.read_namespace.return_value = namespace_object(max_endpoints=3)
+    apps_api_instance = Mock()
+    apps_api_instance.list_namespaced_deployment.side_effect = \
+        lambda *args, **kwargs: deployments_page(1)
+    apps_api_instance.read_namespaced_deployment.side_effect = ApiException(status=404)
+    granted = []
+
+    def reserve(name):
+        granted.extend(reserve_endpoint_slots(api_instance, apps_api_instance, 'test', [name]))
+
+    threads = [threading.Thread(target=reserve, args=(f'endpoint-{i}',)) for i in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(granted) == 2
+    assert endpoint_reservations.stats()['refused'] == 8
+
+
+def test_reserve_endpoint_slots_drops_seen_and_released():
+    api_instance = Mock()
+    api_instance.read_namespace.return_value = namespace_object(max_endpoints=2)
+    apps_api_instance = Mock()
+    apps_api_instance.list_namespaced_deployment.return_value = deployments_page(0)
+
+    assert reserve_endpoint_slots(api_instance, apps_api_instance, 'test', ['a', 'b', 'c']) == \
+        ['a', 'b']
+    release_endpoint_slot('test', 'b')
+    # deployment of a appeared and is counted instead of its reservation
+    apps_api_instance.list_namespaced_deployment.return_value = deployments_page(1)
+    assert reserve_endpoint_slots(api_instance, apps_api_instance, 'test', ['c']) == ['c']
+    apps_api_instance.read_namespaced_deployment.assert_called_once_with(
+        'a', 'test', _preload_content=False)
+    assert len(endpoint_reservations) == 1
@@ -0,0 +1,179 @@
+#
+# Copyright (c) 2019 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import pytest
+from kubernetes.client.rest import ApiException
+from unittest.mock import Mock
+
+from management_api.utils.errors_handling import KubernetesForbiddenException
+from management_api.utils.kubernetes_cache import Informer, ResourceCache, AccessReviewer, \
+    ResourceVersionExpired
+
+
+def endpoint(namespace, name, resource_version, labels=None):
+    return {'metadata': {'namespace': namespace, 'name': name,
+                         'resourceVersion': resource_version, 'labels': labels or {}},
+            'spec': {'modelName': 'resnet'}}
+
+
+class FakeWatchSource:
+
+    def __init__(self, items, resource_version, streams):
+        self.items = items
+        self.resource_version = resource_version
+        self.streams = list(streams)
+        self.list_calls = 0
+        self.watched_from = []
+
+    def list(self):
+        self.list_calls += 1
+        return list(self.items), self.resource_version
+
+    def watch(self, resource_version, timeout):
+        self.watched_from.append(resource_version)
+        events = self.streams.pop(0)
+        if isinstance(events, Exception):
+            raise events
+
+        def stream():
+            for event in events:
+                if isinstance(event, Exception):
+                    raise event
+                yield event
+        return stream()
+
+
+def test_informer_lists_then_applies_watch_events():
+    source = FakeWatchSource([endpoint('t1', 'a', '1'), endpoint('t2', 'b', '2')], '2', [
+        [('ADDED', endpoint('t1', 'c', '3', {'app': 'x'})),
+         ('MODIFIED', endpoint('t1', 'a', '4', {'app': 'x'})),
+         ('DELETED', endpoint('t2', 'b', '5'))],
+        []])
+    informer = Informer('inference-endpoints', source)
+
+    informer.run_once()
+    informer.run_once()
+
+    assert source.list_calls == 1
+    assert source.watched_from == ['2', '5']
+    assert informer.get('t1', 'a')['metadata']['resourceVersion'] == '4'
+    assert informer.get('t2', 'b') is None
+    assert len(informer.list('t1')) == 2
+    assert len(informer.list('t1', label_selector='app=x')) == 2
+    assert informer.list('t1', label_selector='app!=x') == []
+    assert informer.list('t2') == []
+    assert len(informer.list_all()) == 2
+
+
+def test_informer_lists_again_when_resource_version_expired():
+    source = FakeWatchSource([endpoint('t1', 'a', '1')], '1',
+                             [[ResourceVersionExpired('too old')], []])
+    informer = Informer('inference-endpoints', source)
+
+    informer.run_once()
+    assert informer.resource_version is None
+    source.items = [endpoint('t1', 'b', '7')]
+    source.resource_version = '7'
+    informer.run_once()
+
+    assert source.list_calls == 2
+    assert informer.get('t1', 'a') is None
+    assert informer.get('t1', 'b') is not None
+
+
+def test_informer_lists_again_when_watch_is_refused_as_expired():
+    source = FakeWatchSource([endpoint('t1', 'a', '1')], '1',
+                             [ApiException(status=410, reason='Gone'), []])
+    informer = Informer('inference-endpoints', source)
+
+    informer.run_once()
+    assert informer.resource_version is None
+    source.items = [endpoint('t1', 'b', '7')]
+    source.resource_version = '7'
+    informer.run_once()
+
+    assert source.list_calls == 2
+    assert source.watched_from == ['1', '7']
+    assert informer.get('t1', 'a') is None
+
+
+def test_informer_watch_failure_keeps_resource_version():
+    source = FakeWatchSource([endpoint('t1', 'a', '1')], '1',
+                             [ApiException(status=500, reason='Error')])
+    informer = Informer('inference-endpoints', source)
+
+    with pytest.raises(ApiException):
+        informer.run_once()
+    assert informer.resource_version == '1'
+
+
+def test_informer_index_follows_events():
+    source = FakeWatchSource([endpoint('t1', 'a', '1', {'endpoint': 'e1'})], '1', [
+        [('ADDED', endpoint('t1', 'b', '2', {'endpoint': 'e1'})),
+         ('MODIFIED', endpoint('t1', 'a', '3', {'endpoint': 'e2'})),
+         ('DELETED', endpoint('t1', 'b', '4', {'endpoint': 'e1'}))]])
+    informer = Informer('pods', source)
+    informer.add_index('endpoint', lambda obj: [obj['metadata']['labels']['endpoint']])
+
+    informer.resync()
+    assert [pod['metadata']['name'] for pod in informer.by_index('endpoint', 'e1')] == ['a']
+
+    informer.run_once()
+    assert informer.by_index('endpoint', 'e1') == []
+    assert [pod['metadata']['name'] for pod in informer.by_index('endpoint', 'e2')] == ['a']
+
+
+def test_informer_freshness(mocker):
+    time_mock = mocker.patch('management_api.utils.kubernetes_cache.time.time')
+    time_mock.return_value = 100.0
+    informer = Informer('pods', FakeWatchSource([], '1', [[]]), max_staleness=10)
+    assert not informer.is_fresh()
+
+    informer.run_once()
+    assert informer.is_fresh()
+
+    time_mock.return_value = 111.0
+    assert not informer.is_fresh()
+
+
+@pytest.mark.parametrize("allowed", [True, False])
+def test_resource_cache_checks_caller_access(allowed):
+    informer = Informer('pods', FakeWatchSource([], '1', [[]]))
+    informer.run_once()
+    authorization_client = Mock()
+    authorization_client.create_self_subject_access_review.return_value.status.allowed = allowed
+    resource_cache = ResourceCache({'pods': informer},
+                                   AccessReviewer(lambda id_token: authorization_client))
+
+    for _ in range(2):
+        if allowed:
+            assert resource_cache.informer('pods', 'token', 'list', 't1') is informer
+        else:
+            with pytest.raises(KubernetesForbiddenException):
+                resource_cache.informer('pods', 'token', 'list', 't1')
+
+    authorization_client.create_self_subject_access_review.assert_called_once()
+
+
+def test_resource_cache_skips_stale_informer():
+    informer = Informer('pods', FakeWatchSource([], '1', []))
+    authorization_client = Mock()
+    resource_cache = ResourceCache({'pods': informer},
+                                   AccessReviewer(lambda id_token: authorization_client))
+
+    assert resource_cache.informer('pods', 'token', 'list', 't1') is None
+    assert resource_cache.informer('deployments', 'token', 'list', 't1') is None
+    authorization_client.create_self_subject_access_review.assert_not_called()
@@ -0,0 +1,138 @@
+#
+# Copyright (c) 2019 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import json
+import pytest
+from kubernetes import client
+from kubernetes.client.rest import ApiException
+from unittest.mock import Mock
+
+from management_api.utils.errors_handling import KubernetesGetException
+from management_api.utils.kubernetes_cache import Informer
+from management_api.utils.kubernetes_resources import get_endpoint_status, get_simple_client, \
+    get_k8s_api_client, token_api_clients, get_model_endpoints, endpoint_model_index, \
+    get_all_endpoints, MODEL_INDEX
+from test_utils.token_stuff import user_token, admin_token
+
+
+def test_token_clients_share_api_client(mocker):
+    shared_client = Mock()
+    mocker.patch('management_api.utils.kubernetes_resources.get_shared_api_client').\
+        return_value = shared_client
+    mocker.patch('management_api.utils.cache.time.time').return_value = 1538560000.0
+    token_api_clients.clear()
+
+    user_client = get_simple_client(user_token)
+    assert get_simple_client(user_token) is user_client
+    admin_client = get_simple_client(admin_token)
+    assert admin_client is not user_client
+
+    assert get_k8s_api_client(admin_token).api_client is admin_client
+    admin_client.call_api('/api/v1/namespaces/test', 'GET', {}, [], {'Accept': 'json'})
+    header_params = shared_client.call_api.call_args[0][4]
+    assert header_params == {'Accept': 'json', 'Authorization': 'Bearer ' + admin_token}
+    assert token_api_clients.stats()['hits'] >= 1
+    token_api_clients.clear()
+
+
+def test_get_endpoint_status_selects_endpoint_pods():
+    api_instance = Mock()
+    pods = {'items': [{'status': {'phase': 'Running'}}, {'status': {'phase': 'Running'}},
+                      {'status': {'phase': 'Pending'}}, {'status': {}}]}
+    api_instance.list_namespaced_pod.return_value.data = json.dumps(pods).encode()
+
+    status = get_endpoint_status(api_instance, 'test', 'resnet')
+
+    assert status == {'running pods': 2, 'pending pods': 1, 'failed pods': 0}
+    api_instance.list_namespaced_pod.assert_called_once_with(
+        'test', label_selector='endpoint=resnet', _preload_content=False)
+
+
+def test_get_endpoint_status_fail():
+    api_instance = Mock()
+    api_instance.list_namespaced_pod.side_effect = ApiException()
+    with pytest.raises(KubernetesGetException):
+        get_endpoint_status(api_instance, 'test', 'resnet')
+
+
+def test_get_endpoint_status_from_cache(mocker):
+    informer = Mock()
+    informer.by_index.return_value = [
+        client.V1Pod(status=client.V1PodStatus(phase=phase)) for phase in ['Failed', 'Running']]
+    mocker.patch('management_api.utils.kubernetes_resources.get_cached_informer').\
+        return_value = informer
+    api_instance = Mock()
+
+    status = get_endpoint_status(api_instance, 'test', 'resnet', id_token='token')
+
+    assert status == {'running pods': 1, 'pending pods': 0, 'failed pods': 1}
+    informer.by_index.assert_called_once_with('endpoint', ('test', 'resnet'))
+    api_instance.list_namespaced_pod.assert_not_called()
+
+
+def crd(name, model_name):
+    return {'metadata': {'name': name, 'namespace': 'test', 'resourceVersion': '1'},
+            'spec': {'modelName': model_name}}
+
+
+def test_get_model_endpoints():
+    custom_api_instance = Mock()
+    custom_api_instance.list_namespaced_custom_object.return_value = \
+        {'items': [crd('a', 'resnet'), crd('b', 'vgg'), crd('c', 'resnet')]}
+
+    endpoints = get_model_endpoints(custom_api_instance, 'test', 'resnet')
+
+    assert [endpoint['metadata']['name'] for endpoint in endpoints] == ['a', 'c']
+
+
+def test_get_model_endpoints_fail():
+    custom_api_instance = Mock()
+    custom_api_instance.list_namespaced_custom_object.side_effect = ApiException()
+    with pytest.raises(KubernetesGetException):
+        get_model_endpoints(custom_api_instance, 'test', 'resnet')
+
+
+def test_get_model_endpoints_from_cache(mocker):
+    informer = Informer('inference-endpoints', Mock())
+    informer.add_index(MODEL_INDEX, endpoint_model_index)
+    informer._handle_event('ADDED', crd('a', 'resnet'))
+    informer._handle_event('ADDED', crd('b', 'resnet'))
+    informer._handle_event('MODIFIED', crd('b', 'vgg'))
+    mocker.patch('management_api.utils.kubernetes_resources.get_cached_informer').\
+        return_value = informer
+    custom_api_instance = Mock()
+
+    endpoints = get_model_endpoints(custom_api_instance, 'test', 'resnet', id_token='token')
+
+    assert [endpoint['metadata']['name'] for endpoint in endpoints] == ['a']
+    assert informer.by_index(MODEL_INDEX, ('test', 'vgg'))[0]['metadata']['name'] == 'b'
+    custom_api_instance.list_namespaced_custom_object.assert_not_called()
+
+
+def test_get_all_endpoints(mocker):
+    custom_api_instance = Mock()
+    custom_api_instance.list_cluster_custom_object.return_value = \
+        {'items': [crd('a', 'resnet'), crd('b', 'vgg')]}
+
+    assert len(get_all_endpoints(custom_api_instance)) == 2
+
+    informer = Informer('inference-endpoints', Mock())
+    informer._handle_event('ADDED', crd('a', 'resnet'))
+    mocker.patch('management_api.utils.kubernetes_resources.get_cached_informer').\
+        return_value = informer
+
+    assert get_all_endpoints(custom_api_instance, id_token='token') == [crd('a', 'resnet')]
+    custom_api_instance.list_cluster_custom_object.assert_called_once()
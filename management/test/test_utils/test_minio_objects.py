@@ -0,0 +1,81 @@
+#
+# Copyright (c) 2019 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import pytest
+from botocore.exceptions import ClientError
+
+from management_api.utils.errors_handling import MinioCallException
+from management_api.utils.minio_objects import delete_objects, list_prefixes
+
+
+@pytest.fixture(scope='function')
+def minio_client_mock(mocker):
+    minio_client_mock = mocker.patch('management_api.utils.minio_objects.minio_client')
+    keys = [f'model/1/variables/{number}' for number in range(2500)]
+
+    def list_objects_v2(Bucket, Prefix, MaxKeys, ContinuationToken='0'):
+        start = int(ContinuationToken)
+        end = start + MaxKeys
+        response = {'Contents': [{'Key': key} for key in keys[start:end]],
+                    'IsTruncated': end < len(keys)}
+        if response['IsTruncated']:
+            response['NextContinuationToken'] = str(end)
+        return response
+
+    minio_client_mock.list_objects_v2.side_effect = list_objects_v2
+    minio_client_mock.delete_objects.return_value = {}
+    return minio_client_mock
+
+
+def test_delete_objects_in_batches(minio_client_mock):
+    progress = []
+
+    deleted = delete_objects('tenant', prefix='model/1/', progress=progress.append,
+                             max_workers=2)
+
+    assert deleted == 2500
+    assert progress == [1000, 2000, 2500]
+    assert minio_client_mock.list_objects_v2.call_count == 3
+    batches = [call[1]['Delete']['Objects'] for call in
+               minio_client_mock.delete_objects.call_args_list]
+    assert [len(batch) for batch in batches] == [1000, 1000, 500]
+    assert batches[2][-1] == {'Key': 'model/1/variables/2499'}
+
+
+def test_delete_objects_errors(minio_client_mock):
+    minio_client_mock.delete_objects.return_value = {
+        'Errors': [{'Key': 'model/1/variables/1', 'Message': 'Access Denied'}]}
+    with pytest.raises(MinioCallException):
+        delete_objects('tenant', prefix='model/1/')
+
+    minio_client_mock.list_objects_v2.side_effect = ClientError(
+        {'Error': {'Code': 'NoSuchBucket'}}, 'ListObjectsV2')
+    with pytest.raises(ClientError):
+        delete_objects('tenant')
+
+
+def test_list_prefixes(mocker):
+    list_objects_mock = mocker.patch('management_api.utils.minio_objects.minio_client.'
+                                     'list_objects_v2')
+    list_objects_mock.side_effect = [
+        {'CommonPrefixes': [{'Prefix': 'model/1/'}], 'IsTruncated': True,
+         'NextContinuationToken': 'next'},
+        {'CommonPrefixes': [{'Prefix': 'model/2/'}], 'IsTruncated': False}]
+
+    assert list(list_prefixes('tenant', 'model/')) == ['model/1/', 'model/2/']
+    assert list_objects_mock.call_args[1] == {'Bucket': 'tenant', 'Prefix': 'model/',
+                                              'Delimiter': '/', 'MaxKeys': 1000,
+                                              'ContinuationToken': 'next'}
@@ -0,0 +1,72 @@
+#
+# Copyright (c) 2019 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+import threading
+
+import pytest
+from unittest.mock import Mock
+
+from management_api.utils.provisioning import Provisioning, ProvisioningStep
+
+
+def test_independent_steps_run_at_the_same_time():
+    barrier = threading.Barrier(2, timeout=5)
+    undo = Mock()
+    steps = [ProvisioningStep('first', lambda: barrier.wait(), undo=undo),
+             ProvisioningStep('second', lambda: barrier.wait(), undo=undo),
+             ProvisioningStep('third', Mock(), requires=['first', 'second'])]
+
+    assert sorted(Provisioning(steps).run()) == ['first', 'second', 'third']
+    undo.assert_not_called()
+
+
+def test_failed_step_undoes_completed_steps_only():
+    calls = []
+    steps = [ProvisioningStep('base', lambda name: calls.append('base'),
+                              undo=lambda name: calls.append('undo base')),
+             ProvisioningStep('failing', Mock(side_effect=ValueError('failure')),
+                              undo=lambda name: calls.append('undo failing'),
+                              requires=['base']),
+             ProvisioningStep('dependent', lambda name: calls.append('dependent'),
+                              undo=lambda name: calls.append('undo dependent'),
+                              requires=['failing'])]
+    provisioning = Provisioning(steps)
+
+    with pytest.raises(ValueError):
+        provisioning.run('tenant')
+
+    assert calls == ['base', 'undo base']
+    assert provisioning.completed == []
+
+
+def test_rollback_goes_on_when_undo_fails():
+    undo_first = Mock()
+    steps = [ProvisioningStep('first', Mock(), undo=undo_first),
+             ProvisioningStep('second', Mock(), undo=Mock(side_effect=ValueError()),
+                              requires=['first']),
+             ProvisioningStep('third', Mock(side_effect=KeyError()), requires=['second'])]
+
+    with pytest.raises(KeyError):
+        Provisioning(steps).run()
+    undo_first.assert_called_once_with()
+
+
+def test_steps_with_missing_requirement_are_not_started():
+    step = Mock()
+    with pytest.raises(ValueError):
+        Provisioning([ProvisioningStep('orphan', step, requires=['missing'])]).run()
+    step.assert_not_called()
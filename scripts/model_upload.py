@@ -14,161 +14,528 @@
 # limitations under the License.
 #
 
+import hashlib
+import json
+import mmap
 import os
-import shutil
+import posixpath
 import tarfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_EXCEPTION, wait
 
 import requests
 from requests import urllib3
 urllib3.disable_warnings(urllib3.exceptions.SubjectAltNameWarning)
 
+DEFAULT_JOBS = 4
+MB = 1048576
+DEFAULT_JOURNAL_DIR = os.path.join(os.path.expanduser('~'), '.imm_uploads')
 
-def upload_part(url, params, headers, data, parts, verify):
-    print("Sending part nr {} of current upload...".format(params['partNumber']))
-    response = requests.put(url + "/upload", data, headers=headers, params=params, verify=verify)
-    if response.status_code != 200:
-        print("Could not upload part nr : {}".format(params['partNumber']))
-        raise Exception(response)
 
-    print("Part nr {} of current upload sent successfully".format(params['partNumber']))
-    part_etag = response.json()['data']['ETag']
-    parts.append({'ETag': part_etag, 'PartNumber': params['partNumber']})
+def create_session(jobs):
+    # parts in flight plus start/done requests of files being uploaded at the same time
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=2 * jobs)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
 
 
-def upload_model(url, params, headers, part_size, verify=False):
-    file_path = params['file_path']
-    if os.path.isfile(file_path):
-        if tarfile.is_tarfile(file_path):
-            untar_and_upload(url, params, headers, part_size, verify)
-        else:
-            upload_file(url, params, headers, part_size, verify)
-    elif os.path.isdir(file_path):
-        upload_dir(url, params, headers, part_size, verify)
-    else:
-        raise Exception("Unrecognized type of upload")
-
-
-def untar_and_upload(url, params, headers, part_size, verify=False):
-    tmp_dir = '/tmp/imm'
-    tar = tarfile.open(params['file_path'])
-    tar.extractall(path=tmp_dir)
-    tar.close()
-    params['file_path'] = tmp_dir
-    upload_dir(url, params, headers, part_size, verify)
-    shutil.rmtree(tmp_dir, ignore_errors=True)
-
-
-def upload_dir(url, params, headers, part_size, verify=False):
-    uploaded_tree = []
-    for dir_name, subdir_list, file_list in os.walk(params['file_path']):
-        print('Found directory: {}'.format(dir_name))
-        if len(file_list) == 0 and len(subdir_list) == 1:
-            print('Current dir contains only another dir, omitting....')
+class TarLayout:
+    """Model root inside archive and empty directories under it, built member by member.
+
+    Root is found like in upload_dir: directories containing only another directory are
+    skipped. Names are normalized, members outside of the archive are not part of the layout.
+    Adding members can only move the root up, never down.
+    """
+
+    def __init__(self, members=()):
+        self.subdirs = {'': set()}
+        self.dirs_with_files = set()
+        for member in members:
+            self.add(member)
+
+    def add(self, member):
+        """Adds member to the layout, returns its normalized name or None if it is outside"""
+        name = tar_member_name(member)
+        if name is None:
+            return None
+        path = name.split('/')
+        dir_path = path if member.isdir() else path[:-1]
+        for depth in range(len(dir_path)):
+            parent, child = '/'.join(dir_path[:depth]), '/'.join(dir_path[:depth + 1])
+            self.subdirs.setdefault(parent, set()).add(child)
+            self.subdirs.setdefault(child, set())
+        if member.isfile():
+            self.dirs_with_files.add('/'.join(path[:-1]))
+        return name
+
+    def root(self):
+        root = ''
+        while root not in self.dirs_with_files and len(self.subdirs[root]) == 1:
+            root = next(iter(self.subdirs[root]))
+        return root
+
+    def empty_dirs(self, root):
+        return sorted(dir_name for dir_name, children in self.subdirs.items()
+                      if not children and dir_name not in self.dirs_with_files and
+                      relative_key(dir_name, root))
+
+
+def tar_member_name(member):
+    name = posixpath.normpath(member.name.lstrip('/'))
+    if name == '.' or name == '..' or name.startswith('../'):
+        return None
+    return name
+
+
+def relative_key(dir_name, root):
+    """Returns key of directory relative to root, None for root itself, False when outside"""
+    if dir_name == root:
+        return None
+    if root == '':
+        return dir_name
+    if dir_name.startswith(root + '/'):
+        return dir_name[len(root) + 1:]
+    return False
+
+
+class UploadJournal:
+    """Parts of a file upload already sent, kept on disk so an interrupted upload can be resumed.
+
+    A journal is bound to the file size and modification time, and to the part size, so parts
+    are never reused for a changed file or different byte ranges.
+    """
+
+    def __init__(self, journal_dir, url, params, file_path, part_size):
+        stat = os.stat(file_path)
+        self.identity = {'url': url, 'modelName': params['modelName'],
+                         'modelVersion': params['modelVersion'], 'fileName': params['fileName'],
+                         'key': params['key'], 'filePath': file_path, 'size': stat.st_size,
+                         'mtime': stat.st_mtime, 'partSize': part_size}
+        digest = hashlib.sha256(json.dumps([url, params['modelName'], params['modelVersion'],
+                                            params['key'], file_path]).encode()).hexdigest()
+        self.path = os.path.join(journal_dir, digest + '.json')
+        self.upload_id = None
+        self.parts = {}
+        self.lock = threading.Lock()
+
+    def load(self):
+        """Reads journal of previous upload, returns id of upload which may be resumed"""
+        try:
+            with open(self.path) as journal_file:
+                journal = json.load(journal_file)
+        except (OSError, ValueError):
+            return None
+        if journal.get('identity') != self.identity:
+            return journal.get('uploadId')
+        self.upload_id = journal['uploadId']
+        self.parts = {int(number): part for number, part in journal['parts'].items()}
+        return self.upload_id
+
+    def start(self, upload_id):
+        self.upload_id = upload_id
+        self.parts = {}
+        self.save()
+
+    def add_part(self, part):
+        with self.lock:
+            self.parts[part['PartNumber']] = part
+            self.save()
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as journal_file:
+            json.dump({'identity': self.identity, 'uploadId': self.upload_id,
+                       'parts': self.parts}, journal_file)
+        os.replace(tmp_path, self.path)
+
+    def remove(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class ModelUploader:
+    """Uploads files of a model in parallel, each of them in parts sent in parallel.
+
+    At most `jobs` parts are sent at the same time over a shared keep-alive session. Parts are
+    sent straight from memory mapped files, so memory use does not grow with part size.
+    """
+
+    def __init__(self, url, headers, part_size, verify=False, jobs=DEFAULT_JOBS, resume=False,
+                 journal_dir=DEFAULT_JOURNAL_DIR):
+        self.url = url
+        self.headers = headers
+        self.part_size = part_size * MB
+        self.verify = verify
+        self.jobs = jobs
+        self.resume = resume
+        self.journal_dir = journal_dir
+        self.session = create_session(jobs)
+        self.part_pool = ThreadPoolExecutor(max_workers=jobs, thread_name_prefix='part')
+        self.print_lock = threading.Lock()
+        # parts read from streams and not sent yet, one per worker
+        self.part_buffers = threading.BoundedSemaphore(jobs)
+
+    def close(self):
+        self.part_pool.shutdown(wait=True)
+        self.session.close()
+
+    def log(self, message):
+        with self.print_lock:
+            print(message)
+
+    def post(self, path, data):
+        return self.session.post(self.url + path, json=data, headers=self.headers,
+                                 verify=self.verify)
+
+    def upload_model(self, params):
+        file_path = params['file_path']
+        if os.path.isfile(file_path):
+            if tarfile.is_tarfile(file_path):
+                self.upload_tar(params)
+            else:
+                self.upload_file(params)
+        elif os.path.isdir(file_path):
+            self.upload_dir(params)
         else:
-            file_path = dir_name
-            break
-
-    for dir_name, subdir_list, file_list in os.walk(file_path):
-        additional_key = os.path.relpath(dir_name, file_path)
-        path = '{}/{}'.format(params['model_name'], params['model_version'])
-        if additional_key is not '.':
-            params['additional_key'] = additional_key
+            raise Exception("Unrecognized type of upload")
+        self.finalize_model(params)
+
+    def finalize_model(self, params):
+        # model is already uploaded, failure only makes the platform list the bucket for it
+        response = self.post("/models/finalize", {'modelName': params['model_name'],
+                                                  'modelVersion': params['model_version']})
+        if response.status_code != 200:
+            self.log("Could not finalize model: {}".format(response.text))
+            return
+        model = response.json()['data']['model']
+        self.log("Model {}/{} finalized: {} files, {} bytes".format(
+            model['name'], model['version'], model['files'], model['size']))
+
+    def upload_tar(self, params):
+        """Uploads archive members straight from the archive, nothing is extracted to disk.
+
+        Model root has to be known before the first file is sent. An uncompressed archive is
+        scanned for it first, which only reads member headers. A compressed archive is read
+        once: root is taken from members preceding the first file, as archives list
+        directories before their content, and the upload fails if a later member is outside.
+        """
+        root = None
+        try:
+            with tarfile.open(params['file_path'], mode='r:') as tar:
+                root = TarLayout(tar).root()
+        except tarfile.ReadError:
+            pass
+        model_path = '{}/{}'.format(params['model_name'], params['model_version'])
+        uploaded_tree = []
+
+        # archive can only be read in order, so members are read here one after another while
+        # their parts are sent by the part pool and uploads are completed in background
+        completions = []
+        layout = TarLayout()
+        with tarfile.open(params['file_path'], mode='r|*') as tar, \
+                ThreadPoolExecutor(max_workers=self.jobs, thread_name_prefix='file') as file_pool:
+            try:
+                for member in tar:
+                    name = layout.add(member)
+                    if name is None or not member.isfile():
+                        if member.issym() or member.islnk():
+                            print('Skipping link: {}'.format(member.name))
+                        continue
+                    if root is None:
+                        root = layout.root()
+                    dir_name, file_name = posixpath.split(name)
+                    additional_key = relative_key(dir_name, root)
+                    if additional_key is False:
+                        raise Exception('{} is outside of model root {} found at the archive '
+                                        'start, upload the archive uncompressed'
+                                        .format(name, root))
+                    print('Found file: {}'.format(name))
+                    file_params = {'modelName': params['model_name'],
+                                   'modelVersion': params['model_version'],
+                                   'fileName': file_name, 'key': additional_key}
+                    completions.append(self.upload_stream(tar.extractfile(member), member.size,
+                                                          file_params, file_pool))
+                    uploaded_tree.append('/'.join(filter(None, [model_path, additional_key,
+                                                                file_name])))
+                    if any(completion.done() and completion.exception()
+                           for completion in completions):
+                        break
+            finally:
+                for completion in completions:
+                    completion.result()
+        if root is None:
+            root = layout.root()
+        if layout.root() != root:
+            raise Exception('Archive has members outside of model root {} found at the archive '
+                            'start, upload the archive uncompressed'.format(root))
+        if root:
+            print('Archive dirs down to {} contain only another dir, omitting....'.format(root))
+
+        for dir_name in layout.empty_dirs(root):
+            dir_params = dict(params, additional_key=relative_key(dir_name, root))
+            print('Creating empty directory: {}'.format(dir_name))
+            self.create_empty_dir(dir_params)
+            uploaded_tree.append('{}/{}'.format(model_path, dir_params['additional_key']))
+        print('Uploaded to:')
+        print('\n'.join(uploaded_tree))
+
+    def upload_dir(self, params):
+        file_path = params['file_path']
+        for dir_name, subdir_list, file_list in os.walk(params['file_path']):
             print('Found directory: {}'.format(dir_name))
-            path += '/{}'.format(params['additional_key'])
-        if len(file_list) != 0:
-            for file_name in file_list:
-                print('Found file: {}'.format(file_name))
-                params['file_path'] = os.path.join(dir_name, file_name)
-                print('Uploading {} to {}'.format(file_name, path))
-                upload_file(url, params, headers, part_size, verify)
-                uploaded_tree.append(path + '/' + file_name)
-        elif len(file_list) == 0 and len(subdir_list) == 0:
+            if len(file_list) == 0 and len(subdir_list) == 1:
+                print('Current dir contains only another dir, omitting....')
+            else:
+                file_path = dir_name
+                break
+
+        files = []
+        empty_dirs = []
+        for dir_name, subdir_list, file_list in os.walk(file_path):
+            additional_key = os.path.relpath(dir_name, file_path)
+            path = '{}/{}'.format(params['model_name'], params['model_version'])
+            dir_params = dict(params, additional_key=None)
+            if additional_key != '.':
+                dir_params['additional_key'] = additional_key
+                print('Found directory: {}'.format(dir_name))
+                path += '/{}'.format(additional_key)
+            if len(file_list) != 0:
+                for file_name in file_list:
+                    print('Found file: {}'.format(file_name))
+                    files.append((dict(dir_params, file_path=os.path.join(dir_name, file_name)),
+                                  path + '/' + file_name))
+            elif len(subdir_list) == 0:
+                empty_dirs.append((dir_params, path))
+
+        for dir_params, path in empty_dirs:
             print('Creating empty directory: {}'.format(path))
-            create_empty_dir(url, params, headers, verify)
-            uploaded_tree.append(path)
-    print('Uploaded to:')
-    print('\n'.join(uploaded_tree))
-
-
-def create_empty_dir(url, params, headers, verify=False):
-    data = {'modelName': params['model_name'],
-            'modelVersion': params['model_version']}
-    if params.get('additional_key'):
-        data['key'] = params['additional_key']
-    response = requests.post(url + "/upload/dir", json=data, headers=headers, verify=verify)
-    if response.status_code != 200:
-        print("Could not create directory: {}".format(response.status_code))
-        raise Exception(response)
-    print('Empty directory created')
-
-
-def upload_file(url, params, headers, part_size, verify=False):
-    model_name = params['model_name']
-    model_version = params['model_version']
-    file_path = params['file_path']
-    file_name = os.path.basename(file_path)
-    additional_key = params['additional_key'] if 'additional_key' in params \
-                                                 and params['additional_key'] is not None else None
-
-    # --- Initiating upload
-    data = {'modelName': model_name, 'modelVersion': model_version, 'fileName': file_name,
-            'key': additional_key}
-    response = requests.post(url + "/upload/start", json=data, headers=headers, verify=verify)
-    if response.status_code != 200:
-        print("Could not initiate upload: {}".format(response.text))
-        raise Exception(response)
-    upload_id = response.json()['data']['uploadId']
-    print("Model upload initiated successfully. Upload id = {}".format(upload_id))
-
-    # --- Uploading parts
-    try:
-        PART_SIZE = part_size * 1048576  # multiply to get size in bytes
-        part_number = 1
-        parts = []
-        params = {'partNumber': part_number,
-                  'uploadId': upload_id,
-                  'modelName': model_name,
-                  'modelVersion': model_version,
-                  'fileName': file_name,
-                  'key': additional_key
-                  }
-        with open(file_path, 'rb') as file:
-            print("Preparing data for part nr {} of current upload...".format(part_number))
-            data = file.read(PART_SIZE)
-            upload_part(url, params, headers, data, parts, verify=verify)
-            while len(data) == PART_SIZE:
-                print("Preparing data for part nr {} of current upload...".format(
-                    part_number + 1))
-
-                file.seek(part_number * PART_SIZE)
-                data = file.read(PART_SIZE)
-                part_number += 1
-                params['partNumber'] = part_number
-                upload_part(url, params, headers, data, parts, verify=verify)
-    except (KeyboardInterrupt, Exception) as e:
-        # -- Aborting upload
-        print("Exception: {}".format(e))
-        print("Aborting upload with id: {} ...".format(upload_id))
-        data = {'modelName': model_name, 'modelVersion': model_version, 'fileName': file_name,
-                'uploadId': upload_id, 'key': additional_key}
-        response = requests.post(url + "/upload/abort", json=data, headers=headers, verify=verify)
+            self.create_empty_dir(dir_params)
+
+        # files are only coordinated here, their parts share the part pool
+        with ThreadPoolExecutor(max_workers=self.jobs, thread_name_prefix='file') as file_pool:
+            uploads = [file_pool.submit(self.upload_file, file_params)
+                       for file_params, _ in files]
+            for upload in uploads:
+                upload.result()
+        print('Uploaded to:')
+        print('\n'.join([path for _, path in files] + [path for _, path in empty_dirs]))
+
+    def create_empty_dir(self, params):
+        data = {'modelName': params['model_name'],
+                'modelVersion': params['model_version']}
+        if params.get('additional_key'):
+            data['key'] = params['additional_key']
+        response = self.post("/upload/dir", data)
         if response.status_code != 200:
-            print("Could not abort upload: {}".format(response.text))
+            print("Could not create directory: {}".format(response.status_code))
             raise Exception(response)
-        print("Upload with id: {} aborted successfully".format(upload_id))
-        if e.__class__ == KeyboardInterrupt:
-            return
-        else:
+        print('Empty directory created')
+
+    def upload_part(self, params, data, journal=None, offset=0):
+        part_number = params['partNumber']
+        self.log("Sending part nr {} of {}...".format(part_number, params['fileName']))
+        response = self.session.put(self.url + "/upload", data, headers=self.headers,
+                                    params=params, verify=self.verify)
+        if response.status_code != 200:
+            self.log("Could not upload part nr : {}".format(part_number))
+            raise Exception(response)
+
+        self.log("Part nr {} of {} sent successfully".format(part_number, params['fileName']))
+        part = {'ETag': response.json()['data']['ETag'], 'PartNumber': part_number}
+        if journal:
+            md5 = hashlib.md5(data).hexdigest()
+            if part['ETag'].strip('"') != md5:
+                raise Exception("Part nr {} checksum mismatch".format(part_number))
+            journal.add_part(dict(part, offset=offset, size=len(data), md5=md5))
+        return part
+
+    def upload_mapped_part(self, params, file_map, offset, size, journal=None):
+        view = memoryview(file_map)[offset:offset + size]
+        try:
+            return self.upload_part(params, view, journal, offset)
+        finally:
+            view.release()
+
+    def upload_parts(self, file_path, params, journal=None, uploaded_parts=None):
+        uploaded_parts = uploaded_parts or {}
+        size = os.path.getsize(file_path)
+        if size == 0:
+            return [uploaded_parts.get(1) or
+                    self.part_pool.submit(self.upload_part, dict(params, partNumber=1), b'',
+                                          journal).result()]
+        with open(file_path, 'rb') as file, \
+                mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as file_map:
+            parts = [uploaded_parts[part_number] for part_number in uploaded_parts]
+            uploads = [self.part_pool.submit(self.upload_mapped_part,
+                                             dict(params, partNumber=part_number), file_map,
+                                             offset, min(self.part_size, size - offset), journal)
+                       for part_number, offset in
+                       enumerate(range(0, size, self.part_size), start=1)
+                       if part_number not in uploaded_parts]
+            try:
+                wait(uploads, return_when=FIRST_EXCEPTION)
+                parts += [upload.result() for upload in uploads]
+            finally:
+                # the file must stay mapped until no part is being sent
+                for upload in uploads:
+                    upload.cancel()
+                wait(uploads)
+        return sorted(parts, key=lambda part: part['PartNumber'])
+
+    def uploaded_parts(self, journal, params):
+        """Returns parts listed both in journal and by management api with the same checksum"""
+        response = self.session.get(self.url + "/upload/parts", headers=self.headers,
+                                    params=dict(params, uploadId=journal.upload_id),
+                                    verify=self.verify)
+        if response.status_code == 404:
+            self.log("Upload with id: {} no longer exists".format(journal.upload_id))
+            return None
+        if response.status_code != 200:
+            self.log("Could not list uploaded parts: {}".format(response.text))
+            raise Exception(response)
+        listed = {part['PartNumber']: part['ETag'].strip('"')
+                  for part in response.json()['data']['parts']}
+        return {part_number: {'ETag': part['ETag'], 'PartNumber': part_number}
+                for part_number, part in journal.parts.items()
+                if listed.get(part_number) == part['md5']}
+
+    def abort_upload(self, data):
+        response = self.post("/upload/abort", data)
+        if response.status_code != 200:
+            self.log("Could not abort upload: {}".format(response.text))
+            raise Exception(response)
+        self.log("Upload with id: {} aborted successfully".format(data['uploadId']))
+
+    def upload_stream(self, stream, size, file_params, file_pool):
+        """Sends file from a stream, which is read here, returns future of upload completion"""
+        upload_id = self.start_upload(file_params)
+        part_params = dict(file_params, uploadId=upload_id)
+        uploads = []
+        try:
+            for part_number, offset in enumerate(range(0, max(size, 1), self.part_size),
+                                                 start=1):
+                self.part_buffers.acquire()
+                try:
+                    data = stream.read(min(self.part_size, size - offset))
+                    upload = self.part_pool.submit(self.upload_part,
+                                                   dict(part_params, partNumber=part_number),
+                                                   data)
+                except BaseException:
+                    self.part_buffers.release()
+                    raise
+                upload.add_done_callback(lambda _: self.part_buffers.release())
+                uploads.append(upload)
+                del data
+        except BaseException as e:
+            for upload in uploads:
+                upload.cancel()
+            wait(uploads)
+            self.log("Exception: {}".format(e))
+            self.abort_upload(part_params)
             raise
+        return file_pool.submit(self.finish_upload, part_params, uploads)
 
-    # --- Completing upload
-    print("Completing update with id: {} ...".format(upload_id))
-    data = {'modelName': model_name, 'modelVersion': model_version, 'fileName': file_name,
-            'uploadId': upload_id, 'parts': parts, 'key': additional_key}
-    response = requests.post(url + "/upload/done", json=data, headers=headers, verify=verify)
+    def finish_upload(self, part_params, uploads):
+        try:
+            wait(uploads, return_when=FIRST_EXCEPTION)
+            parts = [upload.result() for upload in uploads]
+        except Exception as e:
+            for upload in uploads:
+                upload.cancel()
+            wait(uploads)
+            self.log("Exception: {}".format(e))
+            self.log("Aborting upload with id: {} ...".format(part_params['uploadId']))
+            self.abort_upload(part_params)
+            raise
+        self.complete_upload(part_params, parts)
 
-    if response.status_code != 200:
-        print("Could not complete upload: {}".format(response.text))
-        raise Exception(response)
+    def start_upload(self, file_params):
+        response = self.post("/upload/start", dict(file_params, partSize=self.part_size))
+        if response.status_code != 200:
+            self.log("Could not initiate upload: {}".format(response.text))
+            raise Exception(response)
+        upload_id = response.json()['data']['uploadId']
+        self.log("Upload of {} initiated successfully. Upload id = {}".format(
+            file_params['fileName'], upload_id))
+        return upload_id
+
+    def complete_upload(self, part_params, parts):
+        # parts must be listed in ascending order
+        self.log("Completing upload with id: {} ...".format(part_params['uploadId']))
+        response = self.post("/upload/done", dict(part_params, parts=parts))
+        if response.status_code != 200:
+            self.log("Could not complete upload: {}".format(response.text))
+            raise Exception(response)
+        self.log("Upload with id: {} completed successfully".format(part_params['uploadId']))
 
-    print("Upload with id: {} completed successfully".format(upload_id))
+    def upload_file(self, params):
+        model_name = params['model_name']
+        model_version = params['model_version']
+        file_path = params['file_path']
+        file_name = os.path.basename(file_path)
+        additional_key = params.get('additional_key')
+        file_params = {'modelName': model_name, 'modelVersion': model_version,
+                       'fileName': file_name, 'key': additional_key}
+
+        # --- Looking for upload to resume
+        journal = None
+        upload_id = None
+        uploaded_parts = None
+        if self.resume:
+            journal = UploadJournal(self.journal_dir, self.url, file_params, file_path,
+                                    self.part_size)
+            previous_upload_id = journal.load()
+            if journal.upload_id:
+                uploaded_parts = self.uploaded_parts(journal, file_params)
+            if uploaded_parts is not None:
+                upload_id = journal.upload_id
+                self.log("Resuming upload of {} with id: {}, {} parts already uploaded".format(
+                    file_name, upload_id, len(uploaded_parts)))
+            elif previous_upload_id:
+                self.log("{} changed since previous upload, starting again".format(file_name))
+                try:
+                    self.abort_upload(dict(file_params, uploadId=previous_upload_id))
+                except Exception:
+                    pass
+
+        # --- Initiating upload
+        if upload_id is None:
+            upload_id = self.start_upload(file_params)
+            if journal:
+                journal.start(upload_id)
+
+        # --- Uploading parts
+        try:
+            part_params = dict(file_params, uploadId=upload_id)
+            parts = self.upload_parts(file_path, part_params, journal, uploaded_parts)
+        except (KeyboardInterrupt, Exception) as e:
+            self.log("Exception: {}".format(e))
+            if journal:
+                # -- Keeping upload, so it can be resumed
+                self.log("Upload with id: {} interrupted, run again with --resume to send "
+                         "only missing parts".format(upload_id))
+            else:
+                # -- Aborting upload
+                self.log("Aborting upload with id: {} ...".format(upload_id))
+                self.abort_upload(dict(file_params, uploadId=upload_id))
+            # interrupted model is not finalized, it is missing files
+            raise
+
+        # --- Completing upload
+        self.complete_upload(part_params, parts)
+        if journal:
+            journal.remove()
+
+
+def upload_model(url, params, headers, part_size, verify=False, jobs=DEFAULT_JOBS,
+                 resume=False):
+    uploader = ModelUploader(url, headers, part_size, verify=verify, jobs=jobs, resume=resume)
+    try:
+        uploader.upload_model(params)
+    finally:
+        uploader.close()
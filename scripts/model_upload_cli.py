@@ -21,7 +21,7 @@ import time
 from os import getenv
 from os.path import expanduser, join
 
-from model_upload import upload_model
+from model_upload import upload_model, DEFAULT_JOBS
 
 
 def read_config():
@@ -48,6 +48,16 @@ def part_size_t(value):
     return value
 
 
+def jobs_t(value):
+    try:
+        value = int(value)
+        if value < 1 or value > 64:
+            raise Exception
+    except Exception:
+        raise argparse.ArgumentTypeError("Number of jobs must be integer between 1 and 64")
+    return value
+
+
 def main():
     parser = argparse.ArgumentParser(description='Model Uploader')
     parser.add_argument('file_path', type=str,
@@ -61,6 +71,12 @@ def main():
     parser.add_argument('--part', type=part_size_t, default=30,
                         help='Size of data chunk in MB sent in a single upload request '
                              '(acceptable values: 5-5000, default: 30)')
+    parser.add_argument('-j', '--jobs', type=jobs_t, default=DEFAULT_JOBS,
+                        help='Number of parts sent in parallel (acceptable values: 1-64, '
+                             'default: {})'.format(DEFAULT_JOBS))
+    parser.add_argument('-r', '--resume', action='store_true',
+                        help='Resume upload interrupted when run with --resume before, '
+                             'sending only missing parts')
     parser.add_argument('-k', '--insecure',  help='Insecure connection', action='store_true')
 
     config = read_config()
@@ -78,7 +94,10 @@ def main():
 
     start_time = time.time()
     try:
-        upload_model(url, params, headers, args.part, verify)
+        upload_model(url, params, headers, args.part, verify, jobs=args.jobs,
+                     resume=args.resume)
+    except KeyboardInterrupt:
+        print("Upload interrupted, model was not finalized")
     except Exception as e:
         print("Unexpected error ocurred while uploading: {}".format(e))
     end_time = time.time()
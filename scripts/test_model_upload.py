@@ -0,0 +1,160 @@
+#
+# Copyright (c) 2019 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+import io
+import tarfile
+from concurrent.futures import Future
+from unittest import mock
+
+import pytest
+
+from model_upload import ModelUploader
+
+
+def interrupted_uploader(tmp_path, interrupted_file, resume=False):
+    uploader = ModelUploader('https://management-api/tenants/test', {}, 1, resume=resume,
+                             journal_dir=str(tmp_path / 'journals'))
+    uploader.post = mock.Mock()
+    uploader.start_upload = mock.Mock(return_value='upload-id')
+    uploader.abort_upload = mock.Mock()
+    uploader.complete_upload = mock.Mock()
+
+    def upload_parts(file_path, params, journal=None, uploaded_parts=None):
+        if file_path.endswith(interrupted_file):
+            raise KeyboardInterrupt()
+        return [{'ETag': 'etag', 'PartNumber': 1}]
+
+    uploader.upload_parts = mock.Mock(side_effect=upload_parts)
+    return uploader
+
+
+def posted_paths(uploader):
+    return [call[0][0] for call in uploader.post.call_args_list]
+
+
+@pytest.mark.parametrize("resume", [False, True])
+def test_interrupted_file_upload_is_not_finalized(tmp_path, resume):
+    model_file = tmp_path / 'saved_model.pb'
+    model_file.write_bytes(b'model')
+    uploader = interrupted_uploader(tmp_path, 'saved_model.pb', resume=resume)
+    params = {'model_name': 'resnet', 'model_version': 1, 'file_path': str(model_file)}
+
+    try:
+        with pytest.raises(KeyboardInterrupt):
+            uploader.upload_model(params)
+    finally:
+        uploader.close()
+
+    assert '/models/finalize' not in posted_paths(uploader)
+    assert uploader.abort_upload.called != resume
+
+
+def test_interrupted_dir_upload_is_not_finalized(tmp_path):
+    model_dir = tmp_path / 'model'
+    (model_dir / 'variables').mkdir(parents=True)
+    (model_dir / 'saved_model.pb').write_bytes(b'model')
+    (model_dir / 'variables' / 'variables.index').write_bytes(b'index')
+    uploader = interrupted_uploader(tmp_path, 'variables.index')
+    params = {'model_name': 'resnet', 'model_version': 1, 'file_path': str(model_dir)}
+
+    try:
+        with pytest.raises(KeyboardInterrupt):
+            uploader.upload_model(params)
+    finally:
+        uploader.close()
+
+    assert '/models/finalize' not in posted_paths(uploader)
+    uploader.complete_upload.assert_called_once()
+
+
+def test_completed_upload_is_finalized(tmp_path):
+    model_file = tmp_path / 'saved_model.pb'
+    model_file.write_bytes(b'model')
+    uploader = interrupted_uploader(tmp_path, 'other.pb')
+    params = {'model_name': 'resnet', 'model_version': 1, 'file_path': str(model_file)}
+
+    try:
+        uploader.upload_model(params)
+    finally:
+        uploader.close()
+
+    assert posted_paths(uploader) == ['/models/finalize']
+
+
+def write_tar(tar_path, mode, members):
+    with tarfile.open(str(tar_path), mode) as tar:
+        for name in members:
+            member = tarfile.TarInfo(name)
+            if name.endswith('/'):
+                member.type = tarfile.DIRTYPE
+                tar.addfile(member)
+            else:
+                member.size = len(name)
+                tar.addfile(member, io.BytesIO(name.encode()))
+
+
+def tar_uploader():
+    uploader = ModelUploader('https://management-api/tenants/test', {}, 1)
+    uploader.post = mock.Mock()
+    uploader.create_empty_dir = mock.Mock()
+    uploaded = {}
+
+    def upload_stream(stream, size, file_params, file_pool):
+        uploaded[(file_params['key'], file_params['fileName'])] = stream.read(size)
+        completion = Future()
+        completion.set_result(None)
+        return completion
+
+    uploader.upload_stream = mock.Mock(side_effect=upload_stream)
+    return uploader, uploaded
+
+
+@pytest.mark.parametrize("mode", ['w', 'w:gz'])
+def test_tar_upload(tmp_path, mode):
+    tar_path = tmp_path / 'model.tar'
+    write_tar(tar_path, mode, ['model/', 'model/1/', 'model/1/saved_model.pb',
+                               'model/1/variables/', 'model/1/variables/variables.index',
+                               'model/1/assets/'])
+    uploader, uploaded = tar_uploader()
+    params = {'model_name': 'resnet', 'model_version': 1, 'file_path': str(tar_path)}
+
+    try:
+        uploader.upload_tar(params)
+    finally:
+        uploader.close()
+
+    assert uploaded == {(None, 'saved_model.pb'): b'model/1/saved_model.pb',
+                        ('variables', 'variables.index'): b'model/1/variables/variables.index'}
+    uploader.create_empty_dir.assert_called_once_with(dict(params, additional_key='assets'))
+
+
+@pytest.mark.parametrize("mode, keys", [('w', {'b', 'c'}), ('w:gz', None)])
+def test_tar_upload_with_late_root_change(tmp_path, mode, keys):
+    tar_path = tmp_path / 'model.tar'
+    write_tar(tar_path, mode, ['a/', 'a/b/', 'a/b/file', 'a/c/', 'a/c/file'])
+    uploader, uploaded = tar_uploader()
+    params = {'model_name': 'resnet', 'model_version': 1, 'file_path': str(tar_path)}
+
+    try:
+        if keys is None:
+            with pytest.raises(Exception):
+                uploader.upload_tar(params)
+        else:
+            uploader.upload_tar(params)
+            assert {key for key, _ in uploaded} == keys
+    finally:
+        uploader.close()
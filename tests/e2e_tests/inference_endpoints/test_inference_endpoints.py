@@ -368,7 +368,7 @@ def test_grpc_client(images_list, images_numpy_path):
 
 
 def test_remove_tenant():
-    assert delete_tenant().status_code == 200
+    assert delete_tenant().status_code == 202
     start_action = time.time()
     tick = start_action
     ns_exists = None
@@ -174,7 +174,7 @@ def test_delete_tenant(minio_client, api_instance):
     data = json.dumps({
         'name': new_tenant_name,
     })
-    response = requests.delete(url, data=data, headers=ADMIN_HEADERS)
+    response = requests.delete(url, data=data, headers=ADMIN_HEADERS, params={'async': 'false'})
     assert {'status': 'DELETED', 'data': {'name': new_tenant_name}} == json.loads(response.text)
     assert response.status_code == 200
 